@@ -15,33 +15,60 @@
 import os
 
 import google.auth
-from google.adk.agents import Agent
+from google.adk.agents import Agent, BaseAgent
 from google.adk.planners import BuiltInPlanner
-from google.adk.tools import AgentTool, FunctionTool
+from google.adk.tools import AgentTool, BaseTool, FunctionTool
 from google.genai import types
 from google.genai.types import ThinkingConfig
 
+from app import matchmaker
 from app.imagen_creative import generate_and_show_images
-from app.marketing_creative import marketing_agent
+from app.marketing_creative import marketing_agent, marketing_plan_stream_agent
 from app.matchmaker_agent import matchmaker_agent
 from app.product_data_retriever import get_product_data
+from app.session_budget import degrade_model, enforce_budget, record_token_usage
+from app.session_state import store_tool_output
+from app.snapshots import serve_snapshot
+from app.speculative_media import reuse_speculative_images, start_speculative_images
 from app.trend_watcher_agent import trend_watcher_agent
-from app.veo_creative import generate_and_show_video
+from app.utils.checkpoint import restore_checkpoint, save_checkpoint
+from app.utils.model_routing import get_route, record_model_latency, route_model_request
+from app.veo_creative import generate_and_show_video, generate_video_variants
+from app.workflow_agent import build_workflow_agent, root_agent_mode
 
 _, project_id = google.auth.default()
 os.environ.setdefault("GOOGLE_CLOUD_PROJECT", project_id)
 os.environ.setdefault("GOOGLE_CLOUD_LOCATION", "global")
 os.environ.setdefault("GOOGLE_GENAI_USE_VERTEXAI", "True")
 
+# The planning turn decides the model shown to ADK; later turns are re-routed per stage
+# by route_model_request (see app/utils/model_routing.py).
+plan_route = get_route("plan")
+
+# With MARKETING_STREAMING=true the plans are written by a sub-agent that streams partial
+# text to the client (StreamingMode.SSE) instead of a tool that returns all three at once.
+marketing_streaming = os.environ.get("MARKETING_STREAMING", "false").lower() == "true"
+if marketing_streaming:
+    marketing_step = "4. THEN: Transfer to `marketing_plan_agent`, which writes the 3 marketing plans for the matches and streams them directly to the user."
+else:
+    marketing_step = "4. THEN: Call `marketing_agent` with the matches to generate marketing insights. Use exact output of the marketing agent and give it back to the user and present the 3 options."
+
+# MATCHMAKER_MODE picks the matchmaker: the LlmAgent orchestrator ("agent", default) or the
+# function in app/matchmaker.py with two sequential calls ("sequential") or one ("fused").
+matchmaker_tool: BaseTool
+if matchmaker.matchmaker_mode() == "agent":
+    matchmaker_tool = AgentTool(matchmaker_agent)
+else:
+    matchmaker_tool = FunctionTool(func=matchmaker.matchmaker_agent)
 
 # Master Agent will be an LLM Agent.
 # The LlmAgent (often aliased simply as Agent) is a core component in ADK, acting as the "thinking" part of your application
 # Unlike deterministic Workflow Agents that follow predefined execution paths, LlmAgent behavior is non-deterministic.
 # It uses the LLM to interpret instructions and context, deciding dynamically how to proceed, which tools to use (if any), or whether to transfer control to another agent.
 # Keep the name root_agent. Else it will trigger a bug in the ADK it seems?
-root_agent = Agent(
+root_agent: BaseAgent = Agent(
     name="root_agent",
-    model="gemini-2.5-pro",
+    model=plan_route.model,
     # Clear Persona: "Market-Mind, a sophisticated AI marketing strategist" immediately sets a professional and expert tone.
     # Defined Role: It's not just an "assistant," it's an "orchestrator" and "project lead."
     description=(
@@ -52,7 +79,7 @@ root_agent = Agent(
     ),
     # Action-Oriented Instructions: The numbered steps provide a clear, logical workflow for the agent to follow.
     instruction=(
-        """
+        f"""
         You are Market-Mind, an autonomous marketing strategist. When given ANY request, you MUST immediately start executing the full workflow without asking questions or waiting for confirmation.
 
         ## MANDATORY IMMEDIATE ACTIONS:
@@ -61,9 +88,9 @@ root_agent = Agent(
         1. FIRST: Call `trend_watcher_agent` with query "find current trending topics"
         2. SIMULTANEOUSLY: Call `get_product_data` to retrieve available products
         3. THEN: Call `matchmaker_agent` with the trend and product data to find matches. If there are no matches, you can be more creative and match more broadly.
-        4. THEN: Call `marketing_agent` with the matches to generate marketing insights. Use exact output of the marketing agent and give it back to the user and present the 3 options.
+        {marketing_step}
         5. THEN Let the user choose the best option.
-        6. FINALLY: Use the input from the chosen marketing plan as input for the video and image generator to generate the video and image simultaneously.
+        6. FINALLY: Use the input from the chosen marketing plan as input for the video and image generator to generate the video and image simultaneously. If the user asks for several video formats (e.g. vertical, square and wide), use `generate_video_variants` instead of `generate_and_show_video`.
         7. RETURN: A small recap of the marketing plan, the news trend, the context of the trend and the returned video URI's and Image URI's
 
         ## CRITICAL RULES:
@@ -84,22 +111,41 @@ root_agent = Agent(
     tools=[
         AgentTool(trend_watcher_agent),
         FunctionTool(func=get_product_data),
-        AgentTool(matchmaker_agent),
-        FunctionTool(func=marketing_agent),
+        matchmaker_tool,
+        *([] if marketing_streaming else [FunctionTool(func=marketing_agent)]),
         FunctionTool(func=generate_and_show_images),
         FunctionTool(func=generate_and_show_video),
+        FunctionTool(func=generate_video_variants),
     ],
+    sub_agents=[marketing_plan_stream_agent] if marketing_streaming else [],
+    # A retried session resumes from its last successful stage instead of starting over,
+    # and a new one takes products and matches from the latest snapshot when it asks
+    # for what the snapshot holds; media calls are then kept within the session
+    # budget, and with SPECULATIVE_IMAGES the
+    # image of the chosen plan is taken from the renders started with the plans.
+    before_tool_callback=[
+        restore_checkpoint,
+        serve_snapshot,
+        enforce_budget,
+        reuse_speculative_images,
+    ],
+    # Keeps trends, products and matches in session state for the streaming marketing agent.
+    after_tool_callback=[store_tool_output, save_checkpoint, start_speculative_images],
     planner=BuiltInPlanner(
         thinking_config=ThinkingConfig(
             include_thoughts=True,  # Include the agent's internal thoughts in the output for transparency
-            thinking_budget=32768,  # Limit the number of tokens/thoughts the agent can use for reasoning
+            thinking_budget=plan_route.thinking_budget,  # Limit the number of tokens/thoughts the agent can use for reasoning
         )
     ),
+    # Cheap hand-off and recap turns are moved to a smaller model and thinking budget.
+    # Near the end of the session budget they move to the fallback model.
+    before_model_callback=[route_model_request, degrade_model],
+    after_model_callback=[record_model_latency, record_token_usage],
     generate_content_config=types.GenerateContentConfig(
         # High values are creative, low values are deterministic
         temperature=0.2,
         # Increase this if we want more detailed output.
-        max_output_tokens=65536,
+        max_output_tokens=plan_route.max_output_tokens,
         safety_settings=[
             types.SafetySetting(
                 category=types.HarmCategory.HARM_CATEGORY_HARASSMENT,
@@ -124,3 +170,8 @@ root_agent = Agent(
         ],
     ),
 )
+
+# ROOT_AGENT_MODE=workflow replaces the planner for steps 1-4 with workflow agents that run
+# in a fixed order; only the plan choice and the creative content are left to an LLM.
+if root_agent_mode() == "workflow":
+    root_agent = build_workflow_agent()
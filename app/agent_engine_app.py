@@ -1,30 +1,60 @@
+import atexit
 import datetime
 import json
 import logging
 import os
+from collections.abc import AsyncIterator, Iterator
 from typing import Any
 
 import google.auth
 import vertexai
 from google.adk.artifacts import GcsArtifactService
-from google.cloud import logging as google_cloud_logging
 from opentelemetry import trace
 from opentelemetry.sdk.trace import TracerProvider, export
 from vertexai import agent_engines
 from vertexai.preview.reasoning_engines import AdkApp
 
+from app import veo_creative
 from app.agent import root_agent
+from app.prewarm import prewarm, prewarm_enabled
+from app.snapshots import snapshot_refresh_enabled, start_refresher
+from app.utils.clients import connection_stats, get_logging_client
+from app.utils.concurrency import (
+    DEFAULT_NUM_WORKERS,
+    DEFAULT_THREAD_POOL_SIZE,
+    DEFAULT_WORKER_CONCURRENCY,
+    bounded_async_stream,
+    bounded_stream,
+    get_executor,
+)
+from app.utils.feedback import CloudLoggingSink, FeedbackWriter, FileSink
 from app.utils.gcs import create_bucket_if_not_exists
+from app.utils.logging_config import configure_logging
 from app.utils.tracing import CloudTraceLoggingSpanExporter
 from app.utils.typing import Feedback
+from app.veo_jobs import VeoJob, resume_running_jobs
 
 
 class AgentEngineApp(AdkApp):
     def set_up(self) -> None:
-        """Set up logging and tracing for the agent engine app."""
+        """Set up logging and tracing for the agent engine app.
+
+        With PREWARM_ON_SETUP=true the worker also builds its clients, preloads the
+        product catalog, primes the trend cache and opens connections before serving,
+        so the first request runs at steady-state latency. With SNAPSHOT_REFRESH=true
+        it also keeps the market snapshots of app/snapshots.py fresh in the background.
+        """
         super().set_up()
-        logging_client = google_cloud_logging.Client()
+        configure_logging()
+        logging_client = get_logging_client()
         self.logger = logging_client.logger(__name__)
+        # Feedback is written in batches off the request path; FEEDBACK_FILE writes
+        # JSONL locally instead of to Cloud Logging.
+        feedback_file = os.environ.get("FEEDBACK_FILE")
+        self.feedback_writer = FeedbackWriter(
+            FileSink(feedback_file) if feedback_file else CloudLoggingSink(self.logger)
+        )
+        atexit.register(self.feedback_writer.close)
         provider = TracerProvider()
         processor = export.BatchSpanProcessor(
             CloudTraceLoggingSpanExporter(
@@ -33,19 +63,67 @@ class AgentEngineApp(AdkApp):
         )
         provider.add_span_processor(processor)
         trace.set_tracer_provider(provider)
+        # Size the shared pool for blocking client calls once per worker.
+        get_executor()
+        # Finish the Veo renders a restarted or timed-out worker left running, so the
+        # next request for those videos is answered from the job store.
+        get_executor().submit(
+            resume_running_jobs, veo_creative.client, self._log_veo_job
+        )
+        # Keep the trend, product and match snapshots of every market fresh.
+        if snapshot_refresh_enabled():
+            start_refresher()
+        self.prewarm_timings: dict[str, float] = {}
+        if prewarm_enabled():
+            self.prewarm_timings = prewarm()
+            self.logger.log_struct(
+                {"log_type": "prewarm", "timings_ms": self.prewarm_timings},
+                severity="INFO",
+            )
+
+    def _log_veo_job(self, job: VeoJob) -> None:
+        """Logs a Veo render that finished after the request that started it."""
+        self.logger.log_struct(
+            {
+                "log_type": "veo_job",
+                "job_id": job.job_id,
+                "session_id": job.session_id,
+                "status": job.status,
+                "result": job.result,
+                "error": job.error,
+            },
+            severity="INFO" if job.status == "succeeded" else "WARNING",
+        )
+
+    def stream_query(self, **kwargs: Any) -> Iterator[dict[str, Any]]:
+        """Streams a query, bounded by the per-worker concurrency limit."""
+        yield from bounded_stream(super().stream_query(**kwargs))
+
+    async def async_stream_query(self, **kwargs: Any) -> AsyncIterator[dict[str, Any]]:
+        """Streams a query asynchronously, bounded by the per-worker concurrency limit."""
+        async for event in bounded_async_stream(super().async_stream_query(**kwargs)):
+            yield event
+
+    def streaming_agent_run_with_events(self, request_json: str) -> Iterator[Any]:
+        """Runs the agent for the Agent Engine UI, bounded by the concurrency limit."""
+        yield from bounded_stream(super().streaming_agent_run_with_events(request_json))
 
     def register_feedback(self, feedback: dict[str, Any]) -> None:
-        """Collect and log feedback."""
+        """Collect feedback; it is logged in the next batch of the feedback writer."""
         feedback_obj = Feedback.model_validate(feedback)
-        self.logger.log_struct(feedback_obj.model_dump(), severity="INFO")
+        self.feedback_writer.submit(feedback_obj.model_dump())
+
+    def connection_stats(self) -> dict[str, dict[str, Any]]:
+        """Reports how well this worker's shared clients reuse their connections."""
+        return connection_stats()
 
     def register_operations(self) -> dict[str, list[str]]:
         """Registers the operations of the Agent.
 
-        Extends the base operations to include feedback registration functionality.
+        Extends the base operations with feedback registration and connection stats.
         """
         operations = super().register_operations()
-        operations[""] = operations[""] + ["register_feedback"]
+        operations[""] = operations[""] + ["register_feedback", "connection_stats"]
         return operations
 
     def clone(self) -> "AgentEngineApp":
@@ -71,8 +149,18 @@ def deploy_agent_engine_app(
     extra_packages: list[str] = ["./app"],
     env_vars: dict[str, str] = {},
     service_account: str | None = None,
+    num_workers: int = DEFAULT_NUM_WORKERS,
+    worker_concurrency: int = DEFAULT_WORKER_CONCURRENCY,
+    thread_pool_size: int = DEFAULT_THREAD_POOL_SIZE,
+    prewarm_on_setup: bool = False,
 ) -> agent_engines.AgentEngine:
-    """Deploy the agent engine app to Vertex AI."""
+    """Deploy the agent engine app to Vertex AI.
+
+    num_workers, worker_concurrency and thread_pool_size are passed to each replica as
+    NUM_WORKERS, WORKER_CONCURRENCY and THREAD_POOL_SIZE. Workers on a replica share
+    their product, trend and LLM caches through a local SQLite file (see
+    app/utils/cache.py), so adding workers does not multiply cold cache fills.
+    """
 
     staging_bucket_uri = f"gs://{project}-agent-engine"
     artifacts_bucket_name = f"{project}-trend-marketeer-logs-data"
@@ -96,8 +184,14 @@ def deploy_agent_engine_app(
         ),
     )
 
-    # Set worker parallelism to 1
-    env_vars["NUM_WORKERS"] = "1"
+    # Worker parallelism: one slow Veo poll or Imagen call no longer stalls the replica
+    env_vars = {
+        **env_vars,
+        "NUM_WORKERS": str(num_workers),
+        "WORKER_CONCURRENCY": str(worker_concurrency),
+        "THREAD_POOL_SIZE": str(thread_pool_size),
+        "PREWARM_ON_SETUP": str(prewarm_on_setup).lower(),
+    }
 
     # Common configuration for both create and update operations
     agent_config = {
@@ -175,7 +269,31 @@ if __name__ == "__main__":
         default=None,
         help="Service account email to use for the agent engine",
     )
+    parser.add_argument(
+        "--num-workers",
+        type=int,
+        default=DEFAULT_NUM_WORKERS,
+        help="Number of worker processes per replica",
+    )
+    parser.add_argument(
+        "--worker-concurrency",
+        type=int,
+        default=DEFAULT_WORKER_CONCURRENCY,
+        help="Maximum number of concurrent requests per worker",
+    )
+    parser.add_argument(
+        "--thread-pool-size",
+        type=int,
+        default=DEFAULT_THREAD_POOL_SIZE,
+        help="Threads per worker for blocking client calls",
+    )
+    parser.add_argument(
+        "--prewarm",
+        action="store_true",
+        help="Warm clients, caches and connections in set_up before serving",
+    )
     args = parser.parse_args()
+    configure_logging()
 
     # Parse environment variables if provided
     env_vars = {}
@@ -205,4 +323,8 @@ if __name__ == "__main__":
         extra_packages=args.extra_packages,
         env_vars=env_vars,
         service_account=args.service_account,
+        num_workers=args.num_workers,
+        worker_concurrency=args.worker_concurrency,
+        thread_pool_size=args.thread_pool_size,
+        prewarm_on_setup=args.prewarm,
     )
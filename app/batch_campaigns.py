@@ -0,0 +1,256 @@
+"""
+Offline campaign generation for many countries, dates and brands.
+
+Reads a JSONL manifest with one campaign per line, e.g.
+
+    {"id": "nl-2025-09-15", "country": "Netherlands", "date": "2025-09-15", "video": true}
+
+An entry with "video_formats": ["9:16", "16:9"] renders one video per format instead.
+
+and runs trends -> products -> matching -> marketing -> media for every entry on a
+bounded process pool. Each result is appended to the output JSONL as soon as it is
+done, with per-stage latencies or the stage that failed. Entries that already have a
+successful result in the output are skipped, so an interrupted run can be restarted;
+failed entries resume from the last stage that succeeded (see app/utils/checkpoint.py).
+
+Run with:
+    uv run python -m app.batch_campaigns manifest.jsonl campaigns.jsonl --workers 4
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any
+
+from app import matchmaker
+from app.imagen_creative import generate_and_show_images
+from app.marketing_creative import marketing_agent
+from app.product_data_retriever import get_product_data
+from app.trend_data_retriever import get_trend_data
+from app.utils.checkpoint import checkpoint_store
+from app.utils.logging_config import configure_logging
+from app.veo_creative import generate_and_show_video, generate_video_variants
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_WORKERS = 4
+
+
+def load_manifest(path: str) -> list[dict[str, Any]]:
+    """Reads the manifest, giving entries without an id their line number as id."""
+    items = []
+    with open(path) as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            item.setdefault("id", str(line_number))
+            items.append(item)
+    return items
+
+
+def completed_ids(output_path: str) -> set[str]:
+    """Returns the ids that already have a successful result in the output file."""
+    if not os.path.exists(output_path):
+        return set()
+    done = set()
+    with open(output_path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut off by an interrupted run; the entry is simply retried.
+                continue
+            if record.get("status") == "ok":
+                done.add(record["id"])
+    return done
+
+
+def run_campaign(item: dict[str, Any]) -> dict[str, Any]:
+    """
+    Runs the full pipeline for one manifest entry.
+
+    Never raises: a failure is returned as a record with the failing stage and the
+    traceback, so one bad entry does not stop the batch. Every completed stage is
+    checkpointed, so a retry of the entry only runs the stages that did not succeed.
+
+    Args:
+        item: Manifest entry. Recognized keys are id, country, date, trend_limit,
+            product_limit, num_concepts, brandbook, number_of_images, video and
+            video_formats.
+
+    Returns:
+        dict: Result record with status, latency_ms and stage_latency_ms, plus either
+        the campaign outputs or failed_stage and error.
+    """
+    stages: list[tuple[str, Any]] = [
+        (
+            "trends",
+            lambda: get_trend_data(
+                country=item.get("country", "Netherlands"),
+                refresh_date=item.get("date"),
+                limit=item.get("trend_limit", 10),
+            ),
+        ),
+        ("products", lambda: get_product_data(limit=item.get("product_limit", 5))),
+        (
+            "matches",
+            lambda: json.dumps(
+                matchmaker.match_products(
+                    outputs["products"],
+                    outputs["trends"],
+                    fused=matchmaker.matchmaker_mode() == "fused",
+                )
+            ),
+        ),
+        (
+            "marketing_plans",
+            # Without a user to pick one of three plans, the batch writes one per entry.
+            lambda: marketing_agent(outputs["matches"], item.get("num_concepts", 1)),
+        ),
+        (
+            "images",
+            lambda: generate_and_show_images(
+                outputs["marketing_plans"],
+                brandbook=item.get("brandbook", ""),
+                number_of_images=item.get("number_of_images", 1),
+            ),
+        ),
+    ]
+    if item.get("video_formats"):
+        stages.append(
+            (
+                "video",
+                lambda: generate_video_variants(
+                    outputs["marketing_plans"],
+                    aspect_ratios=item["video_formats"],
+                    brandbook=item.get("brandbook", ""),
+                ),
+            )
+        )
+    elif item.get("video", False):
+        stages.append(
+            (
+                "video",
+                lambda: generate_and_show_video(
+                    outputs["marketing_plans"], brandbook=item.get("brandbook", "")
+                ),
+            )
+        )
+
+    checkpoint_id = f"batch:{item['id']}"
+    outputs: dict[str, Any] = checkpoint_store.load(checkpoint_id)
+    stage_latency_ms: dict[str, float] = {}
+    record: dict[str, Any] = {
+        "id": item["id"],
+        "status": "ok",
+        "resumed_stages": [name for name, _ in stages if name in outputs],
+    }
+    started_at = time.perf_counter()
+    for name, stage in stages:
+        if name in outputs:
+            continue
+        stage_started_at = time.perf_counter()
+        try:
+            outputs[name] = stage()
+            checkpoint_store.save(checkpoint_id, name, outputs[name])
+        except Exception as e:
+            record.update(
+                status="error",
+                failed_stage=name,
+                error=f"{type(e).__name__}: {e}",
+                traceback=traceback.format_exc(),
+            )
+            break
+        finally:
+            stage_latency_ms[name] = round(
+                (time.perf_counter() - stage_started_at) * 1000, 1
+            )
+
+    record["latency_ms"] = round((time.perf_counter() - started_at) * 1000, 1)
+    record["stage_latency_ms"] = stage_latency_ms
+    if record["status"] == "ok":
+        record["outputs"] = outputs
+    return record
+
+
+def run_batch(
+    manifest_path: str,
+    output_path: str,
+    max_workers: int = DEFAULT_BATCH_WORKERS,
+) -> tuple[int, int]:
+    """
+    Runs every pending manifest entry on a process pool and appends results as they finish.
+
+    Workers are started with the spawn method: the parent has already created gRPC and
+    HTTP clients at import time, and those are not safe to carry over a fork.
+
+    Args:
+        manifest_path: JSONL manifest, one campaign per line.
+        output_path: JSONL file the result records are appended to.
+        max_workers: Number of campaigns generated concurrently.
+
+    Returns:
+        tuple[int, int]: Number of successful and failed entries in this run.
+    """
+    done = completed_ids(output_path)
+    pending = [item for item in load_manifest(manifest_path) if item["id"] not in done]
+    logger.info(
+        f"Running {len(pending)} campaigns on {max_workers} workers "
+        f"({len(done)} already done)"
+    )
+
+    succeeded = failed = 0
+    with (
+        ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor,
+        open(output_path, "a") as output,
+    ):
+        futures = {executor.submit(run_campaign, item): item for item in pending}
+        for future in as_completed(futures):
+            try:
+                record = future.result()
+            except Exception as e:
+                # The worker process itself died (e.g. out of memory).
+                record = {
+                    "id": futures[future]["id"],
+                    "status": "error",
+                    "error": f"{type(e).__name__}: {e}",
+                }
+            output.write(json.dumps(record, default=str) + "\n")
+            output.flush()
+            if record["status"] == "ok":
+                succeeded += 1
+            else:
+                failed += 1
+            logger.info(
+                f"Campaign {record['id']}: {record['status']} "
+                f"in {record.get('latency_ms', '?')} ms"
+            )
+    return succeeded, failed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Generate campaigns from a JSONL manifest"
+    )
+    parser.add_argument("manifest", help="JSONL manifest, one campaign per line")
+    parser.add_argument("output", help="JSONL file results are appended to")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.environ.get("BATCH_WORKERS", DEFAULT_BATCH_WORKERS)),
+        help="Number of campaigns generated concurrently",
+    )
+    args = parser.parse_args()
+
+    configure_logging()
+    succeeded, failed = run_batch(args.manifest, args.output, max_workers=args.workers)
+    print(f"Generated {succeeded} campaigns, {failed} failed")
@@ -0,0 +1,140 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed, wait
+from typing import Any
+
+from app.utils import gcs
+from app.utils.images import (
+    DEFAULT_RENDITIONS,
+    Rendition,
+    parse_renditions,
+    render_renditions,
+)
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_pool: ProcessPoolExecutor | None = None
+
+
+def rendition_config() -> list[Rendition]:
+    """Returns the renditions to produce (IMAGE_RENDITIONS); empty disables them."""
+    return parse_renditions(os.environ.get("IMAGE_RENDITIONS", DEFAULT_RENDITIONS))
+
+
+def rendition_processes() -> int:
+    """Processes that render images (IMAGE_RENDITION_PROCESSES), by default the CPUs up to 4."""
+    return int(os.environ.get("IMAGE_RENDITION_PROCESSES", min(os.cpu_count() or 1, 4)))
+
+
+def rendition_pool() -> ProcessPoolExecutor:
+    """Returns the worker's process pool for resizing and encoding images.
+
+    Processes are spawned rather than forked, as the worker runs threads.
+    """
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=rendition_processes(),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def rendition_object(object_name: str, rendition: Rendition) -> str:
+    """Object name of a rendition, next to the original: images/1/a.png -> images/1/a_thumbnail.webp."""
+    stem = object_name.rsplit(".", 1)[0] if "." in object_name else object_name
+    return f"{stem}_{rendition.name}.{rendition.extension}"
+
+
+def add_renditions(
+    images: list[dict[str, Any]], renditions: list[Rendition] | None = None
+) -> list[dict[str, Any]]:
+    """
+    Adds channel renditions to generated images stored in GCS.
+
+    Every image is downloaded once, rendered into all renditions in the process pool
+    and the renditions are uploaded next to it, all transfers on the shared GCS
+    transfer pool. Downloads and uploads overlap with rendering: an image is rendered
+    as soon as it is downloaded, and its renditions are uploaded as soon as they are
+    rendered. An image whose renditions fail keeps the original only, with
+    renditions_error set.
+
+    Args:
+        images (list[dict]): Images with bucket and object, as returned by
+            generate_and_show_images(). Other entries are returned as is.
+        renditions (list[Rendition], optional): Defaults to rendition_config().
+
+    Returns:
+        list[dict]: The images, each with a renditions map of name to uri,
+        public_url, width, height and content_type.
+    """
+    renditions = rendition_config() if renditions is None else renditions
+    stored = [
+        image for image in images if isinstance(image, dict) and "object" in image
+    ]
+    if not renditions or not stored:
+        return images
+
+    def _failed(image: dict[str, Any], error: BaseException) -> None:
+        logger.warning(f"Renditions of {image['image_uri']} failed: {error}")
+        image["renditions_error"] = str(error)
+
+    transfers = gcs.transfer_executor()
+    downloads = {
+        transfers.submit(gcs.download_bytes, image["image_uri"]): image
+        for image in stored
+    }
+    renders: dict[Future, dict[str, Any]] = {}
+    for download in as_completed(downloads):
+        image = downloads[download]
+        error = download.exception()
+        if error is not None:
+            _failed(image, error)
+            continue
+        render = rendition_pool().submit(
+            render_renditions, download.result(), renditions
+        )
+        renders[render] = image
+
+    uploads: dict[Future, tuple[dict[str, Any], Rendition, int, int]] = {}
+    for render in as_completed(renders):
+        image = renders[render]
+        error = render.exception()
+        if error is not None:
+            _failed(image, error)
+            continue
+        rendered = render.result()
+        for rendition in renditions:
+            data, width, height = rendered[rendition.name]
+            object_name = rendition_object(image["object"], rendition)
+            upload = transfers.submit(
+                gcs.upload_bytes,
+                f"gs://{image['bucket']}/{object_name}",
+                data,
+                rendition.content_type,
+            )
+            uploads[upload] = (image, rendition, width, height)
+    wait(uploads)
+
+    for upload, (image, rendition, width, height) in uploads.items():
+        error = upload.exception()
+        if error is not None:
+            _failed(image, error)
+            continue
+        bucket_name, object_name = gcs.parse_gcs_uri(upload.result())
+        image.setdefault("renditions", {})[rendition.name] = {
+            "uri": upload.result(),
+            "public_url": gcs.public_url(bucket_name, object_name),
+            "width": width,
+            "height": height,
+            "content_type": rendition.content_type,
+        }
+    logger.info(
+        f"Uploaded {sum(u.exception() is None for u in uploads)} renditions "
+        f"of {len(stored)} image(s)"
+    )
+    return images
@@ -2,100 +2,31 @@ import logging
 import os
 
 import google.auth
-from google.genai import Client, types
+from google.genai import types
+
+from app.image_renditions import add_renditions
+from app.utils.clients import get_genai_client
+from app.utils.logging_config import configure_logging, prompt_preview
+from app.utils.telemetry import model_span, traced_tool
+from app.veo_creative import DEFAULT_BRANDBOOK
 
 _, project_id = google.auth.default()
 os.environ.setdefault("GOOGLE_CLOUD_PROJECT", project_id)
 os.environ.setdefault("GOOGLE_CLOUD_LOCATION", "global")
 os.environ.setdefault("GOOGLE_GENAI_USE_VERTEXAI", "True")
 
-# Initialize the Gen AI client
-client = Client(location="us-central1")
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
-
+# The Gen AI client shared with the other creative tools
+client = get_genai_client("us-central1")
 
-def generate_and_show_images(
-    marketing_plan: str, brandbook: str = "", number_of_images: int = 1
-):
-    """
-    Generates images using Google Gen AI Imagen model and saves them to GCS bucket.
 
-    Args:
-        marketing_plan: Description of the marketing campaign
-        brandbook: Optional brand guidelines to follow. If None, uses default brand guide.
-        number_of_images: Number of images to generate
+IMAGEN_MODEL = "imagen-4.0-generate-001"
+IMAGE_OUTPUT_URI = "gs://hackathon_agent_oryonx/images/"
 
-    Returns:
-        list: List of generated image objects with URIs pointing to GCS bucket
-    """
 
-    if not brandbook:
-        brandbook = """
-            Brand Guide: The Taste of Home
-
-            Goal:
-            Create a consistent social media presence that is Artisanal, Warm, Authentic, and Personal.
-
-            ------------------------------------------------------------
-            1. Color Palette: Earthy & Fresh
-            ------------------------------------------------------------
-            Primary Colors:
-            Terracotta Orange (#D97D51)
-            Forest Green (#3A5A40)
-            Cream White (#F4F1DE)
-
-            Accent Colors:
-            Golden Yellow (#FFC300)
-            Soft Blue (#A8DADC)
-
-            ------------------------------------------------------------
-            2. Typography: Classic & Clean
-            ------------------------------------------------------------
-            Headlines: Use a classic serif font (e.g., Lora or Playfair Display)
-            Body & Prices: Use a clean sans-serif font (e.g., Lato or Montserrat)
-
-            ------------------------------------------------------------
-            3. Photography & Video: Natural & Fun
-            ------------------------------------------------------------
-            Visual Style:
-            Warm and inviting visuals
-            Use soft, natural daylight
-            Focus on texture and high-quality ingredients
-            Natural backgrounds (wood, linen, stone)
-
-            Guidelines:
-            Capture genuine, joyful moments with products
-            (e.g., tasting, baking, hands-on interactions)
-            Include helpful tips in short videos or overlays
-            Avoid overly posed or corporate imagery
-
-            ------------------------------------------------------------
-            4. Tone of Voice: Warm & Personal
-            ------------------------------------------------------------
-            Use a conversational, human tone
-            Write from a first-person or inclusive "we" perspective
-
-            Example Caption:
-            "Mijn absolute favoriet voor het weekend: onze oude boerenkaas. Ik eet 'm het liefst zo uit het vuistje. Geniet ervan!"
-
-            Keywords to Use:
-            Enjoy
-            Discover
-            Tip
-            Delicious
-
-            Calls-to-Action:
-            Try our favorite
-            Let us know what you think!
-            Taste the difference
-            """
-
-    text_prompt = (
+def image_prompt(marketing_plan: str, brandbook: str = "") -> str:
+    """Builds the Imagen prompt for a marketing plan, following brandbook or the default."""
+    brandbook = brandbook or DEFAULT_BRANDBOOK
+    return (
         f"Create a high-quality, visually appealing marketing image that represents the following marketing plan: {marketing_plan}. "
         f"Focus on the image description elements from the marketing plan. "
         f"IMPORTANT SAFETY GUIDELINES - DO NOT include: "
@@ -115,23 +46,47 @@ def generate_and_show_images(
         f"Keep content family-friendly and appropriate for all audiences."
     )
 
-    logging.info(f"Generating {number_of_images} image(s)...")
-    logging.info(f"📝 Prompt: {text_prompt}")
+
+def render_images(
+    text_prompt: str,
+    number_of_images: int = 1,
+    model: str = IMAGEN_MODEL,
+    image_size: str | None = "2k",
+) -> list:
+    """
+    Renders a prompt with Imagen into GCS and adds the channel renditions.
+
+    Args:
+        text_prompt: The prompt, e.g. from image_prompt()
+        number_of_images: Number of images to generate
+        model: Imagen model to render with
+        image_size: Output size, or None for the model's default (the fast model
+            has a single size)
+
+    Returns:
+        list: The generated images as returned by generate_and_show_images()
+    """
+    logging.info(f"Generating {number_of_images} image(s) with {model}...")
+    logging.debug(f"📝 Prompt: {prompt_preview(text_prompt)}")
     logging.info("⏳ Please wait...")
 
-    response = client.models.generate_images(
-        model="imagen-4.0-generate-001",
-        prompt=text_prompt,
-        config=types.GenerateImagesConfig(
-            aspect_ratio="9:16",
-            number_of_images=number_of_images,
-            image_size="2k",
-            enhance_prompt=True,
-            safety_filter_level="BLOCK_ONLY_HIGH",
-            person_generation="ALLOW_ALL",
-            output_gcs_uri="gs://hackathon_agent_oryonx/images/",
-        ),
-    )
+    with model_span(model, "generate_images") as span:
+        response = client.models.generate_images(
+            model=model,
+            prompt=text_prompt,
+            config=types.GenerateImagesConfig(
+                aspect_ratio="9:16",
+                number_of_images=number_of_images,
+                image_size=image_size,
+                enhance_prompt=True,
+                safety_filter_level="BLOCK_ONLY_HIGH",
+                person_generation="ALLOW_ALL",
+                output_gcs_uri=IMAGE_OUTPUT_URI,
+            ),
+        )
+        span.set_attribute(
+            "gen_ai.response.images", len(response.generated_images or [])
+        )
 
     logging.info(f"Successfully generated {len(response.generated_images)} image(s)!")
 
@@ -168,10 +123,36 @@ def generate_and_show_images(
     logging.info(
         f"All {len(response.generated_images)} image(s) generated successfully and saved to GCS bucket."
     )
+
+    # Channels use the renditions instead of pulling the 2k original.
+    try:
+        result_images = add_renditions(result_images)
+    except Exception:
+        logging.exception("Could not render the image renditions")
     return result_images
 
 
+@traced_tool
+def generate_and_show_images(
+    marketing_plan: str, brandbook: str = "", number_of_images: int = 1
+):
+    """
+    Generates images using Google Gen AI Imagen model and saves them to GCS bucket.
+
+    Args:
+        marketing_plan: Description of the marketing campaign
+        brandbook: Optional brand guidelines to follow. If None, uses default brand guide.
+        number_of_images: Number of images to generate
+
+    Returns:
+        list: List of generated image objects with URIs pointing to GCS bucket, each
+        with a renditions map of channel sizes (thumbnail, story, feed, web)
+    """
+    return render_images(image_prompt(marketing_plan, brandbook), number_of_images)
+
+
 if __name__ == "__main__":
+    configure_logging()
     marketing_plan = "promote the gift card as a perfect present for any occasion, highlighting its versatility and ease of use. use the slogan; om van elke dag een cadeautje the maken (make every day a gift). the target audience is people looking for a convenient and thoughtful gift option for friends and family. the campaign should emphasize the wide range of products available on bol.com that can be purchased with the gift card, making it an ideal choice for birthdays, holidays, and special celebrations."
 
     logging.info("=" * 60)
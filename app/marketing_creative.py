@@ -1,18 +1,54 @@
-import json
 import logging
 import os
+from collections.abc import AsyncGenerator
+from typing import Any
 
 import google.adk.agents
 import google.auth
 import google.generativeai as genai
 from dotenv import load_dotenv
-from google.generativeai import GenerativeModel
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.agents.run_config import StreamingMode
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from app.speculative_media import speculate_images
+from app.utils import codec
+from app.utils.cache import SharedCache, cache_key
+from app.utils.checkpoint import CHECKPOINT_ID_KEY, new_checkpoint_id
+from app.utils.clients import get_generative_model
+from app.utils.llm_output import extract_json_array
+from app.utils.model_routing import get_route
+from app.utils.telemetry import (
+    model_span,
+    payload_size,
+    record_usage,
+    traced_generate_content,
+    traced_tool,
+)
 
-logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+# With CACHE_MARKETING_PLANS, plans for the same set of matches are reused by every
+# worker until the TTL expires.
+_llm_cache = SharedCache(
+    "llm_responses", ttl_seconds=float(os.environ.get("LLM_CACHE_TTL_SECONDS", 3600))
+)
+
+
+def plan_caching_enabled() -> bool:
+    """
+    Whether marketing plans are served from the LLM response cache (CACHE_MARKETING_PLANS).
+
+    Off by default: the plans are the creative output of the agent, and with the cache
+    every session asking about the same matches within LLM_CACHE_TTL_SECONDS would get
+    the very same three plans instead of fresh ones.
+    """
+    return os.environ.get("CACHE_MARKETING_PLANS", "false").lower() == "true"
+
+
 _, project_id = google.auth.default()
 
 
@@ -28,44 +64,21 @@ else:
 def _extract_matches(raw_matchmaker_output: str) -> list:
     """Return a JSON-decoded list of matches or an empty list when decoding fails."""
 
-    try:
-        parsed_output = json.loads(raw_matchmaker_output)
-        if isinstance(parsed_output, list):
-            return parsed_output
-    except json.JSONDecodeError:
-        pass
-
-    # Some LLM responses wrap the JSON in prose or code fences—fish out the array if possible.
-    start_index = raw_matchmaker_output.find("[")
-    end_index = raw_matchmaker_output.rfind("]")
-    if start_index != -1 and end_index != -1 and end_index > start_index:
-        try:
-            parsed_output = json.loads(
-                raw_matchmaker_output[start_index : end_index + 1]
-            )
-            if isinstance(parsed_output, list):
-                return parsed_output
-        except json.JSONDecodeError:
-            pass
-
-    logger.warning(
-        "Unable to parse matchmaker output into JSON; falling back to empty matches."
-    )
-    return []
-
+    matches = extract_json_array(raw_matchmaker_output)
+    if matches is None:
+        logger.warning(
+            "Unable to parse matchmaker output into JSON; falling back to empty matches."
+        )
+        return []
+    return matches
 
-def marketing_agent(matchmaker_output: str, num_concepts: int = 3) -> str:
-    """
-    Calls the LMM (GenerativeModel) to create three marketing concepts for social media posts for Instagram, both image and video.
-    Each concept includes: a marketing plan, a funny tagline, and the product name.
-    Returns a dictionary of concepts.
-    """
-    lmm_model = GenerativeModel("gemini-2.5-flash")
 
+def _build_marketing_prompt(matchmaker_output: str, num_concepts: int) -> str:
+    """Builds the prompt asking for one marketing plan per selected match."""
     matches = _extract_matches(matchmaker_output)
     selected_matches = matches[:num_concepts] if matches else []
 
-    prompt = (
+    return (
         "You are a creative marketing agent. Using the following product-news matches, generate ONE comprehensive marketing plan PER product-news item as a story that can be shared internally with stakeholders and is ready for direct implementation by the marketing team. "
         "For each selected match, generate a separate marketing plan as a distinct text variable. "
         "Select the three best matches based on how well the product connects to the news item and the fun factor. "
@@ -94,10 +107,120 @@ def marketing_agent(matchmaker_output: str, num_concepts: int = 3) -> str:
         "  - Make sure the main tagline is mentioned and both the news item and product are clearly referenced.\n"
         "- A catchy Instagram caption ready for posting.\n"
         "Use the following matches:\n"
-        + json.dumps(selected_matches, indent=2)
+        + codec.dumps(selected_matches)
         + "\nIMPORTANT: Return only the three marketing plans as three, well-written stories and make sure you ask the end user which of the three marketing plans they prefer for further implementation."
     )
 
-    response = lmm_model.generate_content(contents=[prompt])
 
-    return response.text
+@traced_tool
+def marketing_agent(matchmaker_output: str, num_concepts: int = 3) -> str:
+    """
+    Calls the LMM (GenerativeModel) to create three marketing concepts for social media posts for Instagram, both image and video.
+    Each concept includes: a marketing plan, a funny tagline, and the product name.
+    Returns a dictionary of concepts.
+    """
+    lmm_model = get_generative_model(get_route("marketing").model)
+    prompt = _build_marketing_prompt(matchmaker_output, num_concepts)
+
+    if not plan_caching_enabled():
+        return traced_generate_content(lmm_model, prompt)
+    return _llm_cache.get_or_set(
+        cache_key(lmm_model.model_name, prompt),
+        lambda: traced_generate_content(lmm_model, prompt),
+    )
+
+
+def _chunk_text(chunk: Any) -> str | None:
+    """Text of a streamed chunk, or None for chunks without text (e.g. only usage)."""
+    try:
+        return getattr(chunk, "text", None)
+    except ValueError:
+        # The .text accessor raises when the chunk has no text parts.
+        return None
+
+
+class MarketingPlanStreamAgent(google.adk.agents.BaseAgent):
+    """
+    Streaming variant of marketing_agent.
+
+    Reads the matchmaker output from session state and forwards the plans chunk by
+    chunk as partial events, so with StreamingMode.SSE the runner sends the first
+    tokens to the client while the rest of the plans are still being generated. The
+    complete text is emitted as a final event and stored in state, after which the
+    speculative image renders start (see app/speculative_media.py).
+    """
+
+    num_concepts: int = 3
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        lmm_model = get_generative_model(get_route("marketing").model)
+        prompt = _build_marketing_prompt(
+            str(ctx.session.state.get("matches", "[]")), self.num_concepts
+        )
+        key = cache_key(lmm_model.model_name, prompt)
+        caching = plan_caching_enabled()
+
+        plans = _llm_cache.get(key) if caching else None
+        if plans is None:
+            chunks = []
+            usage_metadata = None
+            streaming = (
+                ctx.run_config is not None
+                and ctx.run_config.streaming_mode == StreamingMode.SSE
+            )
+            with model_span(lmm_model.model_name, current=False) as span:
+                span.set_attribute("gen_ai.request.bytes", payload_size(prompt))
+                response = await lmm_model.generate_content_async(
+                    contents=[prompt], stream=True
+                )
+                async for chunk in response:
+                    # The last chunk carries the usage of the whole response.
+                    usage_metadata = (
+                        getattr(chunk, "usage_metadata", None) or usage_metadata
+                    )
+                    text = _chunk_text(chunk)
+                    if not text:
+                        continue
+                    chunks.append(text)
+                    if streaming:
+                        yield Event(
+                            invocation_id=ctx.invocation_id,
+                            author=self.name,
+                            branch=ctx.branch,
+                            partial=True,
+                            content=types.Content(
+                                role="model", parts=[types.Part(text=text)]
+                            ),
+                        )
+                plans = "".join(chunks)
+                record_usage(span, usage_metadata)
+                span.set_attribute("gen_ai.response.bytes", payload_size(plans))
+            if caching:
+                _llm_cache.set(key, plans)
+
+        # The speculative renders are kept under the id reuse_speculative_images reads.
+        session_checkpoint_id = (
+            ctx.session.state.get(CHECKPOINT_ID_KEY) or new_checkpoint_id()
+        )
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=plans)]),
+            actions=EventActions(
+                state_delta={
+                    "marketing_plans": plans,
+                    CHECKPOINT_ID_KEY: session_checkpoint_id,
+                }
+            ),
+        )
+        # With SPECULATIVE_IMAGES the images render while the user picks a plan.
+        speculate_images(session_checkpoint_id, plans)
+
+
+marketing_plan_stream_agent = MarketingPlanStreamAgent(
+    name="marketing_plan_agent",
+    description="Writes three marketing plans for the current matches and streams them to the user.",
+)
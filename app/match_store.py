@@ -0,0 +1,192 @@
+import json
+import logging
+import threading
+import time
+from collections.abc import Mapping, Sequence
+from typing import Any
+
+from app.product_index import product_id, row_hash
+from app.utils.cache import cache_path, open_connection
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(text: Any) -> str:
+    return " ".join(str(text).lower().split())
+
+
+def trend_key(trend: Mapping[str, Any]) -> str:
+    """Normalized trend title, so "Jimmy Fallon " and "jimmy fallon" are the same trend."""
+    return _normalize(trend.get("trend_title", ""))
+
+
+def unknown_pair_groups(
+    products: list[dict[str, Any]],
+    trends: list[dict[str, Any]],
+    known: Mapping[tuple[str, str], Any],
+) -> list[tuple[list[dict[str, Any]], list[dict[str, Any]]]]:
+    """
+    Groups the (product, trend) pairs missing from known into product-by-trend grids.
+
+    Products that miss the same trends share a group, so a new trend is one group of
+    every product and a changed product is one group with every trend. Evaluating the
+    groups covers exactly the unknown pairs.
+
+    Args:
+        products: Product rows.
+        trends: Trends that passed the sensitive content filter.
+        known: Pairs already evaluated, as returned by MatchStore.known_pairs.
+
+    Returns:
+        list[tuple[list, list]]: (products, trends) per group.
+    """
+    groups: dict[
+        tuple[str, ...], tuple[list[dict[str, Any]], list[dict[str, Any]]]
+    ] = {}
+    for row in products:
+        missing = [
+            trend
+            for trend in trends
+            if (product_id(row), trend_key(trend)) not in known
+        ]
+        if missing:
+            key = tuple(trend_key(trend) for trend in missing)
+            groups.setdefault(key, ([], missing))[0].append(row)
+    return list(groups.values())
+
+
+class MatchStore:
+    """
+    Persistent record of every (product id, trend key) pair the matchmaker evaluated.
+
+    Each pair stores the content hash of the product row it was evaluated against, so a
+    product whose data changed is re-evaluated while untouched pairs are reused. Trends
+    remember whether they passed the sensitive content filter. The tables live in the
+    shared SQLite file of app/utils/cache.py, so all workers on a host see one store.
+    """
+
+    def __init__(self, path: str | None = None) -> None:
+        self.path = path or cache_path()
+        self._local = threading.local()
+
+    def _connection(self) -> Any:
+        """Returns this thread's connection, creating the tables on first use."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = open_connection(self.path)
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS match_trends ("
+                " trend_key TEXT PRIMARY KEY,"
+                " allowed INTEGER NOT NULL,"
+                " evaluated_at REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS match_pairs ("
+                " product_id TEXT NOT NULL,"
+                " trend_key TEXT NOT NULL,"
+                " product_hash TEXT NOT NULL,"
+                " result TEXT,"
+                " evaluated_at REAL NOT NULL,"
+                " PRIMARY KEY (product_id, trend_key))"
+            )
+            self._local.connection = connection
+        return connection
+
+    def trend_verdicts(self, trends: list[dict[str, Any]]) -> dict[str, bool]:
+        """Returns the stored filter verdict of every already-evaluated trend."""
+        keys = [trend_key(trend) for trend in trends]
+        rows = self._connection().execute(
+            "SELECT trend_key, allowed FROM match_trends"
+            f" WHERE trend_key IN ({','.join('?' * len(keys))})",
+            keys,
+        )
+        return {key: bool(allowed) for key, allowed in rows}
+
+    def record_trend_verdicts(
+        self, trends: list[dict[str, Any]], allowed: list[dict[str, Any]]
+    ) -> None:
+        """Stores which of the evaluated trends passed the sensitive content filter."""
+        allowed_keys = {trend_key(trend) for trend in allowed}
+        now = time.time()
+        self._connection().executemany(
+            "INSERT OR REPLACE INTO match_trends VALUES (?, ?, ?)",
+            [
+                (trend_key(trend), trend_key(trend) in allowed_keys, now)
+                for trend in trends
+            ],
+        )
+
+    def known_pairs(
+        self, products: list[dict[str, Any]], trends: list[dict[str, Any]]
+    ) -> dict[tuple[str, str], dict[str, Any] | None]:
+        """
+        Returns the stored result of every pair that is still valid.
+
+        A pair is valid when it was evaluated against the current version of the
+        product row. The value is the match dict, or None for "evaluated, no match".
+        """
+        current_hashes = {product_id(row): row_hash(row) for row in products}
+        keys = {trend_key(trend) for trend in trends}
+        rows = self._connection().execute(
+            "SELECT product_id, trend_key, product_hash, result FROM match_pairs"
+            f" WHERE product_id IN ({','.join('?' * len(current_hashes))})",
+            list(current_hashes),
+        )
+        return {
+            (pid, key): json.loads(result) if result else None
+            for pid, key, product_hash, result in rows
+            if key in keys and current_hashes[pid] == product_hash
+        }
+
+    def record_pairs(
+        self,
+        products: list[dict[str, Any]],
+        trends: list[dict[str, Any]],
+        matches: Sequence[Mapping[str, Any]],
+    ) -> list[Mapping[str, Any]]:
+        """
+        Stores the outcome of evaluating every product against every trend given.
+
+        Matches are attributed to a product by product_id, or else by product name
+        ignoring case and spacing. Matches naming a product or trend that was not
+        evaluated are dropped, so they can neither be stored nor shown.
+
+        Returns:
+            list: The matches that were stored.
+        """
+        ids = {product_id(row) for row in products}
+        ids_by_name = {
+            _normalize(row.get("product_name")): product_id(row) for row in products
+        }
+        trend_keys = {trend_key(trend) for trend in trends}
+        matched: dict[tuple[str, str], Mapping[str, Any]] = {}
+        for match in matches:
+            pid = str(match.get("product_id"))
+            if pid not in ids:
+                pid = ids_by_name.get(_normalize(match.get("product_name")), "")
+            if not pid or trend_key(match) not in trend_keys:
+                logger.warning(
+                    f"Dropping match of unknown product or trend: "
+                    f"{match.get('product_name')!r} / {match.get('trend_title')!r}"
+                )
+                continue
+            matched[(pid, trend_key(match))] = match
+
+        now = time.time()
+        self._connection().executemany(
+            "INSERT OR REPLACE INTO match_pairs VALUES (?, ?, ?, ?, ?)",
+            [
+                (
+                    product_id(row),
+                    trend_key(trend),
+                    row_hash(row),
+                    json.dumps(matched[(product_id(row), trend_key(trend))])
+                    if (product_id(row), trend_key(trend)) in matched
+                    else None,
+                    now,
+                )
+                for row in products
+                for trend in trends
+            ],
+        )
+        return list(matched.values())
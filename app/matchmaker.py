@@ -1,17 +1,65 @@
-import json
 import logging
 import os
+from collections.abc import Mapping
+from typing import Any
 
 import google.auth
 import google.generativeai as genai
 from dotenv import load_dotenv
 from google.generativeai import GenerativeModel
+from typing_extensions import TypedDict
+
+from app.match_store import MatchStore, trend_key, unknown_pair_groups
+from app.product_index import shortlist_products
+from app.utils import codec
+from app.utils.cache import SharedCache, cache_key
+from app.utils.clients import get_generative_model
+from app.utils.llm_output import extract_json_array
+from app.utils.model_routing import get_route
+from app.utils.telemetry import traced_generate_content, traced_tool
 
-logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+# Identical prompts (same trends, products and matches) are answered once per TTL for all workers.
+_llm_cache = SharedCache(
+    "llm_responses", ttl_seconds=float(os.environ.get("LLM_CACHE_TTL_SECONDS", 3600))
+)
+
+# Every (product, trend) pair evaluated so far; only new trends and changed products go to the LLM.
+_match_store = MatchStore()
+
+MATCHMAKER_MODES = ("agent", "sequential", "fused")
+
+
+class Match(TypedDict):
+    product_name: str
+    trend_title: str
+    trend_description: str
+    similarity_description: str
+
+
+class FusedMatchResult(TypedDict):
+    sensitive_trend_titles: list[str]
+    matches: list[Match]
+
+
+def matchmaker_mode() -> str:
+    """Returns the configured matchmaker implementation (MATCHMAKER_MODE).
+
+    - agent: LlmAgent orchestrator driving a filter agent, a matcher agent and get_product_data
+    - sequential: this module, one filter call followed by one matching call
+    - fused: this module, filtering and matching in a single schema-constrained call
+    """
+    mode = os.environ.get("MATCHMAKER_MODE", "agent")
+    if mode not in MATCHMAKER_MODES:
+        raise ValueError(
+            f"MATCHMAKER_MODE must be one of {MATCHMAKER_MODES}, got {mode!r}"
+        )
+    return mode
+
+
 # The user has a .env file, so let's use environment variables for the API key.
 if os.getenv("GEMINI_API_KEY"):
     genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
@@ -21,27 +69,8 @@ else:
     os.environ.setdefault("GOOGLE_CLOUD_PROJECT", project_id)
 
 
-def matchmaker_agent(product_dataframe_str: str, trends_news_dataframe_str: str) -> str:
-    """
-    Matches products to trending topics and news for marketing purposes.
-
-    Args:
-        product_dataframe_str (str): JSON string of product data.
-        trends_news_dataframe_str (str): JSON string of trends and news data.
-
-    Returns:
-        list[dict]: Each dict contains:
-            - product_name (str)
-            - trend_title (str)
-            - trend_description (str)
-            - similarity_description (str)
-        Returns an empty list if no matches are found or on error.
-    """
-    logger.info("Starting matchmaker_agent function.")
-
-    model = GenerativeModel("gemini-2.5-flash")
-    logger.info("Initialized generative model.")
-
+def _filter_sensitive_trends(model: GenerativeModel, trends_json: str) -> list:
+    """Asks the model to drop sensitive trends and returns the remaining ones."""
     system_prompt_sentiment = f"""You will receive a response from the model that should be a JSON array of news/trends.
 
     You are to delete the sensitive subjects from the json. Sensitive content is defined as any content that could be considered:
@@ -55,19 +84,27 @@ def matchmaker_agent(product_dataframe_str: str, trends_news_dataframe_str: str)
     - culturally sensitive
     - otherwise inappropriate
 
-    This will be your dataset to consider: {trends_news_dataframe_str}
+    This will be your dataset to consider: {trends_json}
 
     IMPORTANT: Only return the json array, nothing else. Do not add any explanations or additional text.
     """
 
     logger.info("Sending prompt to model for sensitive subject filtering.")
-    news_without_sensitive_subjects = model.generate_content(
-        contents=[system_prompt_sentiment]
+    news_without_sensitive_subjects = _llm_cache.get_or_set(
+        cache_key(model.model_name, system_prompt_sentiment),
+        lambda: traced_generate_content(model, system_prompt_sentiment),
     )
     logger.info("Received filtered news/trends from model.")
 
-    filtered_news_obj = json.loads(news_without_sensitive_subjects.text)
-    trends_news_dataframe_str = json.dumps(filtered_news_obj)
+    return extract_json_array(news_without_sensitive_subjects) or []
+
+
+def _match_products_to_trends(
+    model: GenerativeModel, products: list, trends: list
+) -> list:
+    """Asks the model for funny product-trend matches and returns them."""
+    product_dataframe_str = codec.dumps(products)
+    trends_news_dataframe_str = codec.dumps(trends)
 
     system_prompt_matching = f"""You are a witty content strategist. Your task is to find creative, funny, and compelling connections between products and trending news items using the provided dataframes.
 
@@ -91,9 +128,218 @@ def matchmaker_agent(product_dataframe_str: str, trends_news_dataframe_str: str)
     """
 
     logger.info("Sending prompt to model for product-news matching.")
-    response_matching_process = model.generate_content(
-        contents=[system_prompt_matching]
+    response_matching_process = _llm_cache.get_or_set(
+        cache_key(model.model_name, system_prompt_matching),
+        lambda: traced_generate_content(model, system_prompt_matching),
     )
     logger.info("Received matching response from model.")
 
-    return response_matching_process.text
+    return extract_json_array(response_matching_process) or []
+
+
+def _fused_filter_and_match(
+    model: GenerativeModel, products: list, trends_json: str
+) -> FusedMatchResult:
+    """Filters sensitive trends and matches products to the rest in one structured call."""
+    product_dataframe_str = codec.dumps(products)
+
+    system_prompt_fused = f"""You are a witty content strategist. Your task is to find creative, funny, and compelling connections between products and trending news items using the provided dataframes.
+
+    You receive two dataframes in JSON format: one with products, and one with Google trends and news articles.
+    product_dataframe_str: {product_dataframe_str}
+    trends_news_dataframe_str: {trends_json}
+
+    First, list in sensitive_trend_titles the trend_title of every trend that could be considered:
+    - violent
+    - sexual
+    - hateful
+    - discriminatory
+    - racist
+    - politically sensitive
+    - religiously sensitive
+    - culturally sensitive
+    - otherwise inappropriate
+    Never match products to those trends.
+
+    Then critically evaluate each possible match with the remaining trends. Only create a match if there is a clear, logical, and relevant and funny connection between the product and the news/trend item. Avoid forced or nonsensical matches. Do not match items that have no meaningful or interesting relationship.
+
+    For each match, provide:
+    - product_name
+    - trend_title
+    - trend_description
+    - similarity_description: Describe a clear, interesting, and humorous similarity or angle that specifically mentions both the product and the news item. The connection should be amusing and inspire content creators to use it.
+
+    IMPORTANT:
+    - Only use the data provided, do not make up any data.
+    - Do not make more than 10 matches.
+    - If no good matches exist, return an empty matches array.
+    """
+
+    logger.info("Sending fused prompt to model for filtering and matching.")
+    response_fused = _llm_cache.get_or_set(
+        cache_key(model.model_name, "fused", system_prompt_fused),
+        lambda: traced_generate_content(
+            model,
+            system_prompt_fused,
+            generation_config=genai.GenerationConfig(
+                response_mime_type="application/json",
+                response_schema=FusedMatchResult,
+            ),
+        ),
+    )
+    logger.info("Received fused filtering and matching response from model.")
+
+    return codec.loads(response_fused)
+
+
+def match_products(
+    product_dataframe_str: str, trends_news_dataframe_str: str, fused: bool = False
+) -> list:
+    """
+    Matches products to trends, reusing every pair already in the match store.
+
+    Only trends that have not been seen before and products whose data changed are sent
+    to the model, so the number of LLM calls scales with what changed since the last
+    refresh. With fused=True the sensitive-content filter and the matching share one
+    schema-constrained call instead of two sequential ones.
+    """
+    model = get_generative_model(get_route("matchmaker").model)
+    logger.info("Initialized generative model.")
+
+    products = extract_json_array(product_dataframe_str) or []
+    trends = extract_json_array(trends_news_dataframe_str)
+    if trends is None:
+        # Unstructured trend output: evaluate it as a whole, without the match store.
+        if fused:
+            return _fused_filter_and_match(model, products, trends_news_dataframe_str)[
+                "matches"
+            ]
+        trends = _filter_sensitive_trends(model, trends_news_dataframe_str)
+        _match_store.record_trend_verdicts(trends, trends)
+        unseen_trends = []
+    else:
+        verdicts = _match_store.trend_verdicts(trends)
+        unseen_trends = [trend for trend in trends if trend_key(trend) not in verdicts]
+        if unseen_trends and not fused:
+            allowed_trends = _filter_sensitive_trends(model, codec.dumps(unseen_trends))
+            _match_store.record_trend_verdicts(unseen_trends, allowed_trends)
+            verdicts = _match_store.trend_verdicts(trends)
+            unseen_trends = []
+        trends = [
+            trend
+            for trend in trends
+            if verdicts.get(trend_key(trend)) or trend in unseen_trends
+        ]
+
+    # Only send the products closest to each trend, so the prompt stays small for large catalogs.
+    products = shortlist_products(products, trends)
+    return _match_unknown_pairs(model, products, trends, fused, unseen_trends)
+
+
+def _match_unknown_pairs(
+    model: GenerativeModel,
+    products: list,
+    trends: list,
+    fused: bool = False,
+    unseen_trends: list | None = None,
+) -> list:
+    """
+    Evaluates only the (product, trend) pairs missing from the match store.
+
+    The unknown pairs are split into product-by-trend groups (see unknown_pair_groups)
+    with one model call each. With fused=True every call also filters the trends and
+    the verdicts on unseen_trends are stored.
+
+    Returns:
+        list: New and reused matches, at most 10.
+    """
+    known_pairs = _match_store.known_pairs(products, trends)
+    groups = unknown_pair_groups(products, trends, known_pairs)
+    logger.info(
+        f"Reusing {len(known_pairs)} known pairs, evaluating "
+        f"{sum(len(p) * len(t) for p, t in groups)} pairs in {len(groups)} calls."
+    )
+
+    new_matches: list[Mapping[str, Any]] = []
+    sensitive_keys: set[str] = set()
+    for group_products, group_trends in groups:
+        if fused:
+            result = _fused_filter_and_match(
+                model, group_products, codec.dumps(group_trends)
+            )
+            sensitive_keys |= {
+                trend_key({"trend_title": title})
+                for title in result["sensitive_trend_titles"]
+            }
+            group_trends = [
+                t for t in group_trends if trend_key(t) not in sensitive_keys
+            ]
+            matches: list = result["matches"]
+        else:
+            matches = _match_products_to_trends(model, group_products, group_trends)
+        new_matches += _match_store.record_pairs(group_products, group_trends, matches)
+
+    if fused and groups and unseen_trends:
+        _match_store.record_trend_verdicts(
+            unseen_trends,
+            [t for t in unseen_trends if trend_key(t) not in sensitive_keys],
+        )
+    reused_matches = [match for match in known_pairs.values() if match]
+    return [
+        match
+        for match in new_matches + reused_matches
+        if trend_key(match) not in sensitive_keys
+    ][:10]
+
+
+@traced_tool
+def match_filtered_trends(product_dataframe_str: str, trends_json: str) -> str:
+    """
+    Matches products to trends that already passed the sensitive content filter.
+
+    Pairs evaluated in earlier sessions are reused from the match store; only new
+    trends and changed products are sent to the model.
+
+    Args:
+        product_dataframe_str (str): JSON string of product data.
+        trends_json (str): JSON array of the filtered trends and news data.
+
+    Returns:
+        str: JSON array of matches, each with product_name, trend_title,
+        trend_description and similarity_description.
+    """
+    model = get_generative_model(get_route("matchmaker").model)
+    products = extract_json_array(product_dataframe_str) or []
+    trends = extract_json_array(trends_json)
+    if trends is None:
+        # Unstructured trend output cannot be keyed per trend: match it as a whole.
+        return codec.dumps(_match_products_to_trends(model, products, [trends_json]))
+    return codec.dumps(_match_unknown_pairs(model, products, trends))
+
+
+@traced_tool
+def matchmaker_agent(product_dataframe_str: str, trends_news_dataframe_str: str) -> str:
+    """
+    Matches products to trending topics and news for marketing purposes.
+
+    Args:
+        product_dataframe_str (str): JSON string of product data.
+        trends_news_dataframe_str (str): JSON string of trends and news data.
+
+    Returns:
+        list[dict]: Each dict contains:
+            - product_name (str)
+            - trend_title (str)
+            - trend_description (str)
+            - similarity_description (str)
+        Returns an empty list if no matches are found or on error.
+    """
+    logger.info("Starting matchmaker_agent function.")
+
+    return codec.dumps(
+        match_products(
+            product_dataframe_str,
+            trends_news_dataframe_str,
+            fused=matchmaker_mode() == "fused",
+        )
+    )
@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import os
+import time
+from collections.abc import Callable
+
+import google.auth
+from google.adk.runners import InMemoryRunner
+from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset
+from google.auth.transport.requests import Request
+from google.genai import types
+
+from app import imagen_creative
+from app.product_data_retriever import GCP_PROJECT_ID, get_product_data
+from app.product_index import get_product_index
+from app.trend_watcher_agent import (
+    google_trends_agent,
+    trend_cache,
+    trend_watcher_agent,
+    trend_window,
+)
+from app.utils.clients import get_bigquery_client
+from app.utils.gcs import get_storage_client
+from app.utils.logging_config import configure_logging
+
+logger = logging.getLogger(__name__)
+
+
+def _refresh_credentials() -> None:
+    """Fetch application default credentials and their first access token."""
+    credentials, _ = google.auth.default()
+    credentials.refresh(Request())
+
+
+def _build_clients() -> None:
+    """Construct the shared clients the tools use, paying import and discovery costs now."""
+    get_bigquery_client(GCP_PROJECT_ID)
+    get_storage_client()
+
+
+def _preload_product_catalog() -> None:
+    """Run the catalog query once so the shared product cache is warm."""
+    get_product_data()
+
+
+def _load_product_index() -> None:
+    """Memory-map the product embedding index, if one has been built."""
+    get_product_index()
+
+
+def _install_mcp_server() -> None:
+    """
+    Install the Google News Trends MCP server into the uvx cache.
+
+    The server is started once to list its tools and then closed again, so the
+    first session still starts its own server process; only the package download
+    and install are saved.
+    """
+
+    async def _list_tools() -> None:
+        for tool in google_trends_agent.tools:
+            if isinstance(tool, MCPToolset):
+                await tool.get_tools()
+                await tool.close()
+
+    asyncio.run(_list_tools())
+
+
+def _prime_trend_cache() -> None:
+    """Run the trend watcher once for the current window unless a worker already did."""
+    if trend_cache.get(trend_window()) is not None:
+        return
+
+    async def _run_trend_watcher() -> None:
+        runner = InMemoryRunner(agent=trend_watcher_agent, app_name="prewarm")
+        session = await runner.session_service.create_session(
+            app_name="prewarm", user_id="prewarm"
+        )
+        message = types.Content(
+            role="user",
+            parts=[types.Part.from_text(text="find current trending topics")],
+        )
+        async for _ in runner.run_async(
+            user_id="prewarm", session_id=session.id, new_message=message
+        ):
+            pass
+
+    asyncio.run(_run_trend_watcher())
+
+
+def _open_connections() -> None:
+    """Open the TLS connection to Vertex AI used by the creative tools."""
+    imagen_creative.client.models.get(model="gemini-2.5-flash")
+
+
+# Ordered: later steps reuse the credentials and clients built by earlier ones.
+PREWARM_STEPS: dict[str, Callable[[], None]] = {
+    "credentials": _refresh_credentials,
+    "clients": _build_clients,
+    "product_catalog": _preload_product_catalog,
+    "product_index": _load_product_index,
+    "mcp_install": _install_mcp_server,
+    "trend_cache": _prime_trend_cache,
+    "connections": _open_connections,
+}
+
+
+def prewarm_enabled() -> bool:
+    """Whether set_up should run the warm-up phase (PREWARM_ON_SETUP=true)."""
+    return os.environ.get("PREWARM_ON_SETUP", "false").lower() in ("1", "true", "yes")
+
+
+def prewarm(steps: list[str] | None = None) -> dict[str, float]:
+    """
+    Runs the warm-up steps and returns how long each one took, in milliseconds.
+
+    A failing step is logged and skipped so a slow or unavailable dependency never
+    blocks the worker from starting.
+
+    Args:
+        steps: Names from PREWARM_STEPS to run. Defaults to the comma-separated
+            PREWARM_STEPS environment variable, then to every step.
+
+    Returns:
+        dict[str, float]: Duration per step; failed steps are reported as -1.
+    """
+    configure_logging()
+    if steps is None:
+        configured = os.environ.get("PREWARM_STEPS")
+        steps = configured.split(",") if configured else list(PREWARM_STEPS)
+
+    timings = {}
+    for name in steps:
+        started_at = time.perf_counter()
+        try:
+            PREWARM_STEPS[name]()
+            timings[name] = round((time.perf_counter() - started_at) * 1000, 1)
+        except Exception:
+            logger.exception(f"Prewarm step {name} failed")
+            timings[name] = -1.0
+        logger.info(f"Prewarm step {name}: {timings[name]} ms")
+    return timings
@@ -1,12 +1,32 @@
 import datetime
-import json
+import logging
+import os
+from collections.abc import Iterable
 from typing import Any
 
-from google.cloud import bigquery
+from app.utils import codec
+from app.utils.cache import SharedCache
+from app.utils.clients import get_bigquery_client
+from app.utils.telemetry import set_attributes, traced_tool
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # Optional: without pyarrow rows are serialized one by one.
+    pa = None
+
+logger = logging.getLogger(__name__)
 
 GCP_PROJECT_ID = "qwiklabs-gcp-03-3444594577c6"
 BQ_DATASET = "product_data"
 BQ_TABLE = "product_data_table"
+# Products fetched when the caller does not pass a limit.
+DEFAULT_PRODUCT_LIMIT = 5
+
+# Shared by all workers on the replica; the catalog changes far less often than sessions start.
+_product_cache = SharedCache(
+    "products", ttl_seconds=float(os.environ.get("PRODUCT_CACHE_TTL_SECONDS", 600))
+)
 
 
 def _serialize_date(obj: Any) -> Any:
@@ -18,11 +38,12 @@ def _serialize_date(obj: Any) -> Any:
     return obj
 
 
+@traced_tool
 def get_product_data(
     project: str = GCP_PROJECT_ID,
     dataset: str = BQ_DATASET,
     table: str = BQ_TABLE,
-    limit: int = 5,
+    limit: int = DEFAULT_PRODUCT_LIMIT,
 ) -> str:
     """Get all product data from BigQuery as a JSON string.
 
@@ -36,29 +57,103 @@ def get_product_data(
         str: A JSON string containing the product data records.
     """
 
-    print("Getting product data")
+    query = f"SELECT * FROM `{project}.{dataset}.{table}` LIMIT {limit}"
+    return _product_cache.get_or_set(query, lambda: _query_product_data(project, query))
 
-    client = bigquery.Client(project=project)
 
-    query = f"SELECT * FROM `{project}.{dataset}.{table}` LIMIT {limit}"
+def _query_product_data(project: str, query: str) -> str:
+    """Run the product query against BigQuery and serialize the rows to JSON."""
+
+    client = get_bigquery_client(project)
+
     query_job = client.query(query)
     results = query_job.result()
-
-    print("Got results")
+    set_attributes(
+        {
+            "bigquery.bytes_processed": query_job.total_bytes_processed,
+            "bigquery.bytes_billed": query_job.total_bytes_billed,
+            "bigquery.cache_hit": query_job.cache_hit,
+            "bigquery.rows": results.total_rows,
+        }
+    )
+
+    if pa is not None:
+        products_json = arrow_to_json(results.to_arrow(create_bqstorage_client=False))
+    else:
+        products_json = rows_to_json(results)
+
+    logger.info(
+        f"Fetched {results.total_rows} products",
+        extra={
+            "bigquery_bytes_processed": query_job.total_bytes_processed,
+            "columnar": pa is not None,
+        },
+    )
+    return products_json
+
+
+def rows_to_json(rows: Iterable[Any]) -> str:
+    """Serialize BigQuery rows to a JSON array of objects, one row at a time."""
 
     # Convert BigQuery Row objects to dictionaries and serialize dates
     products = []
-    for row in results:
+    for row in rows:
         # Convert Row to dict
         row_dict = dict(row)
         # Serialize any date objects
         serialized_row = {k: _serialize_date(v) for k, v in row_dict.items()}
         products.append(serialized_row)
 
-    print("Done getting product data")
-
     # Convert to JSON string (compact format to avoid function call truncation)
-    return json.dumps(products)
+    return codec.dumps(products)
+
+
+def _isoformat(column: Any) -> Any:
+    """Formats a timestamp or time column like datetime.isoformat(), in one kernel pass.
+
+    Like isoformat(), microseconds are only written when they are not zero and
+    offsets are written as +HH:MM.
+    """
+    if pa.types.is_timestamp(column.type):
+        tz = column.type.tz
+        strings = pc.strftime(
+            column.cast(pa.timestamp("us", tz)),
+            format="%Y-%m-%dT%H:%M:%S%z" if tz else "%Y-%m-%dT%H:%M:%S",
+        )
+        strings = pc.replace_substring_regex(
+            strings, pattern=r"([+-]\d{2})(\d{2})$", replacement=r"\1:\2"
+        )
+    else:
+        strings = column.cast(pa.time64("us")).cast(pa.string())
+    return pc.replace_substring_regex(strings, pattern=r"\.000000", replacement="")
+
+
+def arrow_to_json(table: "pa.Table") -> str:
+    """Serialize an Arrow table to the same JSON array of objects as rows_to_json.
+
+    Date, time and timestamp columns are converted to the ISO 8601 strings of
+    date.isoformat() and NUMERIC columns to floats with one compute kernel per
+    column, so no Row object is built and no cell goes through _serialize_date. The
+    records are written by the same codec as rows_to_json, so the output is
+    identical for the same data.
+
+    Args:
+        table (pyarrow.Table): Query results, e.g. from RowIterator.to_arrow().
+
+    Returns:
+        str: A JSON string containing the records.
+    """
+    columns = []
+    for column in table.columns:
+        if pa.types.is_timestamp(column.type) or pa.types.is_time(column.type):
+            column = _isoformat(column)
+        elif pa.types.is_date(column.type):
+            column = column.cast(pa.string())
+        elif pa.types.is_decimal(column.type):
+            column = column.cast(pa.float64())
+        columns.append(column)
+    table = pa.Table.from_arrays(columns, names=table.column_names)
+    return codec.dumps(table.to_pylist())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,348 @@
+import functools
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from typing import Any
+
+import numpy as np
+from google.genai import types
+
+from app.product_data_retriever import get_product_data
+from app.utils import codec
+from app.utils.clients import get_genai_client
+from app.utils.llm_output import extract_json_array
+from app.utils.logging_config import configure_logging
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = "text-embedding-005"
+# Vertex AI accepts at most 250 inputs per embedding request.
+EMBEDDING_BATCH_SIZE = 100
+DEFAULT_INDEX_DIR = os.path.join(tempfile.gettempdir(), "trend-marketeer-product-index")
+# File in the index directory naming the published version directory.
+CURRENT_POINTER = "CURRENT"
+# Published versions kept on disk: the current one and the one before it.
+KEPT_VERSIONS = 2
+
+
+def index_dir() -> str:
+    """Returns the directory holding the published index versions."""
+    return os.environ.get("PRODUCT_INDEX_DIR", DEFAULT_INDEX_DIR)
+
+
+def product_id(row: dict[str, Any]) -> str:
+    """Returns the identifier of a product row (product_id, falling back to product_name)."""
+    return str(row.get("product_id", row.get("product_name")))
+
+
+def row_hash(row: dict[str, Any]) -> str:
+    """Content hash used to detect products whose data changed since the last build."""
+    return hashlib.sha256(json.dumps(row, sort_keys=True).encode()).hexdigest()
+
+
+def _row_text(row: dict[str, Any]) -> str:
+    """Flattens a product row into the text that gets embedded."""
+    return "\n".join(f"{key}: {value}" for key, value in row.items() if value)
+
+
+def _embed_texts(texts: list[str], task_type: str) -> np.ndarray:
+    """Embeds texts in batches and returns an L2-normalized float32 matrix."""
+    client = get_genai_client()
+    vectors: list[list[float]] = []
+    for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+        batch: list[types.ContentUnion] = [*texts[start : start + EMBEDDING_BATCH_SIZE]]
+        response = client.models.embed_content(
+            model=EMBEDDING_MODEL,
+            contents=batch,
+            config=types.EmbedContentConfig(task_type=task_type),
+        )
+        vectors.extend(
+            embedding.values or [] for embedding in response.embeddings or []
+        )
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+class ProductIndex:
+    """
+    Product embeddings stored as a memory-mapped float32 matrix plus an ID map.
+
+    Rows are L2-normalized at build time, so cosine similarity is a single matrix
+    product. The matrix is opened with mmap_mode="r": loading is zero-copy and every
+    worker on the host shares the same page cache.
+
+    Every build is written to its own version directory and published by replacing
+    the CURRENT pointer file, so a reader always sees a matrix and ID map of the
+    same build.
+    """
+
+    def __init__(
+        self,
+        embeddings: np.ndarray,
+        ids: list[str],
+        hashes: list[str],
+        rows: list[dict[str, Any]] | None = None,
+        model: str = EMBEDDING_MODEL,
+    ):
+        self.embeddings = embeddings
+        self.ids = ids
+        self.hashes = hashes
+        self.rows = rows or []
+        self.model = model
+
+    @property
+    def dim(self) -> int:
+        return int(self.embeddings.shape[1]) if self.embeddings.ndim == 2 else 0
+
+    @classmethod
+    def load(cls, path: str | None = None) -> "ProductIndex | None":
+        """Opens the published index in path, or returns None when none has been built yet."""
+        path = path or index_dir()
+        try:
+            with open(os.path.join(path, CURRENT_POINTER)) as f:
+                version_dir = os.path.join(path, f.read().strip())
+            with open(os.path.join(version_dir, "ids.json")) as f:
+                id_map = json.load(f)
+        except FileNotFoundError:
+            return None
+        embeddings = np.load(os.path.join(version_dir, "embeddings.npy"), mmap_mode="r")
+        return cls(
+            embeddings,
+            id_map["ids"],
+            id_map["hashes"],
+            rows=id_map.get("rows"),
+            model=id_map.get("model", ""),
+        )
+
+    def top_k(self, query_vectors: np.ndarray, k: int) -> list[list[tuple[str, float]]]:
+        """
+        Returns the k most similar products for each query vector.
+
+        Args:
+            query_vectors: L2-normalized (n_queries, dim) matrix.
+            k: Number of products to return per query.
+
+        Returns:
+            list[list[tuple[str, float]]]: Per query, (product id, cosine score)
+            pairs ordered by descending score.
+        """
+        if not self.ids:
+            return [[] for _ in range(len(query_vectors))]
+        k = min(k, len(self.ids))
+        scores = query_vectors @ self.embeddings.T
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1)
+        ranked = np.take_along_axis(candidates, order, axis=1)
+        return [
+            [(self.ids[i], float(scores[q, i])) for i in row]
+            for q, row in enumerate(ranked)
+        ]
+
+
+def _publish(path: str, embeddings: np.ndarray, id_map: dict[str, Any]) -> str:
+    """Writes a new index version and points CURRENT at it in a single rename."""
+    version = f"v{time.time_ns()}"
+    version_dir = os.path.join(path, version)
+    os.makedirs(version_dir)
+    with open(os.path.join(version_dir, "embeddings.npy"), "wb") as f:
+        np.save(f, embeddings)
+    with open(os.path.join(version_dir, "ids.json"), "w") as f:
+        json.dump(id_map, f)
+
+    pointer = os.path.join(path, CURRENT_POINTER)
+    with open(f"{pointer}.tmp", "w") as f:
+        f.write(version)
+    os.replace(f"{pointer}.tmp", pointer)
+
+    # Keep the previous version for workers that still have it memory-mapped.
+    versions = sorted(
+        (name for name in os.listdir(path) if name.startswith("v")),
+        key=lambda name: int(name[1:]),
+    )
+    for name in versions[:-KEPT_VERSIONS]:
+        shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+    return version_dir
+
+
+def build_index(rows: list[dict[str, Any]], path: str | None = None) -> tuple[int, int]:
+    """
+    Builds or incrementally updates the on-disk index for the given product rows.
+
+    Products whose content hash is unchanged keep their stored vector; only new or
+    changed rows are sent to the embedding model, and removed products are dropped.
+    When the stored index was built with another embedding model or vector size,
+    every product is embedded anew. The build is written to a new version directory
+    and published atomically.
+
+    Args:
+        rows: Product rows as returned by get_product_data.
+        path: Target directory, defaults to index_dir().
+
+    Returns:
+        tuple[int, int]: Number of products in the index and number newly embedded.
+    """
+    path = path or index_dir()
+    os.makedirs(path, exist_ok=True)
+    previous = ProductIndex.load(path)
+    if previous is not None and previous.model != EMBEDDING_MODEL:
+        logger.info(
+            f"Product index was built with {previous.model}, re-embedding every product"
+        )
+        previous = None
+
+    ids = [product_id(row) for row in rows]
+    hashes = [row_hash(row) for row in rows]
+    previous_rows = (
+        {
+            key: position
+            for position, key in enumerate(
+                zip(previous.ids, previous.hashes, strict=True)
+            )
+        }
+        if previous is not None
+        else {}
+    )
+    stale = [
+        i
+        for i, key in enumerate(zip(ids, hashes, strict=True))
+        if key not in previous_rows
+    ]
+    fresh_vectors = (
+        _embed_texts([_row_text(rows[i]) for i in stale], "RETRIEVAL_DOCUMENT")
+        if stale
+        else None
+    )
+    if (
+        previous is not None
+        and fresh_vectors is not None
+        and fresh_vectors.shape[1] != previous.dim
+    ):
+        logger.info(
+            f"Embedding size changed from {previous.dim} to {fresh_vectors.shape[1]}, "
+            "re-embedding every product"
+        )
+        previous, previous_rows, stale = None, {}, list(range(len(rows)))
+        fresh_vectors = _embed_texts(
+            [_row_text(row) for row in rows], "RETRIEVAL_DOCUMENT"
+        )
+
+    if fresh_vectors is not None:
+        dim = fresh_vectors.shape[1]
+    else:
+        dim = previous.dim if previous is not None else 0
+    embeddings = np.empty((len(rows), dim), dtype=np.float32)
+    if previous is not None:
+        for i, key in enumerate(zip(ids, hashes, strict=True)):
+            if key in previous_rows:
+                embeddings[i] = previous.embeddings[previous_rows[key]]
+    if fresh_vectors is not None:
+        embeddings[stale] = fresh_vectors
+
+    version_dir = _publish(
+        path,
+        embeddings,
+        {"model": EMBEDDING_MODEL, "ids": ids, "hashes": hashes, "rows": rows},
+    )
+    get_product_index.cache_clear()
+    logger.info(
+        f"Product index at {version_dir}: {len(ids)} products, {len(stale)} embedded"
+    )
+    return len(ids), len(stale)
+
+
+@functools.lru_cache(maxsize=1)
+def get_product_index() -> ProductIndex | None:
+    """Returns the index for this worker, opened once at first use."""
+    return ProductIndex.load()
+
+
+def shortlist_products(
+    products: list[dict[str, Any]], trends: list[dict[str, Any]], k: int = 5
+) -> list[dict[str, Any]]:
+    """
+    Picks the top-k most similar products per trend from the whole indexed catalog.
+
+    Candidates come from the index, not only from products, so a session that
+    fetched a handful of rows is still matched against the full catalog. Rows in
+    products replace the indexed copy of the same product, and products the index
+    does not know yet are kept. Falls back to products when no index has been
+    built, so matching keeps working before the offline job has run.
+
+    Args:
+        products: Product rows the caller already has.
+        trends: Trends to find products for.
+        k: Number of products per trend.
+
+    Returns:
+        list[dict[str, Any]]: The shortlisted product rows.
+    """
+    index = get_product_index()
+    if index is None or not index.rows or not trends:
+        return products
+
+    trend_texts = [
+        f"{trend.get('trend_title', '')}: {trend.get('trend_description', '')}"
+        for trend in trends
+    ]
+    candidates = {
+        pid
+        for ranked in index.top_k(_embed_texts(trend_texts, "RETRIEVAL_QUERY"), k)
+        for pid, _ in ranked
+    }
+    given = {product_id(row): row for row in products}
+    shortlisted = [
+        given.get(product_id(row), row)
+        for row in index.rows
+        if product_id(row) in candidates
+    ]
+    indexed = set(index.ids)
+    shortlisted += [row for pid, row in given.items() if pid not in indexed]
+    logger.info(
+        f"Shortlisted {len(shortlisted)} of {len(index.ids)} indexed products "
+        f"for {len(trends)} trends"
+    )
+    return shortlisted or products
+
+
+def shortlist_product_data(trends_news_dataframe_str: str, k: int = 5) -> str:
+    """
+    Get the products closest to the given trends, from the whole product catalog.
+
+    Use this instead of get_product_data when trends are known: it searches the full
+    catalog, not only the first few products.
+
+    Args:
+        trends_news_dataframe_str (str): JSON string of the trends and news data.
+        k (int, optional): Number of products per trend.
+
+    Returns:
+        str: A JSON string containing the product data records.
+    """
+    products = codec.loads(get_product_data())
+    trends = extract_json_array(trends_news_dataframe_str) or []
+    return codec.dumps(shortlist_products(products, trends, k))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Embed the product catalog into the on-disk product index"
+    )
+    parser.add_argument("--path", default=None, help="Index directory")
+    parser.add_argument(
+        "--limit", type=int, default=100_000, help="Maximum number of products"
+    )
+    args = parser.parse_args()
+
+    configure_logging()
+    total, embedded = build_index(
+        codec.loads(get_product_data(limit=args.limit)), path=args.path
+    )
+    print(f"Indexed {total} products ({embedded} newly embedded)")
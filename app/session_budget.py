@@ -0,0 +1,210 @@
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, fields
+from typing import Any
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.adk.tools import BaseTool, ToolContext
+
+from app.utils.model_routing import reroute_model
+from app.veo_creative import DEFAULT_ASPECT_RATIOS, VEO_MODEL
+
+logger = logging.getLogger(__name__)
+
+BUDGET_STATE_KEY = "session_budget"
+
+DEFAULT_DEADLINE_SECONDS = 900.0
+DEFAULT_TOKEN_LIMIT = 500_000
+DEFAULT_IMAGE_LIMIT = 8
+DEFAULT_VIDEO_LIMIT = 3
+DEFAULT_FALLBACK_MODEL = "gemini-2.5-flash-lite"
+
+# Degradation steps in the order they kick in, with the share of the time or token
+# budget (whichever is used up more) at which they do.
+DEGRADATION_STEPS = (
+    ("fewer_images", 0.7),
+    ("skip_video", 0.85),
+    ("cheaper_model", 0.95),
+)
+
+VIDEO_TOOLS = {"generate_and_show_video", "generate_video_variants"}
+
+
+@dataclass
+class SessionBudget:
+    """
+    Time, tokens and media a session may spend, and what it has spent so far.
+
+    Time is counted while the agent works, not while it waits for the user to pick a
+    plan: each invocation adds the time from its first to its last callback.
+    """
+
+    deadline_seconds: float
+    token_limit: int
+    image_limit: int
+    video_limit: int
+    spent_seconds: float = 0.0
+    tokens_used: int = 0
+    images_used: int = 0
+    videos_used: int = 0
+    invocation_id: str = ""
+    invocation_started_at: float = 0.0
+    last_active_at: float = 0.0
+
+    @classmethod
+    def from_env(cls) -> "SessionBudget":
+        """A new budget set by SESSION_DEADLINE_SECONDS and SESSION_{TOKEN,IMAGE,VIDEO}_LIMIT."""
+        return cls(
+            deadline_seconds=float(
+                os.environ.get("SESSION_DEADLINE_SECONDS", DEFAULT_DEADLINE_SECONDS)
+            ),
+            token_limit=int(os.environ.get("SESSION_TOKEN_LIMIT", DEFAULT_TOKEN_LIMIT)),
+            image_limit=int(os.environ.get("SESSION_IMAGE_LIMIT", DEFAULT_IMAGE_LIMIT)),
+            video_limit=int(os.environ.get("SESSION_VIDEO_LIMIT", DEFAULT_VIDEO_LIMIT)),
+        )
+
+    @classmethod
+    def from_state(cls, state: Any) -> "SessionBudget":
+        """The budget kept in session state, or a new one."""
+        stored = state.get(BUDGET_STATE_KEY)
+        if not stored:
+            return cls.from_env()
+        names = {field.name for field in fields(cls)}
+        return cls(**{key: value for key, value in stored.items() if key in names})
+
+    def save(self, state: Any) -> None:
+        """Writes the budget back to session state."""
+        state[BUDGET_STATE_KEY] = asdict(self)
+
+    def touch(self, invocation_id: str, now: float | None = None) -> None:
+        """Counts the time since the last callback, if it was in the same invocation."""
+        now = time.time() if now is None else now
+        if invocation_id != self.invocation_id:
+            self.spent_seconds += self.last_active_at - self.invocation_started_at
+            self.invocation_id = invocation_id
+            self.invocation_started_at = now
+        self.last_active_at = now
+
+    @property
+    def elapsed_seconds(self) -> float:
+        return self.spent_seconds + self.last_active_at - self.invocation_started_at
+
+    def pressure(self) -> float:
+        """Share of the time or token budget used, whichever is higher."""
+        return max(
+            self.elapsed_seconds / self.deadline_seconds
+            if self.deadline_seconds
+            else 0,
+            self.tokens_used / self.token_limit if self.token_limit else 0,
+        )
+
+    def degradations(self) -> list[str]:
+        """The degradation steps in effect, see DEGRADATION_STEPS."""
+        pressure = self.pressure()
+        return [step for step, threshold in DEGRADATION_STEPS if pressure >= threshold]
+
+
+def fallback_model() -> str:
+    """Model used once the budget is nearly spent (SESSION_FALLBACK_MODEL)."""
+    return os.environ.get("SESSION_FALLBACK_MODEL", DEFAULT_FALLBACK_MODEL)
+
+
+def _skipped(reason: str) -> dict[str, str]:
+    logger.info(f"Session budget: {reason}")
+    return {"status": "skipped", "reason": reason}
+
+
+def enforce_budget(
+    tool: BaseTool, args: dict[str, Any], tool_context: ToolContext
+) -> Any:
+    """
+    before_tool_callback that keeps media generation within the session budget.
+
+    Image requests are cut to the images left, and to one image under the
+    fewer_images step. Video requests are skipped under the skip_video step or once
+    the videos are used up; variant sets are cut to the videos left. A skipped call
+    returns a result saying so, which the agent reports instead of the media.
+
+    Args:
+        tool: The tool about to run.
+        args: Its arguments; media counts are lowered in place. Checkpoints keep
+            the call under the arguments as requested, see restore_checkpoint.
+        tool_context: Context of the call, holding the session state.
+
+    Returns:
+        None to run the tool, or the result of a skipped call.
+    """
+    budget = SessionBudget.from_state(tool_context.state)
+    budget.touch(tool_context.invocation_id)
+    degradations = budget.degradations()
+    result = None
+
+    if tool.name == "generate_and_show_images":
+        requested = int(args.get("number_of_images", 1))
+        allowed = budget.image_limit - budget.images_used
+        if "fewer_images" in degradations:
+            allowed = min(allowed, 1)
+        if allowed <= 0:
+            result = _skipped("the image allowance of this session is used up")
+        else:
+            args["number_of_images"] = min(requested, allowed)
+            budget.images_used += args["number_of_images"]
+            if args["number_of_images"] < requested:
+                logger.info(
+                    f"Session budget: generating {args['number_of_images']} of "
+                    f"{requested} images"
+                )
+    elif tool.name in VIDEO_TOOLS:
+        allowed = budget.video_limit - budget.videos_used
+        if "skip_video" in degradations:
+            result = _skipped("video is skipped to stay within the session budget")
+        elif allowed <= 0:
+            result = _skipped("the video allowance of this session is used up")
+        elif tool.name == "generate_video_variants":
+            models = (args.get("models") or [VEO_MODEL])[:allowed]
+            formats = args.get("aspect_ratios") or DEFAULT_ASPECT_RATIOS
+            formats = formats[: allowed // len(models)]
+            args["models"], args["aspect_ratios"] = models, formats
+            budget.videos_used += len(models) * len(formats)
+        else:
+            budget.videos_used += 1
+
+    budget.save(tool_context.state)
+    return result
+
+
+def degrade_model(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> LlmResponse | None:
+    """
+    before_model_callback that moves requests to the fallback model under the
+    cheaper_model step. Runs after route_model_request, so it overrides the route;
+    record_model_latency reports the fallback model.
+    """
+    budget = SessionBudget.from_state(callback_context.state)
+    budget.touch(callback_context.invocation_id)
+    if (
+        "cheaper_model" in budget.degradations()
+        and llm_request.model != fallback_model()
+    ):
+        logger.info(
+            f"Session budget: {budget.pressure():.0%} used, "
+            f"moving {llm_request.model} to {fallback_model()}"
+        )
+        reroute_model(callback_context, llm_request, fallback_model())
+        if llm_request.config is not None:
+            llm_request.config.thinking_config = None
+    budget.save(callback_context.state)
+    return None
+
+
+def record_token_usage(callback_context: CallbackContext, llm_response: Any) -> None:
+    """after_model_callback that charges the tokens of a response to the budget."""
+    usage = getattr(llm_response, "usage_metadata", None)
+    budget = SessionBudget.from_state(callback_context.state)
+    budget.touch(callback_context.invocation_id)
+    budget.tokens_used += getattr(usage, "total_token_count", None) or 0
+    budget.save(callback_context.state)
+    return None
@@ -0,0 +1,25 @@
+from typing import Any
+
+from google.adk.tools import BaseTool, ToolContext
+
+# Session state key under which each workflow tool's output is kept, so later
+# stages (and non-LLM agents) can read it without re-parsing the conversation.
+TOOL_STATE_KEYS = {
+    "trend_watcher_agent": "trends",
+    "get_product_data": "products",
+    "matchmaker_agent": "matches",
+    "marketing_agent": "marketing_plans",
+}
+
+
+def store_tool_output(
+    tool: BaseTool,
+    args: dict[str, Any],
+    tool_context: ToolContext,
+    tool_response: Any,
+) -> None:
+    """after_tool_callback that copies workflow tool outputs into session state."""
+    state_key = TOOL_STATE_KEYS.get(tool.name)
+    if state_key is not None:
+        tool_context.state[state_key] = tool_response
+    return None
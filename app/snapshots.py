@@ -0,0 +1,492 @@
+"""
+Background precompute of the trends, products and matches of every market.
+
+These stages give the same result to every session in a country until the data
+changes, so a refresher runs them ahead of time and publishes the outputs as a
+versioned snapshot. An interactive session starts from the latest snapshot of its
+country, and every step of a session reads the same version. Trends are still found
+by the session's trend watcher, which shortlists them by momentum and summarizes them
+with search grounding (see app/trend_watcher_agent.py). Product and matchmaker calls
+become lookups when they ask for what the snapshot holds: products up to its limit,
+and matches for the same trends the snapshot's matches were made from. Any other
+call runs the stage as usual.
+
+SNAPSHOT_COUNTRIES lists the markets, each with an optional refresh interval in
+seconds, e.g. "Netherlands:1800,Belgium"; markets without one are refreshed every
+SNAPSHOT_INTERVAL_SECONDS. With SNAPSHOT_REFRESH=true every worker runs the
+refresher in the background; a claim in the shared store makes sure one of them
+refreshes each market.
+
+Refresh once, e.g. from a scheduled job, with:
+    uv run python -m app.snapshots --country Netherlands
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.tools import BaseTool, ToolContext
+
+from app import matchmaker
+from app.match_store import trend_key
+from app.product_data_retriever import DEFAULT_PRODUCT_LIMIT, get_product_data
+from app.product_index import product_id
+from app.trend_data_retriever import get_trend_data
+from app.utils import codec
+from app.utils.cache import cache_path, open_connection
+from app.utils.llm_output import extract_json_array
+from app.utils.logging_config import configure_logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COUNTRY = "Netherlands"
+DEFAULT_INTERVAL_SECONDS = 3600.0
+DEFAULT_KEEP_VERSIONS = 24
+# The refresher looks for markets that are due at most this often.
+CHECK_INTERVAL_SECONDS = 60.0
+
+# Session state key pinning the snapshot a session started from, or {} for none.
+SNAPSHOT_STATE_KEY = "snapshot"
+# Tools of the LLM root agent answered from the snapshot, with the output they take.
+SNAPSHOT_TOOLS = {
+    "get_product_data": "products",
+    "matchmaker_agent": "matches",
+}
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """The precomputed trends, products and matches of a country."""
+
+    country: str
+    version: int
+    trends: str
+    products: str
+    matches: str
+    created_at: float
+
+
+class SnapshotStore:
+    """
+    Every published snapshot, numbered per country, and the claims of the refreshers.
+
+    The tables live in the shared SQLite file of app/utils/cache.py, so a snapshot
+    published by one worker is served by every worker on the host.
+    """
+
+    def __init__(self, path: str | None = None) -> None:
+        self.path = path or cache_path()
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Returns this thread's connection, creating the tables on first use."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = open_connection(self.path)
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots ("
+                " country TEXT NOT NULL,"
+                " version INTEGER NOT NULL,"
+                " trends TEXT NOT NULL,"
+                " products TEXT NOT NULL,"
+                " matches TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " PRIMARY KEY (country, version))"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS snapshot_claims ("
+                " country TEXT PRIMARY KEY,"
+                " claimed_at REAL NOT NULL)"
+            )
+            self._local.connection = connection
+        return connection
+
+    def publish(
+        self, country: str, trends: str, products: str, matches: str
+    ) -> Snapshot:
+        """Stores a new snapshot as the next version of the country."""
+        now = time.time()
+        connection = self._connection()
+        # Numbered in the insert itself, so concurrent publishers never share a version.
+        cursor = connection.execute(
+            "INSERT INTO snapshots"
+            " SELECT ?, COALESCE(MAX(version), 0) + 1, ?, ?, ?, ?"
+            " FROM snapshots WHERE country = ?",
+            (country, trends, products, matches, now, country),
+        )
+        row = connection.execute(
+            "SELECT * FROM snapshots WHERE rowid = ?", (cursor.lastrowid,)
+        ).fetchone()
+        return Snapshot(*row)
+
+    def latest(
+        self, country: str, max_age_seconds: float | None = None
+    ) -> Snapshot | None:
+        """Returns the newest snapshot of a country, or None if there is none this recent."""
+        row = (
+            self._connection()
+            .execute(
+                "SELECT * FROM snapshots WHERE country = ?"
+                " ORDER BY version DESC LIMIT 1",
+                (country,),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+        snapshot = Snapshot(*row)
+        if (
+            max_age_seconds is not None
+            and time.time() - snapshot.created_at > max_age_seconds
+        ):
+            return None
+        return snapshot
+
+    def get(self, country: str, version: int) -> Snapshot | None:
+        """Returns one version of a country's snapshot, or None once it was pruned."""
+        row = (
+            self._connection()
+            .execute(
+                "SELECT * FROM snapshots WHERE country = ? AND version = ?",
+                (country, version),
+            )
+            .fetchone()
+        )
+        return None if row is None else Snapshot(*row)
+
+    def prune(self, country: str, keep: int) -> None:
+        """Removes all but the newest keep versions of a country, at least one."""
+        # The latest version stays, so version numbers are never handed out twice.
+        self._connection().execute(
+            "DELETE FROM snapshots WHERE country = ? AND version <= ("
+            " SELECT MAX(version) FROM snapshots WHERE country = ?) - ?",
+            (country, country, max(keep, 1)),
+        )
+
+    def claim(self, country: str, lease_seconds: float) -> bool:
+        """
+        Claims the next refresh of a country.
+
+        Fails while another claim made less than lease_seconds ago is live, so a
+        country is refreshed by one worker at a time.
+        """
+        now = time.time()
+        cursor = self._connection().execute(
+            "INSERT INTO snapshot_claims VALUES (?, ?)"
+            " ON CONFLICT (country) DO UPDATE SET claimed_at = excluded.claimed_at"
+            " WHERE claimed_at < ?",
+            (country, now, now - lease_seconds),
+        )
+        return cursor.rowcount == 1
+
+    def release(self, country: str) -> None:
+        """Gives up a claim, e.g. after a failed refresh, so it is retried."""
+        self._connection().execute(
+            "DELETE FROM snapshot_claims WHERE country = ?", (country,)
+        )
+
+
+snapshot_store = SnapshotStore()
+
+
+def snapshot_schedule() -> dict[str, float]:
+    """Refresh interval in seconds per country, from SNAPSHOT_COUNTRIES."""
+    default_interval = float(
+        os.environ.get("SNAPSHOT_INTERVAL_SECONDS", DEFAULT_INTERVAL_SECONDS)
+    )
+    schedule = {}
+    for entry in os.environ.get("SNAPSHOT_COUNTRIES", DEFAULT_COUNTRY).split(","):
+        country, _, interval = entry.strip().partition(":")
+        if country:
+            schedule[country] = float(interval) if interval else default_interval
+    return schedule
+
+
+def snapshot_refresh_enabled() -> bool:
+    """Whether workers run the refresher in the background (SNAPSHOT_REFRESH=true)."""
+    return os.environ.get("SNAPSHOT_REFRESH", "false").lower() in ("1", "true", "yes")
+
+
+def session_country(state: Any) -> str:
+    """The country of a session: its country state key, else the first scheduled one."""
+    return state.get("country") or next(iter(snapshot_schedule()), DEFAULT_COUNTRY)
+
+
+def max_age_seconds(country: str) -> float:
+    """
+    How old a snapshot may be and still be served.
+
+    Two refresh intervals, so a single failed or late refresh does not send every
+    session back to computing the stages on demand.
+    """
+    return 2 * snapshot_schedule().get(
+        country,
+        float(os.environ.get("SNAPSHOT_INTERVAL_SECONDS", DEFAULT_INTERVAL_SECONDS)),
+    )
+
+
+def build_snapshot(country: str) -> dict[str, str]:
+    """
+    Runs the trend, product and matchmaker stages for a country.
+
+    Args:
+        country (str): Country name as used in the Google Trends table.
+
+    Returns:
+        dict[str, str]: The trends, products and matches, as the tools return them.
+    """
+    trends = get_trend_data(
+        country=country, limit=int(os.environ.get("SNAPSHOT_TREND_LIMIT", 10))
+    )
+    products = get_product_data(
+        limit=int(os.environ.get("SNAPSHOT_PRODUCT_LIMIT", DEFAULT_PRODUCT_LIMIT))
+    )
+    matches = matchmaker.matchmaker_agent(products, trends)
+    return {"trends": trends, "products": products, "matches": matches}
+
+
+def refresh_snapshot(country: str, interval_seconds: float) -> Snapshot | None:
+    """
+    Publishes a new snapshot of a country when the latest one is due for a refresh.
+
+    Args:
+        country (str): The country.
+        interval_seconds (float): How often the country is refreshed.
+
+    Returns:
+        Snapshot | None: The new snapshot, or None when none was due, another worker
+        is refreshing the country, or the refresh failed.
+    """
+    if snapshot_store.latest(country, max_age_seconds=interval_seconds) is not None:
+        return None
+    if not snapshot_store.claim(country, lease_seconds=interval_seconds):
+        return None
+    started_at = time.perf_counter()
+    try:
+        outputs = build_snapshot(country)
+    except Exception:
+        logger.exception(f"Snapshot refresh of {country} failed")
+        snapshot_store.release(country)
+        return None
+    snapshot = snapshot_store.publish(country, **outputs)
+    snapshot_store.prune(
+        country, int(os.environ.get("SNAPSHOT_KEEP_VERSIONS", DEFAULT_KEEP_VERSIONS))
+    )
+    logger.info(
+        f"Published snapshot {snapshot.version} of {country} in "
+        f"{time.perf_counter() - started_at:.1f}s"
+    )
+    return snapshot
+
+
+def refresh_due() -> list[Snapshot]:
+    """Refreshes every scheduled country that is due, one after the other."""
+    snapshots = []
+    for country, interval in snapshot_schedule().items():
+        snapshot = refresh_snapshot(country, interval)
+        if snapshot is not None:
+            snapshots.append(snapshot)
+    return snapshots
+
+
+_lock = threading.Lock()
+_refresher: threading.Thread | None = None
+
+
+def start_refresher() -> threading.Thread:
+    """Starts this worker's background refresher, once."""
+    global _refresher
+
+    def _run() -> None:
+        while True:
+            try:
+                refresh_due()
+            except Exception:
+                logger.exception("Snapshot refresher failed")
+            time.sleep(min(CHECK_INTERVAL_SECONDS, *snapshot_schedule().values()))
+
+    with _lock:
+        if _refresher is None:
+            _refresher = threading.Thread(
+                target=_run, name="snapshot-refresher", daemon=True
+            )
+            _refresher.start()
+        return _refresher
+
+
+def session_snapshot(state: Any) -> Snapshot | None:
+    """
+    Returns the snapshot a session works from, pinning it on first use.
+
+    The first call picks the latest snapshot of the session's country that is recent
+    enough; later calls return the same version, so products and matches always
+    come from one snapshot. A session that started without one keeps
+    computing its stages on demand.
+    """
+    pinned = state.get(SNAPSHOT_STATE_KEY)
+    if pinned is None:
+        country = session_country(state)
+        snapshot = snapshot_store.latest(country, max_age_seconds(country))
+        state[SNAPSHOT_STATE_KEY] = (
+            {"country": snapshot.country, "version": snapshot.version}
+            if snapshot is not None
+            else {}
+        )
+        return snapshot
+    if not pinned:
+        return None
+    return snapshot_store.get(pinned["country"], pinned["version"])
+
+
+def _rows(text: Any) -> list[dict[str, Any]]:
+    """The objects of the JSON array in a tool argument or output."""
+    rows = extract_json_array(str(text or "")) or []
+    return [row for row in rows if isinstance(row, dict)]
+
+
+def snapshot_products(snapshot: Snapshot, args: dict[str, Any]) -> str | None:
+    """
+    The snapshot's products as get_product_data would return them for args.
+
+    Only calls that differ from the snapshot's own query in nothing but a limit no
+    larger than its row count are answered; a smaller limit gets the first rows.
+
+    Returns:
+        str | None: The products, or None when the call asks for something else.
+    """
+    if set(args) - {"limit"}:
+        return None
+    rows = _rows(snapshot.products)
+    limit = int(args.get("limit", DEFAULT_PRODUCT_LIMIT))
+    if not rows or limit > len(rows):
+        return None
+    return snapshot.products if limit == len(rows) else codec.dumps(rows[:limit])
+
+
+def snapshot_matches(snapshot: Snapshot, products: Any, trends: Any) -> str | None:
+    """
+    The snapshot's matches, if they were made from the same trends and products.
+
+    The trends the session shows the user are shortlisted and summarized, so the
+    snapshot's matches, made from the raw trends, only apply when the call names the
+    same trends. Products are compared when the call passes them; the matchmaker
+    agent fetches its own.
+
+    Args:
+        snapshot (Snapshot): The session's snapshot.
+        products (Any): JSON array of the products to match, or None.
+        trends (Any): JSON array of the trends to match.
+
+    Returns:
+        str | None: The matches, or None when the inputs differ or there are none.
+    """
+    if not extract_json_array(snapshot.matches):
+        return None
+    call_trends = {trend_key(row) for row in _rows(trends)} - {""}
+    if call_trends != {trend_key(row) for row in _rows(snapshot.trends)} - {""}:
+        return None
+    if products is not None and {product_id(row) for row in _rows(products)} != {
+        product_id(row) for row in _rows(snapshot.products)
+    }:
+        return None
+    return snapshot.matches
+
+
+def serve_snapshot(
+    tool: BaseTool, args: dict[str, Any], tool_context: ToolContext
+) -> Any:
+    """
+    before_tool_callback that answers the product and matchmaker tools from the
+    session's snapshot when the call asks for what the snapshot holds.
+
+    get_product_data is answered for a limit no larger than the snapshot's products.
+    The matchmaker is answered when it is asked to match the snapshot's trends (and
+    products, when they are passed) and the snapshot has matches for them. Any other
+    call runs the tool, so the agent can still match other trends or more broadly.
+    """
+    output_name = SNAPSHOT_TOOLS.get(tool.name)
+    if output_name is None:
+        return None
+    snapshot = session_snapshot(tool_context.state)
+    if snapshot is None:
+        return None
+    if output_name == "products":
+        output = snapshot_products(snapshot, args)
+    else:
+        output = snapshot_matches(
+            snapshot,
+            args.get("product_dataframe_str"),
+            args.get("trends_news_dataframe_str", args.get("request")),
+        )
+    if output is None:
+        logger.info(f"Running {tool.name}: its arguments differ from the snapshot")
+        return None
+    logger.info(
+        f"Serving {tool.name} from snapshot {snapshot.version} of {snapshot.country}"
+    )
+    return output
+
+
+def seed_from_snapshot(callback_context: CallbackContext) -> None:
+    """
+    before_agent_callback of the workflow root agent that fills the products from
+    the session's snapshot, so the product step is skipped.
+    """
+    if callback_context.state.get("products"):
+        return None
+    snapshot = session_snapshot(callback_context.state)
+    if snapshot is None:
+        return None
+    products = snapshot_products(snapshot, {})
+    if products is not None:
+        callback_context.state["products"] = products
+        logger.info(f"Starting from snapshot {snapshot.version} of {snapshot.country}")
+    return None
+
+
+def seed_matches_from_snapshot(callback_context: CallbackContext) -> None:
+    """
+    before_agent_callback of the workflow matchmaker step that fills the matches from
+    the session's snapshot when the session found the same trends and products.
+    """
+    state = callback_context.state
+    if state.get("matches"):
+        return None
+    snapshot = session_snapshot(state)
+    if snapshot is None:
+        return None
+    matches = snapshot_matches(
+        snapshot, state.get("products"), state.get("trends_json")
+    )
+    if matches is not None:
+        state["matches"] = matches
+        logger.info(
+            f"Serving matches from snapshot {snapshot.version} of {snapshot.country}"
+        )
+    return None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    configure_logging()
+    parser = argparse.ArgumentParser(
+        description="Refresh the trend, product and match snapshots"
+    )
+    parser.add_argument(
+        "--country",
+        action="append",
+        help="Country to refresh now; defaults to the countries of SNAPSHOT_COUNTRIES that are due",
+    )
+    args = parser.parse_args()
+    if args.country:
+        for country in args.country:
+            # An explicit refresh is always due.
+            refresh_snapshot(country, interval_seconds=0)
+    else:
+        refresh_due()
@@ -0,0 +1,269 @@
+import logging
+import os
+import re
+import threading
+from concurrent.futures import Future
+from typing import Any
+
+from google.adk.tools import BaseTool, ToolContext
+
+from app.imagen_creative import image_prompt, render_images
+from app.utils.cache import SharedCache
+from app.utils.checkpoint import checkpoint_id
+from app.utils.concurrency import get_executor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SPECULATIVE_MODEL = "imagen-4.0-fast-generate-001"
+# Never more renders than the marketing agent writes plans, whatever the text looks like.
+MAX_SPECULATIVE_PLANS = 3
+# Share of the words of the chosen plan that must appear in a speculated plan, and
+# how far it must be ahead of the next best plan, for its images to be reused.
+MATCH_THRESHOLD = 0.6
+MATCH_MARGIN = 0.1
+
+# Finished renders, so the plan choice finds them on any worker of the replica.
+speculation_cache = SharedCache(
+    "speculative_images",
+    ttl_seconds=float(os.environ.get("SPECULATIVE_IMAGE_TTL_SECONDS", 3600)),
+)
+
+_PLAN_HEADING = re.compile(
+    r"^\s*(?:#+\s*)?(?:\*\*)?\s*(?:marketing\s+)?(?:plan|concept|option)\s*#?\s*\d",
+    re.IGNORECASE | re.MULTILINE,
+)
+_MARKDOWN_HEADING = re.compile(r"^#{1,3}\s", re.MULTILINE)
+_WORD = re.compile(r"\w+")
+
+_lock = threading.Lock()
+# In-flight renders of this worker by session (its checkpoint id), one per plan.
+_pending: dict[str, dict[int, Future]] = {}
+
+
+def speculation_enabled() -> bool:
+    """Whether images are rendered for every plan before the user chose (SPECULATIVE_IMAGES)."""
+    return os.environ.get("SPECULATIVE_IMAGES", "false").lower() == "true"
+
+
+def speculative_model() -> str:
+    """Low-cost Imagen model for the speculative renders (SPECULATIVE_IMAGE_MODEL)."""
+    return os.environ.get("SPECULATIVE_IMAGE_MODEL", DEFAULT_SPECULATIVE_MODEL)
+
+
+def split_plans(text: str) -> list[str]:
+    """
+    Splits the output of the marketing agent into its plans.
+
+    Plans start at a heading such as "**Marketing Plan 1: ...**" or "### Concept 2";
+    without such headings any markdown heading starts a plan. Text before the first
+    plan is dropped.
+
+    Args:
+        text (str): The marketing plans, as returned by marketing_agent().
+
+    Returns:
+        list[str]: The plans, at most MAX_SPECULATIVE_PLANS; the whole text when no
+        headings are found.
+    """
+    for heading in (_PLAN_HEADING, _MARKDOWN_HEADING):
+        starts = [match.start() for match in heading.finditer(text)]
+        if len(starts) >= 2:
+            plans = [
+                text[start:end].strip()
+                for start, end in zip(starts, [*starts[1:], len(text)], strict=True)
+            ]
+            return plans[:MAX_SPECULATIVE_PLANS]
+    return [text.strip()] if text.strip() else []
+
+
+def _words(text: str) -> set[str]:
+    return {word.lower() for word in _WORD.findall(text) if len(word) > 2}
+
+
+def match_plan(chosen: str, plans: list[str]) -> int | None:
+    """
+    Finds the plan the creative agent passed on as the chosen one.
+
+    The agent often shortens or rephrases the plan, so plans are compared by the
+    share of the words of the chosen text they contain.
+
+    Args:
+        chosen (str): The marketing_plan argument of the image tool.
+        plans (list[str]): The speculated plans.
+
+    Returns:
+        int | None: Index of the plan, or None when no plan clearly matches.
+    """
+    words = _words(chosen)
+    if not words or not plans:
+        return None
+    scores = sorted(
+        (
+            (len(words & _words(plan)) / len(words), index)
+            for index, plan in enumerate(plans)
+        ),
+        reverse=True,
+    )
+    best, index = scores[0]
+    runner_up = scores[1][0] if len(scores) > 1 else 0.0
+    if best < MATCH_THRESHOLD or best - runner_up < MATCH_MARGIN:
+        return None
+    return index
+
+
+def _result_key(session_id: str, index: int) -> str:
+    return f"{session_id}:{index}"
+
+
+def _store_result(session_id: str, index: int, future: Future) -> None:
+    """Done callback keeping a finished render, unless the session discarded it."""
+    failed = future.cancelled() or future.exception() is not None
+    # The render moves from _pending to the cache in one step, so a plan choice
+    # always finds it in one of the two.
+    with _lock:
+        session = _pending.get(session_id, {})
+        if session.get(index) is not future:
+            return
+        if not failed:
+            speculation_cache.set(_result_key(session_id, index), future.result())
+        del session[index]
+        if not session:
+            _pending.pop(session_id, None)
+    if failed:
+        logger.warning(
+            f"Speculative images of plan {index + 1} failed: {future.exception()}"
+        )
+
+
+def speculate_images(session_id: str, plans_text: str, brandbook: str = "") -> int:
+    """
+    Starts one low-cost image render per marketing plan, in the background.
+
+    Renders run on the worker's thread pool with speculative_model(), one image per
+    plan. The plans are kept with the session, so reuse_speculative_images() can
+    tell which render belongs to the plan the user picked.
+
+    Args:
+        session_id (str): Checkpoint id of the session the plans were written for
+            (see app/utils/checkpoint.py).
+        plans_text (str): The marketing plans, as returned by marketing_agent().
+        brandbook (str): Brand guidelines of the image prompt, default brand guide
+            when empty.
+
+    Returns:
+        int: Number of renders started; 0 when speculation is disabled.
+    """
+    plans = split_plans(plans_text) if speculation_enabled() else []
+    if not plans:
+        return 0
+    discard_speculation(session_id)
+    speculation_cache.set(f"{session_id}:plans", plans)
+    model = speculative_model()
+    with _lock:
+        started = {
+            index: get_executor().submit(
+                render_images, image_prompt(plan, brandbook), 1, model, None
+            )
+            for index, plan in enumerate(plans)
+        }
+        _pending[session_id] = dict(started)
+    # Callbacks are added outside the lock, as they take it and may run right away.
+    for index, future in started.items():
+        future.add_done_callback(
+            lambda done, index=index: _store_result(session_id, index, done)
+        )
+    logger.info(f"Speculatively rendering images for {len(plans)} plans with {model}")
+    return len(plans)
+
+
+def discard_speculation(session_id: str, keep: int | None = None) -> Future | None:
+    """
+    Cancels and forgets the speculative renders of a session.
+
+    Renders that have not started are cancelled; running ones cannot be stopped and
+    their result is dropped when they finish.
+
+    Args:
+        session_id (str): The session.
+        keep (int, optional): Plan whose in-flight render is handed back instead.
+
+    Returns:
+        Future | None: The in-flight render of plan keep, if any.
+    """
+    with _lock:
+        session = _pending.pop(session_id, {})
+    kept = session.pop(keep, None) if keep is not None else None
+    cancelled = sum(future.cancel() for future in session.values())
+    plans = speculation_cache.get(f"{session_id}:plans") or []
+    for index in range(len(plans)):
+        if index != keep:
+            speculation_cache.delete(_result_key(session_id, index))
+    if session:
+        logger.info(
+            f"Discarded {len(session)} speculative renders, {cancelled} before they started"
+        )
+    return kept
+
+
+def start_speculative_images(
+    tool: BaseTool,
+    args: dict[str, Any],
+    tool_context: ToolContext,
+    tool_response: Any,
+) -> None:
+    """after_tool_callback that starts the speculative renders once marketing_agent returned."""
+    if tool.name == "marketing_agent" and isinstance(tool_response, str):
+        speculate_images(checkpoint_id(tool_context), tool_response)
+    return None
+
+
+def reuse_speculative_images(
+    tool: BaseTool, args: dict[str, Any], tool_context: ToolContext
+) -> Any:
+    """
+    before_tool_callback that answers generate_and_show_images from the speculative
+    render of the chosen plan, waiting for it if it is still running.
+
+    The renders of the other plans are discarded. The call runs as usual when no
+    speculated plan clearly matches, the render failed, or more images were asked
+    for than were rendered. Runs after enforce_budget, so a reused image is charged
+    to the session budget like a rendered one.
+
+    Args:
+        tool: The tool about to run.
+        args: Its arguments.
+        tool_context: Context of the call, identifying the session.
+
+    Returns:
+        The reused images, or None to run the tool.
+    """
+    if tool.name != "generate_and_show_images":
+        return None
+    session_id = checkpoint_id(tool_context)
+    plans = speculation_cache.get(f"{session_id}:plans")
+    if not plans:
+        return None
+    index = match_plan(str(args.get("marketing_plan", "")), plans)
+    if index is None or int(args.get("number_of_images", 1)) > 1:
+        reason = "no plan matches" if index is None else "more images were asked for"
+        logger.info(f"Speculative images not reused: {reason}")
+        discard_speculation(session_id)
+        speculation_cache.delete(f"{session_id}:plans")
+        return None
+
+    pending = discard_speculation(session_id, keep=index)
+    speculation_cache.delete(f"{session_id}:plans")
+    try:
+        images = (
+            pending.result()
+            if pending is not None
+            else speculation_cache.get(_result_key(session_id, index))
+        )
+    except Exception:
+        logger.exception(f"Speculative images of plan {index + 1} failed")
+        images = None
+    speculation_cache.delete(_result_key(session_id, index))
+    if not images:
+        return None
+    logger.info(f"Reusing the speculative images of plan {index + 1}")
+    return images
@@ -0,0 +1,188 @@
+import json
+import os
+from typing import Any
+
+from google.cloud import bigquery
+
+from app.product_data_retriever import GCP_PROJECT_ID
+from app.utils import codec
+from app.utils.cache import SharedCache
+from app.utils.clients import get_bigquery_client
+from app.utils.telemetry import set_attributes
+
+TRENDS_TABLE = "bigquery-public-data.google_trends.international_top_rising_terms"
+
+# The public table is refreshed once a day, so a country/date pair never changes.
+_trend_data_cache = SharedCache(
+    "trend_terms",
+    ttl_seconds=float(os.environ.get("TREND_DATA_CACHE_TTL_SECONDS", 86400)),
+)
+
+
+def get_trend_data(
+    country: str = "Netherlands",
+    refresh_date: str | None = None,
+    limit: int = 10,
+    project: str = GCP_PROJECT_ID,
+) -> str:
+    """Get the top rising Google Trends search terms of a country as a JSON string.
+
+    Same table as bigquery/google_trends.sql. Terms are deduplicated across regions and
+    weeks and returned in the trend_watcher_agent format, so the result can be passed
+    straight to the matchmaker.
+
+    Args:
+        country (str, optional): Country name as used in the table, e.g. "Netherlands".
+        refresh_date (str, optional): Refresh date (YYYY-MM-DD). Defaults to the latest.
+        limit (int, optional): Number of terms to return.
+        project (str, optional): GCP project that runs (and pays for) the query.
+
+    Returns:
+        str: A JSON array of trends with trend_title, trend_description,
+        trend_category and trend_search_volume.
+    """
+    date_filter = (
+        "@refresh_date"
+        if refresh_date
+        else f"(SELECT MAX(refresh_date) FROM `{TRENDS_TABLE}`)"
+    )
+    query = f"""
+        SELECT term, MIN(rank) AS rank, MAX(percent_gain) AS percent_gain
+        FROM `{TRENDS_TABLE}`
+        WHERE refresh_date = {date_filter} AND country_name = @country
+        GROUP BY term
+        ORDER BY rank
+        LIMIT @limit
+    """
+    return _trend_data_cache.get_or_set(
+        json.dumps([query, country, refresh_date, limit]),
+        lambda: _query_trend_data(project, query, country, refresh_date, limit),
+    )
+
+
+def _query_trend_data(
+    project: str, query: str, country: str, refresh_date: str | None, limit: int
+) -> str:
+    """Run the trend query against BigQuery and shape the rows like the trend watcher output."""
+    parameters = [
+        bigquery.ScalarQueryParameter("country", "STRING", country),
+        bigquery.ScalarQueryParameter("limit", "INT64", limit),
+    ]
+    if refresh_date:
+        parameters.append(
+            bigquery.ScalarQueryParameter("refresh_date", "DATE", refresh_date)
+        )
+
+    client = get_bigquery_client(project)
+    query_job = client.query(
+        query, job_config=bigquery.QueryJobConfig(query_parameters=parameters)
+    )
+    results = query_job.result()
+    set_attributes(
+        {
+            "bigquery.bytes_processed": query_job.total_bytes_processed,
+            "bigquery.bytes_billed": query_job.total_bytes_billed,
+            "bigquery.cache_hit": query_job.cache_hit,
+            "bigquery.rows": results.total_rows,
+        }
+    )
+
+    return json.dumps(
+        [
+            {
+                "trend_title": row["term"],
+                "trend_description": (
+                    f"Rising Google search term in {country} "
+                    f"(rank {row['rank']}, +{row['percent_gain']}% searches)."
+                ),
+                "trend_category": "Search",
+                "trend_search_volume": f"+{row['percent_gain']}%",
+            }
+            for row in results
+        ]
+    )
+
+
+def get_trend_history(
+    country: str = "Netherlands",
+    num_refresh_dates: int = 7,
+    project: str = GCP_PROJECT_ID,
+) -> list[dict[str, Any]]:
+    """Get the rank, score and percent gain of every rising term over recent refresh dates.
+
+    Regions are collapsed per term and refresh date: the best rank, the highest percent
+    gain and the mean score of the most recent week. The rows feed the momentum scoring
+    in app/trend_momentum.py.
+
+    Args:
+        country (str, optional): Country name as used in the table, e.g. "Netherlands".
+        num_refresh_dates (int, optional): Number of most recent daily refreshes.
+        project (str, optional): GCP project that runs (and pays for) the query.
+
+    Returns:
+        list[dict]: Rows with term, refresh_date (YYYY-MM-DD), rank, score and
+        percent_gain, ordered by refresh date.
+    """
+    query = f"""
+        WITH per_region AS (
+            SELECT
+                term,
+                refresh_date,
+                MIN(rank) AS rank,
+                ANY_VALUE(score HAVING MAX week) AS score,
+                MAX(percent_gain) AS percent_gain
+            FROM `{TRENDS_TABLE}`
+            WHERE refresh_date > DATE_SUB(
+                    (SELECT MAX(refresh_date) FROM `{TRENDS_TABLE}`),
+                    INTERVAL @num_refresh_dates DAY
+                )
+                AND country_name = @country
+            GROUP BY term, refresh_date, region_name
+        )
+        SELECT
+            term,
+            CAST(refresh_date AS STRING) AS refresh_date,
+            MIN(rank) AS rank,
+            AVG(score) AS score,
+            MAX(percent_gain) AS percent_gain
+        FROM per_region
+        GROUP BY term, refresh_date
+        ORDER BY refresh_date
+    """
+    history_json = _trend_data_cache.get_or_set(
+        json.dumps([query, country, num_refresh_dates]),
+        lambda: _query_trend_history(project, query, country, num_refresh_dates),
+    )
+    return codec.loads(history_json)
+
+
+def _query_trend_history(
+    project: str, query: str, country: str, num_refresh_dates: int
+) -> str:
+    """Run the history query against BigQuery and return the rows as a JSON string."""
+    client = get_bigquery_client(project)
+    query_job = client.query(
+        query,
+        job_config=bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter("country", "STRING", country),
+                bigquery.ScalarQueryParameter(
+                    "num_refresh_dates", "INT64", num_refresh_dates
+                ),
+            ]
+        ),
+    )
+    results = query_job.result()
+    set_attributes(
+        {
+            "bigquery.bytes_processed": query_job.total_bytes_processed,
+            "bigquery.bytes_billed": query_job.total_bytes_billed,
+            "bigquery.cache_hit": query_job.cache_hit,
+            "bigquery.rows": results.total_rows,
+        }
+    )
+    return codec.dumps([dict(row) for row in results])
+
+
+if __name__ == "__main__":
+    print(get_trend_data())
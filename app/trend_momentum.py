@@ -0,0 +1,183 @@
+import logging
+import os
+import re
+from typing import Any
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Momentum is the latest score plus how fast it rises and how fast that rise speeds up.
+VELOCITY_WEIGHT = 1.0
+ACCELERATION_WEIGHT = 0.5
+
+# Trends forwarded to the search agent; each one costs a grounded search.
+DEFAULT_SHORTLIST_SIZE = 5
+
+_TREND_LINE = re.compile(r"\*\*(?P<title>.+?)\*\*\s*(?:\((?P<volume>[^)]*)\))?")
+_NUMBER = re.compile(r"(?P<number>\d+(?:\.\d+)?)\s*(?P<unit>[KkMm]?)")
+
+
+def shortlist_size() -> int:
+    """Returns the maximum number of trends sent to enrichment (TREND_SHORTLIST_SIZE)."""
+    return int(os.environ.get("TREND_SHORTLIST_SIZE", DEFAULT_SHORTLIST_SIZE))
+
+
+def normalize_term(term: str) -> str:
+    """Case- and whitespace-insensitive key, so "Storm  Amy" and "storm amy" are one trend."""
+    return " ".join(term.casefold().split())
+
+
+def momentum_scores(history: list[dict[str, Any]]) -> dict[str, dict[str, float]]:
+    """Score every term of a rising-terms history by momentum.
+
+    The history is pivoted into a term x refresh date matrix of scores (a term missing
+    on a date scores 0), so velocity and acceleration are first and second differences
+    along one axis, computed for all terms at once.
+
+    Args:
+        history (list[dict]): Rows with term, refresh_date, score and percent_gain, e.g.
+            from get_trend_history(). Duplicate rows of a term keep the highest values.
+
+    Returns:
+        dict[str, dict[str, float]]: Per normalized term its latest score, velocity,
+        acceleration, latest percent_gain and momentum.
+    """
+    if not history:
+        return {}
+    terms, term_index = np.unique(
+        [normalize_term(row["term"]) for row in history], return_inverse=True
+    )
+    dates, date_index = np.unique(
+        [row["refresh_date"] for row in history], return_inverse=True
+    )
+    scores = np.zeros((len(terms), len(dates)))
+    np.maximum.at(
+        scores,
+        (term_index, date_index),
+        np.array([row.get("score") or 0 for row in history], dtype=float),
+    )
+    gains = np.zeros((len(terms), len(dates)))
+    np.maximum.at(
+        gains,
+        (term_index, date_index),
+        np.array([row.get("percent_gain") or 0 for row in history], dtype=float),
+    )
+
+    # Pad with zeros: a term that first appears on the latest date is rising and speeding up.
+    padded = np.concatenate([np.zeros((len(terms), 2)), scores], axis=1)
+    velocity = np.diff(padded, axis=1)
+    acceleration = np.diff(velocity, axis=1)
+    momentum = (
+        scores[:, -1]
+        + VELOCITY_WEIGHT * velocity[:, -1]
+        + ACCELERATION_WEIGHT * acceleration[:, -1]
+    )
+    return {
+        term: {
+            "score": float(scores[i, -1]),
+            "velocity": float(velocity[i, -1]),
+            "acceleration": float(acceleration[i, -1]),
+            "percent_gain": float(gains[i, -1]),
+            "momentum": float(momentum[i]),
+        }
+        for i, term in enumerate(terms)
+    }
+
+
+def parse_trend_lines(text: str) -> list[dict[str, str]]:
+    """Parse the "- **Trend** (2000+ searches)" lines of the trends agent, without duplicates."""
+    trends: dict[str, dict[str, str]] = {}
+    for match in _TREND_LINE.finditer(text):
+        title = match.group("title").strip()
+        trends.setdefault(
+            normalize_term(title),
+            {"trend_title": title, "trend_search_volume": match.group("volume") or ""},
+        )
+    return list(trends.values())
+
+
+def search_volume(volume: str) -> float:
+    """Number of searches in a volume label like "2000+ searches" or "20K+", 0 if absent."""
+    # "1,000+" groups thousands, "1,5M+" is a decimal comma.
+    match = _NUMBER.search(re.sub(r",(?=\d{3}\b)", "", volume).replace(",", "."))
+    if match is None:
+        return 0.0
+    multiplier = {"k": 1e3, "m": 1e6}.get(match.group("unit").lower(), 1.0)
+    return float(match.group("number")) * multiplier
+
+
+def _percentiles(values: np.ndarray) -> np.ndarray:
+    """Rank of each value scaled to [0, 1], so differently scaled signals can be compared."""
+    if len(values) < 2:
+        return np.ones(len(values))
+    return values.argsort(kind="stable").argsort() / (len(values) - 1)
+
+
+def shortlist_trends(
+    trends: list[dict[str, str]],
+    history: list[dict[str, Any]],
+    top_n: int = DEFAULT_SHORTLIST_SIZE,
+) -> list[dict[str, Any]]:
+    """Keep the top_n trends with the highest momentum.
+
+    Trends found in the history are ranked by momentum, the others by search volume;
+    both are turned into percentiles and on a tie the trend with history wins. Without
+    trends from the trends agent, the top terms of the history itself are used.
+
+    Args:
+        trends (list[dict]): Candidates with trend_title and trend_search_volume, e.g.
+            from parse_trend_lines().
+        history (list[dict]): Rising-terms history, see momentum_scores().
+        top_n (int, optional): Maximum number of trends to return.
+
+    Returns:
+        list[dict]: At most top_n trends, highest momentum first, with their momentum
+        (None when the term has no history).
+    """
+    scores = momentum_scores(history)
+    if not trends:
+        trends = [
+            {
+                "trend_title": row["term"],
+                "trend_search_volume": f"+{row['percent_gain']}%",
+            }
+            for row in {normalize_term(row["term"]): row for row in history}.values()
+        ]
+    if not trends:
+        return []
+
+    keys = [normalize_term(trend["trend_title"]) for trend in trends]
+    has_history = np.array([key in scores for key in keys])
+    momentum = np.array(
+        [scores[key]["momentum"] if key in scores else 0 for key in keys]
+    )
+    volume = np.array([search_volume(t["trend_search_volume"]) for t in trends])
+
+    priority = np.zeros(len(trends))
+    priority[has_history] = _percentiles(momentum[has_history])
+    priority[~has_history] = _percentiles(volume[~has_history])
+    # lexsort sorts on the last key first: priority, then history, then input order.
+    order = np.lexsort((np.arange(len(trends)), ~has_history, -priority))[:top_n]
+
+    logger.info(
+        f"Shortlisted {min(top_n, len(trends))} of {len(trends)} trends "
+        f"({int(has_history.sum())} with momentum history)."
+    )
+    return [
+        {
+            **trends[i],
+            "momentum": scores[keys[i]]["momentum"] if has_history[i] else None,
+        }
+        for i in order
+    ]
+
+
+def format_trend_lines(trends: list[dict[str, Any]]) -> str:
+    """Format trends in the "- **Trend** (volume)" format the search agent expects."""
+    return "\n".join(
+        f"- **{trend['trend_title']}** ({trend['trend_search_volume']})"
+        if trend["trend_search_volume"]
+        else f"- **{trend['trend_title']}**"
+        for trend in trends
+    )
@@ -0,0 +1,122 @@
+import datetime
+import logging
+import os
+import re
+
+from app.trend_momentum import normalize_term
+from app.utils.cache import SharedCache
+
+logger = logging.getLogger(__name__)
+
+# A summary is fresh for TREND_SUMMARY_TTL_SECONDS and then served stale, while it is
+# refreshed in the background, for TREND_SUMMARY_STALE_SECONDS more.
+summary_cache = SharedCache(
+    "trend_summaries",
+    ttl_seconds=float(os.environ.get("TREND_SUMMARY_TTL_SECONDS", 6 * 3600)),
+)
+
+_SUMMARY_TITLE = re.compile(r"^\s*(?:[-*]\s+)?\*\*(?P<title>.+?)\*\*")
+
+
+def stale_seconds() -> float:
+    """How long an expired summary may still be served (TREND_SUMMARY_STALE_SECONDS)."""
+    return float(os.environ.get("TREND_SUMMARY_STALE_SECONDS", 6 * 3600))
+
+
+def summary_window_hours() -> int:
+    """Length of a summary window in hours (TREND_SUMMARY_WINDOW_HOURS, default 24).
+
+    Raises:
+        ValueError: When the length is not between 1 and 24 or does not divide 24,
+            since the windows of a day would then not all be the same length.
+    """
+    hours = int(os.environ.get("TREND_SUMMARY_WINDOW_HOURS", 24))
+    if not 1 <= hours <= 24 or 24 % hours:
+        raise ValueError(
+            f"TREND_SUMMARY_WINDOW_HOURS must divide 24 (1, 2, 3, 4, 6, 8, 12 or 24), "
+            f"got {hours}"
+        )
+    return hours
+
+
+def summary_window() -> str:
+    """Returns the current window; a trend is explained anew in every window.
+
+    Windows are summary_window_hours() long and aligned to UTC midnight, so a news
+    cycle never bleeds into the next one.
+    """
+    hours = summary_window_hours()
+    now = datetime.datetime.now(datetime.timezone.utc)
+    start = now.replace(hour=now.hour - now.hour % hours, minute=0, second=0)
+    return start.strftime("%Y-%m-%dT%H")
+
+
+def summary_key(trend_title: str, window: str | None = None) -> str:
+    """Cache key of a trend summary: the normalized title within a window."""
+    return f"{window or summary_window()}:{normalize_term(trend_title)}"
+
+
+def lookup_summaries(
+    trends: list[dict[str, str]],
+) -> tuple[dict[str, str], list[dict[str, str]], list[dict[str, str]]]:
+    """Look up the cached summary of every trend.
+
+    Args:
+        trends (list[dict]): Trends with trend_title, e.g. from parse_trend_lines().
+
+    Returns:
+        tuple: The summaries found, by trend title (fresh and stale); the trends whose
+        summary is stale and should be refreshed; the trends without a summary.
+    """
+    window = summary_window()
+    summaries, stale, missing = {}, [], []
+    for trend in trends:
+        summary, is_stale = summary_cache.get_stale(
+            summary_key(trend["trend_title"], window), stale_seconds()
+        )
+        if summary is None:
+            missing.append(trend)
+            continue
+        summaries[trend["trend_title"]] = summary
+        if is_stale:
+            stale.append(trend)
+    logger.info(
+        f"Trend summaries: {len(summaries) - len(stale)} fresh, {len(stale)} stale, "
+        f"{len(missing)} missing."
+    )
+    return summaries, stale, missing
+
+
+def split_summaries(text: str, trends: list[dict[str, str]]) -> dict[str, str]:
+    """Split the output of the search agent into one summary per requested trend.
+
+    The search agent starts every summary with the trend name in bold, so a line that
+    starts with the bold name of a requested trend starts its summary, and one that
+    starts with any other bold text ends it. Lines outside a summary are dropped, so
+    no summary picks up text about another trend.
+
+    Args:
+        text (str): The search agent's response.
+        trends (list[dict]): The trends it was asked to explain.
+
+    Returns:
+        dict[str, str]: Summary per trend title, for the trends found in text.
+    """
+    titles = {normalize_term(t["trend_title"]): t["trend_title"] for t in trends}
+    summaries: dict[str, list[str]] = {}
+    current: list[str] | None = None
+    for line in text.splitlines():
+        match = _SUMMARY_TITLE.match(line)
+        if match:
+            title = titles.get(normalize_term(match.group("title")))
+            current = None if title is None else summaries.setdefault(title, [])
+        if current is not None:
+            current.append(line)
+    return {title: "\n".join(lines).strip() for title, lines in summaries.items()}
+
+
+def store_summaries(summaries: dict[str, str]) -> None:
+    """Cache freshly generated summaries for the other sessions and workers."""
+    window = summary_window()
+    for trend_title, summary in summaries.items():
+        summary_cache.set(summary_key(trend_title, window), summary)
@@ -1,9 +1,44 @@
-from google.adk.agents import LlmAgent, SequentialAgent
+import asyncio
+import datetime
+import logging
+import os
+import threading
+from collections.abc import AsyncGenerator
+
+from google.adk.agents import BaseAgent, LlmAgent, SequentialAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.adk.runners import InMemoryRunner
 from google.adk.tools import google_search
 from google.adk.tools.mcp_tool.mcp_session_manager import StdioConnectionParams
 from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset
+from google.genai import types
 from mcp import StdioServerParameters
 
+from app.trend_data_retriever import get_trend_history
+from app.trend_momentum import (
+    format_trend_lines,
+    parse_trend_lines,
+    shortlist_size,
+    shortlist_trends,
+)
+from app.trend_summaries import (
+    lookup_summaries,
+    split_summaries,
+    store_summaries,
+    summary_key,
+)
+from app.utils.cache import SharedCache
+from app.utils.concurrency import get_executor
+
+logger = logging.getLogger(__name__)
+
+# Trends are the same for every session in a window, so all workers share one result.
+trend_cache = SharedCache(
+    "trends", ttl_seconds=float(os.environ.get("TREND_CACHE_TTL_SECONDS", 3600))
+)
+
 google_trends_agent = LlmAgent(
     name="trends_agent",
     model="gemini-2.5-flash",
@@ -18,6 +53,7 @@ Your response MUST strictly follow this format for each trend, including the tre
 - **Antifa** (2000+ searches)
 - **Jimmy Fallon** (500+ searches)
 """,
+    output_key="raw_trends",
     tools=[
         MCPToolset(
             connection_params=StdioConnectionParams(
@@ -37,8 +73,8 @@ google_search_agent = LlmAgent(
     instruction="""You are a specialized AI assistant that receives a trending topic and explains WHY it's trending.
 
 ## INSTRUCTIONS:
-1.  You will be given a trend's name and its search volume as input.
-2.  Use the `Google Search` tool with the trend's name to find the most recent news, articles, or social media discussions related to it.
+1.  You will be given a shortlist of trends, each with its name and search volume, as input.
+2.  For each trend on the shortlist, and no other, use the `Google Search` tool with the trend's name to find the most recent news, articles, or social media discussions related to it.
 3.  Synthesize the search results into a concise, one-paragraph summary that explains the key reasons for the trend.
 4.  Begin the summary with the trend name in bold, but DO NOT include the search volume in your final output.
 
@@ -84,13 +120,189 @@ Here is an example of the expected output format for two trends:
   }
 ]
 """,
+    output_key="trends_json",
 )
 
+
+class TrendShortlistAgent(BaseAgent):
+    """
+    Keeps only the highest-momentum trends of the trends agent for the search agent.
+
+    Momentum comes from the BigQuery rising-terms history (see app/trend_momentum.py),
+    so the number of grounded searches is bounded by top_n however many trends come in.
+    When the history cannot be fetched, trends are ranked by search volume alone. The
+    shortlist is stored in state as shortlisted_trends.
+    """
+
+    top_n: int
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        raw_trends = str(ctx.session.state.get("raw_trends", ""))
+        try:
+            history = await asyncio.to_thread(get_trend_history)
+        except Exception:
+            logger.exception("Could not fetch the trend history, ranking by volume")
+            history = []
+        shortlist = format_trend_lines(
+            shortlist_trends(parse_trend_lines(raw_trends), history, self.top_n)
+        )
+        if not shortlist:
+            logger.warning("No trends to shortlist, forwarding the trends agent output")
+            shortlist = raw_trends
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(state_delta={"shortlisted_trends": shortlist}),
+        )
+
+
+trend_shortlist_agent = TrendShortlistAgent(
+    name="trend_shortlist_agent",
+    description="Keeps the trends with the highest momentum for enrichment.",
+    top_n=shortlist_size(),
+)
+
+# Summary keys being refreshed by this worker, so a stale trend is refreshed once.
+_revalidating: set[str] = set()
+_revalidating_lock = threading.Lock()
+
+
+def _final_text(event: Event) -> str | None:
+    """Returns the text of a final response event, or None for any other event."""
+    if not event.is_final_response() or not event.content or not event.content.parts:
+        return None
+    return "".join(
+        part.text for part in event.content.parts if part.text and not part.thought
+    )
+
+
+def _revalidate_summaries(search_agent: BaseAgent, trends: list[dict]) -> None:
+    """Runs a copy of the search agent on stale trends and caches the new summaries."""
+
+    async def _search() -> str:
+        runner = InMemoryRunner(agent=search_agent.clone(), app_name="trend_summaries")
+        session = await runner.session_service.create_session(
+            app_name="trend_summaries", user_id="trend_summaries"
+        )
+        message = types.Content(
+            role="user", parts=[types.Part.from_text(text=format_trend_lines(trends))]
+        )
+        response = ""
+        async for event in runner.run_async(
+            user_id="trend_summaries", session_id=session.id, new_message=message
+        ):
+            response = _final_text(event) or response
+        return response
+
+    try:
+        store_summaries(split_summaries(asyncio.run(_search()), trends))
+    except Exception:
+        logger.exception(f"Could not refresh the summaries of {len(trends)} trends")
+    finally:
+        with _revalidating_lock:
+            _revalidating.difference_update(
+                summary_key(trend["trend_title"]) for trend in trends
+            )
+
+
+def _schedule_revalidation(search_agent: BaseAgent, trends: list[dict]) -> None:
+    """Refreshes stale summaries on the worker's thread pool, off the request path."""
+    with _revalidating_lock:
+        pending = [
+            trend
+            for trend in trends
+            if summary_key(trend["trend_title"]) not in _revalidating
+        ]
+        _revalidating.update(summary_key(trend["trend_title"]) for trend in pending)
+    if pending:
+        get_executor().submit(_revalidate_summaries, search_agent, pending)
+
+
+class CachedTrendSearchAgent(BaseAgent):
+    """
+    Explains the shortlisted trends, reusing the summaries of earlier sessions.
+
+    Only trends without a cached summary in the current window are sent to the search
+    agent, the only sub-agent; its answer is split per trend and cached (see
+    app/trend_summaries.py). Stale summaries are served as is and refreshed in the
+    background by a copy of the search agent.
+    """
+
+    def _message(self, ctx: InvocationContext, text: str) -> Event:
+        return Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=text)]),
+        )
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        search_agent = self.sub_agents[0]
+        shortlist = str(ctx.session.state.get("shortlisted_trends", ""))
+        trends = parse_trend_lines(shortlist)
+        summaries, stale, missing = await asyncio.to_thread(lookup_summaries, trends)
+        if stale:
+            _schedule_revalidation(search_agent, stale)
+
+        if missing or not trends:
+            # Unparsable shortlists are searched as a whole and not cached.
+            yield self._message(ctx, format_trend_lines(missing) or shortlist)
+            response = ""
+            async for event in search_agent.run_async(ctx):
+                yield event
+                response = _final_text(event) or response
+            if missing:
+                await asyncio.to_thread(
+                    store_summaries, split_summaries(response, missing)
+                )
+
+        if summaries:
+            yield self._message(ctx, "\n\n".join(summaries.values()))
+
+
+cached_trend_search_agent = CachedTrendSearchAgent(
+    name="cached_trend_search_agent",
+    description="Explains why each shortlisted trend is trending, from cache when possible.",
+    sub_agents=[google_search_agent],
+)
+
+
+def trend_window() -> str:
+    """Returns the current hourly window, trends are cached per window."""
+    return datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H")
+
+
+def _serve_cached_trends(callback_context: CallbackContext) -> types.Content | None:
+    """Skips the whole trend pipeline when another session already ran it this window."""
+    cached_trends = trend_cache.get(trend_window())
+    if cached_trends is None:
+        return None
+    # Keep trends_json in state as if the pipeline ran, later workflow steps read it.
+    callback_context.state["trends_json"] = cached_trends
+    return types.Content(role="model", parts=[types.Part(text=cached_trends)])
+
+
+def _store_trends(callback_context: CallbackContext) -> None:
+    """Stores the formatted trends for the other sessions and workers."""
+    trends_json = callback_context.state.get("trends_json")
+    if trends_json:
+        trend_cache.set(trend_window(), trends_json)
+    return None
+
+
 trend_watcher_agent = SequentialAgent(
     name="trend_watcher_agent",
     sub_agents=[
         google_trends_agent,
-        google_search_agent,
+        trend_shortlist_agent,
+        cached_trend_search_agent,
         output_formatter_agent,
     ],
+    before_agent_callback=_serve_cached_trends,
+    after_agent_callback=_store_trends,
 )
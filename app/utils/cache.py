@@ -0,0 +1,171 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from app.utils import codec
+
+DEFAULT_CACHE_PATH = os.path.join(tempfile.gettempdir(), "trend-marketeer-cache.sqlite")
+
+
+def cache_path() -> str:
+    """Returns the SQLite file shared by every worker process on this host."""
+    return os.environ.get("CACHE_PATH", DEFAULT_CACHE_PATH)
+
+
+def open_connection(path: str) -> sqlite3.Connection:
+    """Opens an autocommit SQLite connection in WAL mode, safe to share between processes."""
+    connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+def cache_key(*parts: str) -> str:
+    """Builds a stable, fixed-length cache key from arbitrary strings (e.g. prompts)."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode())
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class SharedCache:
+    """
+    A JSON key/value cache shared across worker processes through a local SQLite file.
+
+    Agent Engine runs several worker processes per replica; keeping caches in process
+    memory means every worker pays for its own cold fill. SQLite in WAL mode lets all
+    workers on the host read concurrently while one writes.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl_seconds: float | None = None,
+        path: str | None = None,
+    ) -> None:
+        """
+        :param namespace: Logical name of the cache, e.g. "products" or "trends"
+        :param ttl_seconds: Default time-to-live of entries, None to keep them forever
+        :param path: SQLite file to use, defaults to cache_path()
+        """
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.path = path or cache_path()
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Returns this thread's connection, creating the table on first use."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = open_connection(self.path)
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " stored_at REAL NOT NULL,"
+                " expires_at REAL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Returns the cached value, or default when missing or expired."""
+        row = (
+            self._connection()
+            .execute(
+                "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            )
+            .fetchone()
+        )
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return default
+        return codec.loads(row[0])
+
+    def get_stale(
+        self, key: str, max_stale_seconds: float, default: Any = None
+    ) -> tuple[Any, bool]:
+        """
+        Like get, but keeps serving an entry up to max_stale_seconds after it expired.
+
+        :param key: The cache key
+        :param max_stale_seconds: How long after expiry an entry may still be served
+        :param default: Returned when the entry is missing or too old
+        :return: The value and whether it is stale, i.e. should be revalidated
+        """
+        row = (
+            self._connection()
+            .execute(
+                "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            )
+            .fetchone()
+        )
+        now = time.time()
+        if row is None or (row[1] is not None and row[1] + max_stale_seconds <= now):
+            return default, False
+        return codec.loads(row[0]), row[1] is not None and row[1] <= now
+
+    def set(self, key: str, value: Any, ttl_seconds: float | None = None) -> None:
+        """Stores a JSON-serializable value, overriding the default TTL if given."""
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        now = time.time()
+        self._connection().execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, value, stored_at, expires_at)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (
+                self.namespace,
+                key,
+                codec.dumps(value),
+                now,
+                now + ttl if ttl is not None else None,
+            ),
+        )
+
+    def delete(self, key: str) -> None:
+        """Removes a single entry."""
+        self._connection().execute(
+            "DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key)
+        )
+
+    def clear(self) -> None:
+        """Removes every entry in this namespace."""
+        self._connection().execute(
+            "DELETE FROM cache WHERE namespace = ?", (self.namespace,)
+        )
+
+    def get_or_set(
+        self,
+        key: str,
+        factory: Callable[[], Any],
+        ttl_seconds: float | None = None,
+    ) -> Any:
+        """Returns the cached value, computing and storing it with factory on a miss."""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = factory()
+            self.set(key, value, ttl_seconds=ttl_seconds)
+        return value
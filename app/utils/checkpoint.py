@@ -0,0 +1,205 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any
+
+from google.adk.sessions.state import State
+from google.adk.tools import BaseTool, ToolContext
+
+from app.utils import codec
+from app.utils.cache import cache_key, cache_path, open_connection
+from app.utils.llm_output import extract_json_array
+
+logger = logging.getLogger(__name__)
+
+# Data tools whose output is checkpointed once per session: a retry reuses it as is.
+SESSION_STAGES = {
+    "trend_watcher_agent",
+    "get_product_data",
+}
+# Tools checkpointed per set of arguments: other trends or products are matched anew,
+# other matches get new plans and picking another plan renders anew.
+ARGUMENT_STAGES = {
+    "matchmaker_agent",
+    "marketing_agent",
+    "generate_and_show_images",
+    "generate_and_show_video",
+    "generate_video_variants",
+}
+# Stages that answer with a JSON array; an empty or unparsable one is not kept, so a
+# retry gets another chance to find something.
+JSON_ARRAY_STAGES = {
+    "trend_watcher_agent",
+    "get_product_data",
+    "matchmaker_agent",
+}
+# Session state key of the id the session's checkpoints are stored under. The id is
+# drawn on first use and kept in state, where every tool and agent of the session can
+# read it, so the speculative renders and Veo jobs of the session are keyed by it too.
+CHECKPOINT_ID_KEY = "checkpoint_id"
+# Prefix of the temporary state key, per function call, holding the stage of a call as
+# restore_checkpoint saw it. Later before_tool_callbacks may change the arguments (e.g.
+# enforce_budget cuts the media counts), so save_checkpoint stores the output under the
+# stage a retry of the same call looks up.
+CALL_STAGE_KEY_PREFIX = f"{State.TEMP_PREFIX}checkpoint_stage:"
+
+
+class CheckpointStore:
+    """
+    Outputs of the completed stages of a campaign, keyed by the checkpoint id of the
+    session (see checkpoint_id) or of a batch entry.
+
+    Lives in the shared SQLite file of app/utils/cache.py, so a retry that lands on
+    another worker of the replica still finds the stages that already succeeded.
+    """
+
+    def __init__(
+        self, path: str | None = None, ttl_seconds: float | None = None
+    ) -> None:
+        """
+        :param path: SQLite file to use, defaults to cache_path()
+        :param ttl_seconds: How long checkpoints stay valid, defaults to
+            CHECKPOINT_TTL_SECONDS (one day)
+        """
+        self.path = path or cache_path()
+        self.ttl_seconds = (
+            ttl_seconds
+            if ttl_seconds is not None
+            else float(os.environ.get("CHECKPOINT_TTL_SECONDS", 86400))
+        )
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Returns this thread's connection, creating the table on first use."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = open_connection(self.path)
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                " session_id TEXT NOT NULL,"
+                " stage TEXT NOT NULL,"
+                " output TEXT NOT NULL,"
+                " saved_at REAL NOT NULL,"
+                " PRIMARY KEY (session_id, stage))"
+            )
+            self._local.connection = connection
+        return connection
+
+    def load(self, session_id: str) -> dict[str, Any]:
+        """Returns every valid checkpoint of a session, by stage."""
+        rows = self._connection().execute(
+            "SELECT stage, output FROM checkpoints WHERE session_id = ? AND saved_at > ?",
+            (session_id, time.time() - self.ttl_seconds),
+        )
+        return {stage: codec.loads(output) for stage, output in rows}
+
+    def get(self, session_id: str, stage: str, default: Any = None) -> Any:
+        """Returns the output of a completed stage, or default."""
+        row = (
+            self._connection()
+            .execute(
+                "SELECT output FROM checkpoints"
+                " WHERE session_id = ? AND stage = ? AND saved_at > ?",
+                (session_id, stage, time.time() - self.ttl_seconds),
+            )
+            .fetchone()
+        )
+        return default if row is None else codec.loads(row[0])
+
+    def save(self, session_id: str, stage: str, output: Any) -> None:
+        """Stores the output of a stage that completed successfully."""
+        self._connection().execute(
+            "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?)",
+            (session_id, stage, codec.dumps(output, default=str), time.time()),
+        )
+
+    def clear(self, session_id: str) -> None:
+        """Removes every checkpoint of a session, e.g. to start a campaign over."""
+        self._connection().execute(
+            "DELETE FROM checkpoints WHERE session_id = ?", (session_id,)
+        )
+
+
+checkpoint_store = CheckpointStore()
+
+
+def _stage(tool: BaseTool, args: dict[str, Any]) -> str | None:
+    """Returns the checkpoint stage of a tool call, or None if it is not checkpointed."""
+    if tool.name in SESSION_STAGES:
+        return tool.name
+    if tool.name in ARGUMENT_STAGES:
+        return f"{tool.name}:{cache_key(json.dumps(args, sort_keys=True))}"
+    return None
+
+
+def _call_stage_key(tool_context: ToolContext) -> str:
+    return f"{CALL_STAGE_KEY_PREFIX}{tool_context.function_call_id}"
+
+
+def new_checkpoint_id() -> str:
+    """Draws the id of a session that has none yet in CHECKPOINT_ID_KEY."""
+    return uuid.uuid4().hex
+
+
+def checkpoint_id(tool_context: ToolContext) -> str:
+    """Returns the id of the session's checkpoints, drawing one on first use."""
+    session_checkpoint_id = tool_context.state.get(CHECKPOINT_ID_KEY)
+    if not session_checkpoint_id:
+        session_checkpoint_id = new_checkpoint_id()
+        tool_context.state[CHECKPOINT_ID_KEY] = session_checkpoint_id
+    return str(session_checkpoint_id)
+
+
+def _worth_keeping(tool: BaseTool, tool_response: Any) -> bool:
+    """Whether a tool output is a result a retry should reuse."""
+    if not tool_response:
+        return False
+    if tool.name in JSON_ARRAY_STAGES and isinstance(tool_response, str):
+        return bool(extract_json_array(tool_response))
+    return True
+
+
+def restore_checkpoint(
+    tool: BaseTool, args: dict[str, Any], tool_context: ToolContext
+) -> Any:
+    """before_tool_callback that answers a tool call from the session's checkpoint."""
+    stage = _stage(tool, args)
+    tool_context.state[_call_stage_key(tool_context)] = stage
+    if stage is None:
+        return None
+    output = checkpoint_store.get(checkpoint_id(tool_context), stage)
+    if output is not None:
+        logger.info(f"Resuming {stage} from checkpoint")
+    return output
+
+
+def save_checkpoint(
+    tool: BaseTool,
+    args: dict[str, Any],
+    tool_context: ToolContext,
+    tool_response: Any,
+) -> None:
+    """after_tool_callback that checkpoints the output of a successful stage."""
+    key = _call_stage_key(tool_context)
+    stage = tool_context.state[key] if key in tool_context.state else _stage(tool, args)
+    if stage is not None and _worth_keeping(tool, tool_response):
+        checkpoint_store.save(checkpoint_id(tool_context), stage, tool_response)
+    return None
@@ -0,0 +1,232 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import threading
+import weakref
+from collections.abc import Callable
+from typing import Any, TypeVar
+
+import httpx
+from google.cloud import bigquery
+from google.cloud import logging as google_cloud_logging
+from google.genai import Client, types
+from google.generativeai import GenerativeModel
+from requests import Session
+from requests.adapters import HTTPAdapter
+
+from app.utils.concurrency import thread_pool_size
+
+T = TypeVar("T")
+
+# Idle connections are kept open this long, so calls a minute apart skip the TLS
+# handshake.
+DEFAULT_KEEPALIVE_SECONDS = 60.0
+
+_lock = threading.Lock()
+_clients: dict[tuple[Any, ...], Any] = {}
+# One lock per client key, so a slow factory only holds up callers of the same client.
+_creation_locks: dict[tuple[Any, ...], threading.Lock] = {}
+
+
+def http_pool_size() -> int:
+    """Connections kept per host and client (HTTP_POOL_SIZE), by default one per thread."""
+    return int(os.environ.get("HTTP_POOL_SIZE", thread_pool_size()))
+
+
+def keepalive_seconds() -> float:
+    """How long an idle connection is kept open (HTTP_KEEPALIVE_SECONDS)."""
+    return float(os.environ.get("HTTP_KEEPALIVE_SECONDS", DEFAULT_KEEPALIVE_SECONDS))
+
+
+def get_client(name: str, factory: Callable[[], T], *key: Any) -> T:
+    """
+    Returns the worker's client for name and key, creating it with factory once.
+
+    The clients handed out are thread-safe and live as long as the worker, so their
+    credentials, discovery documents and connections are reused by every call.
+
+    :param name: Kind of client, e.g. "bigquery"
+    :param factory: Creates the client on first use
+    :param key: What else tells clients of a kind apart, e.g. the project
+    :return: The shared client
+    """
+    client_key = (name, *key)
+    with _lock:
+        if client_key in _clients:
+            return _clients[client_key]
+        creation_lock = _creation_locks.setdefault(client_key, threading.Lock())
+    with creation_lock:
+        with _lock:
+            if client_key in _clients:
+                return _clients[client_key]
+        client = factory()
+        with _lock:
+            _clients[client_key] = client
+        return client
+
+
+def mount_connection_pool(session: Session, pool_size: int | None = None) -> Session:
+    """
+    Gives a requests session a connection pool of pool_size connections per host.
+
+    The default pool keeps 10 connections, so with more concurrent calls the rest
+    open a connection, handshake and throw it away after one request.
+
+    :param session: The session of a google-cloud client, client._http
+    :param pool_size: Connections kept per host, defaults to http_pool_size()
+    :return: The session
+    """
+    pool_size = pool_size or http_pool_size()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class CountingTransport(httpx.HTTPTransport):
+    """
+    An httpx transport that counts requests and the connections opened for them.
+
+    Connections are read from the transport's private httpcore pool; with an httpx
+    release that no longer exposes it, counts_connections turns False and only the
+    requests are counted.
+    """
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.requests = 0
+        self.connections = 0
+        self.counts_connections = True
+        self._seen: weakref.WeakSet = weakref.WeakSet()
+        self._stats_lock = threading.Lock()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        response = super().handle_request(request)
+        open_connections = getattr(getattr(self, "_pool", None), "connections", None)
+        with self._stats_lock:
+            self.requests += 1
+            if open_connections is None:
+                self.counts_connections = False
+                return response
+            for connection in open_connections:
+                if connection not in self._seen:
+                    self._seen.add(connection)
+                    self.connections += 1
+        return response
+
+
+def get_bigquery_client(project: str | None = None) -> bigquery.Client:
+    """Returns the shared BigQuery client of a project."""
+
+    def _create() -> bigquery.Client:
+        client = bigquery.Client(project=project)
+        mount_connection_pool(client._http)
+        return client
+
+    return get_client("bigquery", _create, project)
+
+
+def get_logging_client(project: str | None = None) -> google_cloud_logging.Client:
+    """Returns the shared Cloud Logging client of a project."""
+
+    def _create() -> google_cloud_logging.Client:
+        client = google_cloud_logging.Client(project=project)
+        mount_connection_pool(client._http)
+        return client
+
+    return get_client("logging", _create, project)
+
+
+def get_genai_client(location: str | None = None) -> Client:
+    """
+    Returns the shared Gen AI client of a location.
+
+    Its transport keeps http_pool_size() connections alive for keepalive_seconds().
+
+    :param location: Vertex AI location, defaults to GOOGLE_CLOUD_LOCATION
+    :return: The shared client
+    """
+
+    def _create() -> Client:
+        transport = CountingTransport(
+            limits=httpx.Limits(
+                max_connections=http_pool_size(),
+                max_keepalive_connections=http_pool_size(),
+                keepalive_expiry=keepalive_seconds(),
+            )
+        )
+        return Client(
+            location=location,
+            http_options=types.HttpOptions(client_args={"transport": transport}),
+        )
+
+    return get_client("genai", _create, location)
+
+
+def get_generative_model(model_name: str) -> GenerativeModel:
+    """Returns the shared GenerativeModel of a model name."""
+    return get_client(
+        "generative_model", lambda: GenerativeModel(model_name), model_name
+    )
+
+
+def _counts(client: Any) -> tuple[int, int] | None:
+    """Requests sent and connections opened by a client, if it can tell."""
+    if isinstance(client, Client):
+        # Private attributes of the Gen AI SDK; absent in other releases.
+        http_client = getattr(
+            getattr(client, "_api_client", None), "_httpx_client", None
+        )
+        transport = getattr(http_client, "_transport", None)
+        if isinstance(transport, CountingTransport) and transport.counts_connections:
+            return transport.requests, transport.connections
+        return None
+    session = getattr(client, "_http", None)
+    if not isinstance(session, Session):
+        return None
+    requests = connections = 0
+    # The same adapter is mounted for https:// and http://.
+    for adapter in {id(a): a for a in session.adapters.values()}.values():
+        if not isinstance(adapter, HTTPAdapter):
+            continue
+        for key in adapter.poolmanager.pools.keys():
+            pool = adapter.poolmanager.pools[key]
+            requests += pool.num_requests
+            connections += pool.num_connections
+    return requests, connections
+
+
+def connection_stats() -> dict[str, dict[str, Any]]:
+    """
+    Reports how well each shared client reuses its connections.
+
+    :return: Per client ("kind:key") the requests sent, the connections opened, and
+        the share of requests that reused an open connection
+    """
+    with _lock:
+        clients = dict(_clients)
+    stats = {}
+    for key, client in clients.items():
+        counts = _counts(client)
+        if counts is None:
+            continue
+        requests, connections = counts
+        stats[":".join(str(part) for part in key)] = {
+            "requests": requests,
+            "connections": connections,
+            "reuse_ratio": round(1 - connections / requests, 3) if requests else None,
+        }
+    return stats
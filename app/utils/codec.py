@@ -0,0 +1,137 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+from collections.abc import Callable
+from typing import Any, Protocol
+
+try:
+    import orjson
+except ImportError:  # Optional: the stdlib backend is used without it.
+    orjson = None  # type: ignore[assignment]
+
+JSON_CODECS = ("auto", "json", "orjson")
+
+
+class JsonCodec(Protocol):
+    """Encodes and decodes the JSON payloads passed between tools, prompts and traces."""
+
+    name: str
+
+    def dumps(
+        self,
+        obj: Any,
+        indent: bool = False,
+        sort_keys: bool = False,
+        default: Callable[[Any], Any] | None = None,
+    ) -> str: ...
+
+    def loads(self, data: str | bytes) -> Any: ...
+
+
+class StdlibCodec:
+    """The json module, compact by default: no whitespace and non-ASCII kept as is."""
+
+    name = "json"
+
+    def dumps(
+        self,
+        obj: Any,
+        indent: bool = False,
+        sort_keys: bool = False,
+        default: Callable[[Any], Any] | None = None,
+    ) -> str:
+        if indent:
+            return json.dumps(
+                obj, indent=2, sort_keys=sort_keys, default=default, ensure_ascii=False
+            )
+        return json.dumps(
+            obj,
+            separators=(",", ":"),
+            sort_keys=sort_keys,
+            default=default,
+            ensure_ascii=False,
+        )
+
+    def loads(self, data: str | bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec:
+    """orjson, which encodes and decodes in Rust and writes the same compact output."""
+
+    name = "orjson"
+
+    def dumps(
+        self,
+        obj: Any,
+        indent: bool = False,
+        sort_keys: bool = False,
+        default: Callable[[Any], Any] | None = None,
+    ) -> str:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=default, option=option).decode()
+
+    def loads(self, data: str | bytes) -> Any:
+        return orjson.loads(data)
+
+
+def get_codec(name: str | None = None) -> JsonCodec:
+    """
+    Returns a JSON codec by name.
+
+    :param name: "json", "orjson" or "auto" (orjson when installed), defaults to the
+        JSON_CODEC environment variable
+    :return: The codec
+    """
+    name = name or os.environ.get("JSON_CODEC", "auto")
+    if name not in JSON_CODECS:
+        raise ValueError(f"Unknown JSON codec {name!r}, expected one of {JSON_CODECS}")
+    if name == "orjson" and orjson is None:
+        raise ValueError("JSON_CODEC=orjson but orjson is not installed")
+    if name == "orjson" or (name == "auto" and orjson is not None):
+        return OrjsonCodec()
+    return StdlibCodec()
+
+
+_codec = get_codec()
+
+
+def dumps(
+    obj: Any,
+    indent: bool = False,
+    sort_keys: bool = False,
+    default: Callable[[Any], Any] | None = None,
+) -> str:
+    """
+    Serializes obj with the configured codec.
+
+    :param obj: The value to serialize
+    :param indent: Indent with two spaces, for humans; compact otherwise, for prompts,
+        tool results and logs
+    :param sort_keys: Sort object keys, for output that does not depend on insertion order
+    :param default: Called for values that are not JSON serializable
+    :return: The JSON string
+    """
+    return _codec.dumps(obj, indent=indent, sort_keys=sort_keys, default=default)
+
+
+def loads(data: str | bytes) -> Any:
+    """Parses a JSON string with the configured codec."""
+    return _codec.loads(data)
@@ -0,0 +1,102 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import os
+import threading
+from collections.abc import AsyncGenerator, AsyncIterable, Generator, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from typing import TypeVar
+
+T = TypeVar("T")
+
+# How often a coroutine waiting for a request slot checks for a free one.
+SLOT_POLL_SECONDS = 0.05
+
+# Deployment parameters, passed to every worker as environment variables by
+# deploy_agent_engine_app.
+DEFAULT_NUM_WORKERS = 4
+DEFAULT_WORKER_CONCURRENCY = 8
+DEFAULT_THREAD_POOL_SIZE = 16
+
+_lock = threading.Lock()
+_executor: ThreadPoolExecutor | None = None
+_request_slots: threading.BoundedSemaphore | None = None
+
+
+def worker_concurrency() -> int:
+    """Maximum number of requests a single worker process serves at once."""
+    return int(os.environ.get("WORKER_CONCURRENCY", DEFAULT_WORKER_CONCURRENCY))
+
+
+def thread_pool_size() -> int:
+    """Number of threads in the worker's shared pool for blocking I/O."""
+    return int(os.environ.get("THREAD_POOL_SIZE", DEFAULT_THREAD_POOL_SIZE))
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Returns the worker-wide thread pool used for blocking client calls."""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=thread_pool_size(), thread_name_prefix="trend-marketeer"
+            )
+        return _executor
+
+
+def request_slots() -> threading.BoundedSemaphore:
+    """Returns the semaphore bounding in-flight requests in this worker."""
+    global _request_slots
+    with _lock:
+        if _request_slots is None:
+            _request_slots = threading.BoundedSemaphore(worker_concurrency())
+        return _request_slots
+
+
+def bounded_stream(events: Iterable[T]) -> Generator[T, None, None]:
+    """
+    Streams events while holding one of the worker's request slots.
+
+    The slot is taken when the first event is requested and given back in a finally
+    block as soon as the stream ends, fails or is closed by the caller, e.g. when the
+    client disconnects; the wrapped stream is closed with it.
+    """
+    slots = request_slots()
+    slots.acquire()
+    try:
+        yield from events
+    finally:
+        slots.release()
+
+
+async def bounded_async_stream(events: AsyncIterable[T]) -> AsyncGenerator[T, None]:
+    """
+    Async version of bounded_stream.
+
+    Waiting for a slot polls the semaphore instead of blocking, so the event loop
+    keeps serving the requests already running, and a cancelled wait holds no slot.
+    """
+    slots = request_slots()
+    while not slots.acquire(blocking=False):
+        await asyncio.sleep(SLOT_POLL_SECONDS)
+    iterator = aiter(events)
+    try:
+        async for event in iterator:
+            yield event
+    finally:
+        slots.release()
+        close = getattr(iterator, "aclose", None)
+        if close is not None:
+            await close()
@@ -0,0 +1,243 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterable
+from typing import Any, Protocol
+
+DEFAULT_FEEDBACK_BATCH_SIZE = 100
+DEFAULT_FEEDBACK_FLUSH_SECONDS = 5.0
+DEFAULT_FEEDBACK_QUEUE_SIZE = 10_000
+
+
+class FeedbackBackpressureError(RuntimeError):
+    """Raised when the feedback buffer stays full, i.e. the sink cannot keep up."""
+
+
+class FeedbackSink(Protocol):
+    """Destination that receives feedback entries one batch at a time."""
+
+    def write(self, entries: list[dict[str, Any]]) -> None: ...
+
+
+class CloudLoggingSink:
+    """Writes a batch of feedback to Cloud Logging in a single API call."""
+
+    def __init__(self, logger: Any) -> None:
+        """
+        :param logger: A google.cloud.logging Logger
+        """
+        self.logger = logger
+
+    def write(self, entries: list[dict[str, Any]]) -> None:
+        with self.logger.batch() as batch:
+            for entry in entries:
+                batch.log_struct(entry, severity="INFO")
+
+
+class FileSink:
+    """Appends feedback to a local JSONL file, for tests and local runs."""
+
+    def __init__(self, path: str) -> None:
+        """
+        :param path: JSONL file to append to
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, entries: list[dict[str, Any]]) -> None:
+        with self._lock, open(self.path, "a") as f:
+            f.writelines(json.dumps(entry) + "\n" for entry in entries)
+
+    def read(self) -> list[dict[str, Any]]:
+        """Returns every entry written so far."""
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+
+class _FlushRequest:
+    """Queue marker asking the writer thread to write what it has and signal back."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+
+
+class FeedbackWriter:
+    """
+    Buffers feedback in memory and writes it to a sink in batches from a background thread.
+
+    A batch is written when it reaches max_batch_size entries or flush_interval_seconds
+    after its first entry, whichever comes first, so the request path only pays for a
+    queue put. The queue is bounded: when the sink cannot keep up, submit blocks for up
+    to put_timeout_seconds and then raises FeedbackBackpressureError, pushing back on
+    the caller instead of growing memory without limit.
+    """
+
+    def __init__(
+        self,
+        sink: FeedbackSink,
+        max_batch_size: int = DEFAULT_FEEDBACK_BATCH_SIZE,
+        flush_interval_seconds: float = DEFAULT_FEEDBACK_FLUSH_SECONDS,
+        max_queue_size: int = DEFAULT_FEEDBACK_QUEUE_SIZE,
+        put_timeout_seconds: float = 1.0,
+    ) -> None:
+        """
+        :param sink: Where batches are written
+        :param max_batch_size: Maximum number of entries per write
+        :param flush_interval_seconds: Maximum time an entry waits before being written
+        :param max_queue_size: Maximum number of entries buffered in memory
+        :param put_timeout_seconds: How long submit waits for room in a full queue
+        """
+        self.sink = sink
+        self.max_batch_size = max_batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.put_timeout_seconds = put_timeout_seconds
+        self.written = 0
+        self.failed = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="feedback-writer", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, entry: dict[str, Any]) -> None:
+        """Queues one feedback entry, blocking briefly when the buffer is full."""
+        if self._closed:
+            raise RuntimeError("FeedbackWriter is closed")
+        self._put(entry)
+
+    def flush(self, timeout: float | None = None) -> None:
+        """Writes everything submitted so far and waits until it has been written."""
+        if self._closed:
+            raise RuntimeError("FeedbackWriter is closed")
+        request = _FlushRequest()
+        self._put(request)
+        request.done.wait(timeout)
+
+    def close(self, timeout: float | None = None) -> None:
+        """Flushes the buffer and stops the background thread."""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._queue.put(None, timeout=self.put_timeout_seconds)
+        except queue.Full:
+            logging.warning(
+                f"Feedback buffer still full on close, {self._queue.qsize()} entries "
+                "may not be written"
+            )
+            return
+        self._thread.join(timeout)
+
+    def _put(self, item: dict[str, Any] | _FlushRequest) -> None:
+        try:
+            self._queue.put(item, timeout=self.put_timeout_seconds)
+        except queue.Full:
+            raise FeedbackBackpressureError(
+                f"Feedback buffer full ({self._queue.maxsize} entries), "
+                "the sink is not keeping up; retry later"
+            ) from None
+
+    def _run(self) -> None:
+        while True:
+            batch, signal, stop = self._next_batch()
+            if batch:
+                self._write(batch)
+            if signal is not None:
+                signal.done.set()
+            if stop:
+                self._drain()
+                return
+
+    def _drain(self) -> None:
+        """Writes what was queued behind the stop marker by a racing submit or flush."""
+        batch: list[dict[str, Any]] = []
+        signals: list[_FlushRequest] = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, _FlushRequest):
+                signals.append(item)
+            elif item is not None:
+                batch.append(item)
+        if batch:
+            self._write(batch)
+        for signal in signals:
+            signal.done.set()
+
+    def _next_batch(
+        self,
+    ) -> tuple[list[dict[str, Any]], _FlushRequest | None, bool]:
+        """Collects up to max_batch_size entries, waiting at most the flush interval."""
+        batch: list[dict[str, Any]] = []
+        deadline: float | None = None
+        while len(batch) < self.max_batch_size:
+            timeout = None if deadline is None else deadline - time.monotonic()
+            if timeout is not None and timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, None, True
+            if isinstance(item, _FlushRequest):
+                return batch, item, False
+            batch.append(item)
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval_seconds
+        return batch, None, False
+
+    def _write(self, batch: list[dict[str, Any]]) -> None:
+        try:
+            self.sink.write(batch)
+            self.written += len(batch)
+        except Exception:
+            self.failed += len(batch)
+            logging.exception(f"Failed to write {len(batch)} feedback entries")
+
+
+def score_distribution(
+    entries: Iterable[dict[str, Any]],
+) -> dict[str, dict[str, Any]]:
+    """
+    Aggregates feedback per invocation.
+
+    :param entries: Feedback entries, e.g. FileSink.read()
+    :return: Per invocation_id the number of entries, the mean score and how often
+        each score was given
+    """
+    scores: dict[str, Counter] = {}
+    for entry in entries:
+        scores.setdefault(entry["invocation_id"], Counter())[entry["score"]] += 1
+    return {
+        invocation_id: {
+            "count": sum(counter.values()),
+            "mean": sum(score * n for score, n in counter.items())
+            / sum(counter.values()),
+            "scores": dict(sorted(counter.items())),
+        }
+        for invocation_id, counter in scores.items()
+    }
@@ -12,10 +12,192 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+
 import logging
+import os
+import threading
+import time
+from collections.abc import Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
 
 import google.cloud.storage as storage
 from google.api_core import exceptions
+from google.cloud.storage.retry import DEFAULT_RETRY
+
+from app.utils.clients import get_client, http_pool_size, mount_connection_pool
+
+DEFAULT_TRANSFER_WORKERS = 8
+# Objects are fetched, and objects over 8 MiB sent (as resumable uploads), in chunks
+# of this size, so a dropped connection only repeats the current chunk. Must be a
+# multiple of 256 KiB.
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+BUCKET_EXISTS_TTL_SECONDS = 300.0
+
+_lock = threading.Lock()
+_executor: ThreadPoolExecutor | None = None
+_bucket_exists: dict[str, tuple[bool, float]] = {}
+
+
+def transfer_workers() -> int:
+    """Number of objects transferred at once (GCS_TRANSFER_WORKERS)."""
+    return int(os.environ.get("GCS_TRANSFER_WORKERS", DEFAULT_TRANSFER_WORKERS))
+
+
+def chunk_size() -> int:
+    """Size of one chunk of a chunked transfer, in bytes (GCS_CHUNK_SIZE)."""
+    return int(os.environ.get("GCS_CHUNK_SIZE", DEFAULT_CHUNK_SIZE))
+
+
+def get_storage_client(project: str | None = None) -> storage.Client:
+    """
+    Returns the worker's storage client for a project, from the client registry.
+
+    Its connection pool holds a connection per transfer worker, so concurrent
+    transfers reuse connections instead of opening (and handshaking) new ones.
+
+    :param project: Google Cloud project ID, defaults to GOOGLE_CLOUD_PROJECT
+    :return: The shared client
+    """
+    project = project or os.environ.get("GOOGLE_CLOUD_PROJECT")
+
+    def _create() -> storage.Client:
+        client = storage.Client(project=project)
+        mount_connection_pool(client._http, max(transfer_workers(), http_pool_size()))
+        return client
+
+    return get_client("storage", _create, project)
+
+
+def transfer_executor() -> ThreadPoolExecutor:
+    """
+    Returns the worker's thread pool for GCS transfers.
+
+    Tasks submitted to it must not wait on other tasks of the pool: a full pool of
+    waiting tasks would never finish.
+    """
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=transfer_workers(), thread_name_prefix="gcs-transfer"
+            )
+        return _executor
+
+
+def parse_gcs_uri(uri: str) -> tuple[str, str]:
+    """
+    Splits a gs:// URI into bucket and object name.
+
+    :param uri: A URI like gs://bucket/path/to/object
+    :return: The bucket and the object name
+    """
+    if not uri.startswith("gs://"):
+        raise ValueError(f"Not a GCS URI: {uri!r}")
+    bucket_name, _, object_name = uri[5:].partition("/")
+    return bucket_name, object_name
+
+
+def public_url(bucket_name: str, object_name: str) -> str:
+    """Returns the HTTPS URL of an object."""
+    return f"https://storage.googleapis.com/{bucket_name}/{object_name}"
+
+
+def bucket_exists(bucket_name: str, project: str | None = None) -> bool:
+    """
+    Checks whether a bucket exists, asking GCS at most once per BUCKET_EXISTS_TTL_SECONDS.
+
+    :param bucket_name: Name of the bucket, with or without gs://
+    :param project: Google Cloud project ID, defaults to GOOGLE_CLOUD_PROJECT
+    :return: True if the bucket exists
+    """
+    bucket_name = bucket_name.removeprefix("gs://")
+    cached = _bucket_exists.get(bucket_name)
+    if cached is not None and time.monotonic() - cached[1] < BUCKET_EXISTS_TTL_SECONDS:
+        return cached[0]
+    exists = get_storage_client(project).bucket(bucket_name).exists()
+    _bucket_exists[bucket_name] = (exists, time.monotonic())
+    return exists
+
+
+def upload_bytes(
+    uri: str,
+    data: bytes | str,
+    content_type: str = "application/octet-stream",
+    project: str | None = None,
+) -> str:
+    """
+    Uploads an object in one request, or in resumable chunks when it is over 8 MiB.
+
+    :param uri: gs:// URI to write to
+    :param data: The content
+    :param content_type: MIME type of the content
+    :param project: Google Cloud project ID, defaults to GOOGLE_CLOUD_PROJECT
+    :return: The URI
+    """
+    bucket_name, object_name = parse_gcs_uri(uri)
+    blob = get_storage_client(project).bucket(bucket_name).blob(object_name)
+    blob.chunk_size = chunk_size()
+    # Rewriting the same content is harmless, so failed uploads are retried.
+    blob.upload_from_string(data, content_type=content_type, retry=DEFAULT_RETRY)
+    return uri
+
+
+def download_bytes(uri: str, project: str | None = None) -> bytes:
+    """
+    Downloads an object, in ranged chunks when it is larger than one chunk.
+
+    :param uri: gs:// URI to read
+    :param project: Google Cloud project ID, defaults to GOOGLE_CLOUD_PROJECT
+    :return: The content
+    """
+    bucket_name, object_name = parse_gcs_uri(uri)
+    blob = get_storage_client(project).bucket(bucket_name).blob(object_name)
+    blob.chunk_size = chunk_size()
+    return blob.download_as_bytes(retry=DEFAULT_RETRY)
+
+
+def upload_many(
+    uploads: Iterable[tuple[str, bytes | str, str]],
+    raise_exception: bool = True,
+    project: str | None = None,
+) -> list[str | Exception]:
+    """
+    Uploads objects concurrently on the transfer pool.
+
+    :param uploads: (gs:// URI, content, content type) per object
+    :param raise_exception: Raise the first failure; otherwise failures are returned
+        in place of their URI
+    :param project: Google Cloud project ID, defaults to GOOGLE_CLOUD_PROJECT
+    :return: The URIs, in the order of uploads
+    """
+    futures = [
+        transfer_executor().submit(upload_bytes, uri, data, content_type, project)
+        for uri, data, content_type in uploads
+    ]
+    return [_result(future, raise_exception) for future in futures]
+
+
+def download_many(
+    uris: Iterable[str], raise_exception: bool = True, project: str | None = None
+) -> list[bytes | Exception]:
+    """
+    Downloads objects concurrently on the transfer pool.
+
+    :param uris: gs:// URIs to read
+    :param raise_exception: Raise the first failure; otherwise failures are returned
+        in place of their content
+    :param project: Google Cloud project ID, defaults to GOOGLE_CLOUD_PROJECT
+    :return: The contents, in the order of uris
+    """
+    futures = [transfer_executor().submit(download_bytes, uri, project) for uri in uris]
+    return [_result(future, raise_exception) for future in futures]
+
+
+def _result(future: Future, raise_exception: bool) -> Any:
+    if raise_exception:
+        return future.result()
+    return future.exception() or future.result()
 
 
 def create_bucket_if_not_exists(bucket_name: str, project: str, location: str) -> None:
@@ -26,17 +208,20 @@ def create_bucket_if_not_exists(bucket_name: str, project: str, location: str) -
         project: Google Cloud project ID
         location: Location to create the bucket in (defaults to europe-west4)
     """
-    storage_client = storage.Client(project=project)
+    storage_client = get_storage_client(project)
 
     if bucket_name.startswith("gs://"):
         bucket_name = bucket_name[5:]
-    try:
-        storage_client.get_bucket(bucket_name)
+    if bucket_exists(bucket_name, project):
         logging.info(f"Bucket {bucket_name} already exists")
-    except exceptions.NotFound:
+        return
+    try:
         bucket = storage_client.create_bucket(
             bucket_name,
             location=location,
             project=project,
         )
         logging.info(f"Created bucket {bucket.name} in {bucket.location}")
+    except exceptions.Conflict:
+        logging.info(f"Bucket {bucket_name} already exists")
+    _bucket_exists[bucket_name] = (True, time.monotonic())
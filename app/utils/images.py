@@ -0,0 +1,127 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import io
+from dataclasses import dataclass
+
+from PIL import Image
+
+# name:width[xheight]:format[:quality]; a rendition without a height keeps the aspect ratio.
+DEFAULT_RENDITIONS = (
+    "thumbnail:320:webp:80,"
+    "story:1080x1920:jpeg:85,"
+    "feed:1080x1350:jpeg:85,"
+    "web:1080:webp:85"
+)
+
+CONTENT_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}
+EXTENSIONS = {"JPEG": "jpg", "WEBP": "webp", "PNG": "png"}
+
+
+@dataclass(frozen=True)
+class Rendition:
+    """A derived version of an image for one channel: its size and encoding."""
+
+    name: str
+    width: int
+    height: int | None = None
+    format: str = "JPEG"
+    quality: int = 85
+
+    @property
+    def content_type(self) -> str:
+        return CONTENT_TYPES[self.format]
+
+    @property
+    def extension(self) -> str:
+        return EXTENSIONS[self.format]
+
+
+def parse_renditions(spec: str) -> list[Rendition]:
+    """
+    Parses a comma-separated list of renditions.
+
+    :param spec: Renditions as name:width[xheight]:format[:quality], e.g.
+        "thumbnail:320:webp:80,story:1080x1920:jpeg"
+    :return: The renditions, in the order given
+    """
+    renditions = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, size, image_format, *quality = item.split(":")
+        width, _, height = size.partition("x")
+        image_format = image_format.upper().replace("JPG", "JPEG")
+        if image_format not in CONTENT_TYPES:
+            raise ValueError(
+                f"Unsupported rendition format {image_format!r} in {item!r}"
+            )
+        renditions.append(
+            Rendition(
+                name=name,
+                width=int(width),
+                height=int(height) if height else None,
+                format=image_format,
+                quality=int(quality[0]) if quality else 85,
+            )
+        )
+    return renditions
+
+
+def _resize(image: Image.Image, rendition: Rendition) -> Image.Image:
+    """Scales to the rendition width, cropping to its height around the center if set."""
+    # reducing_gap first shrinks by an integer factor, which is much cheaper than
+    # resampling the 2k original with LANCZOS and looks the same at these sizes.
+    if rendition.height is None:
+        height = round(image.height * rendition.width / image.width)
+        return image.resize(
+            (rendition.width, height), Image.Resampling.LANCZOS, reducing_gap=2.0
+        )
+    scale = max(rendition.width / image.width, rendition.height / image.height)
+    left = (image.width - rendition.width / scale) / 2
+    top = (image.height - rendition.height / scale) / 2
+    box = (left, top, image.width - left, image.height - top)
+    return image.resize(
+        (rendition.width, rendition.height),
+        Image.Resampling.LANCZOS,
+        box=box,
+        reducing_gap=2.0,
+    )
+
+
+def render_renditions(
+    data: bytes, renditions: list[Rendition]
+) -> dict[str, tuple[bytes, int, int]]:
+    """
+    Renders every rendition of one image, decoding it only once.
+
+    CPU bound and free of I/O, so it can run in a process pool.
+
+    :param data: The encoded source image
+    :param renditions: The renditions to produce
+    :return: Per rendition name the encoded image, its width and its height
+    """
+    with Image.open(io.BytesIO(data)) as source:
+        source.load()
+        image = source.convert("RGBA" if "A" in source.getbands() else "RGB")
+    results = {}
+    for rendition in renditions:
+        resized = _resize(image, rendition)
+        if rendition.format == "JPEG" and resized.mode != "RGB":
+            resized = resized.convert("RGB")
+        buffer = io.BytesIO()
+        resized.save(
+            buffer, format=rendition.format, quality=rendition.quality, optimize=True
+        )
+        results[rendition.name] = (buffer.getvalue(), resized.width, resized.height)
+    return results
@@ -0,0 +1,41 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+
+from app.utils import codec
+
+
+def extract_json_array(raw_output: str) -> list | None:
+    """Return the JSON array in an LLM response, or None when there is none."""
+
+    try:
+        parsed_output = codec.loads(raw_output)
+        if isinstance(parsed_output, list):
+            return parsed_output
+    except json.JSONDecodeError:
+        pass
+
+    # Some LLM responses wrap the JSON in prose or code fences—fish out the array if possible.
+    start_index = raw_output.find("[")
+    end_index = raw_output.rfind("]")
+    if start_index != -1 and end_index != -1 and end_index > start_index:
+        try:
+            parsed_output = codec.loads(raw_output[start_index : end_index + 1])
+            if isinstance(parsed_output, list):
+                return parsed_output
+        except json.JSONDecodeError:
+            pass
+
+    return None
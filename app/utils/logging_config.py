@@ -0,0 +1,119 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import atexit
+import datetime
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+
+from app.utils import codec
+
+# Attributes every LogRecord has; anything else was passed through extra= and is
+# emitted as a structured field.
+_RECORD_ATTRIBUTES = set(logging.LogRecord("", 0, "", 0, "", None, None).__dict__) | {
+    "message",
+    "asctime",
+    "taskName",
+}
+
+_configure_lock = threading.Lock()
+_listener: logging.handlers.QueueListener | None = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as one JSON object per line.
+
+    Uses the severity/message keys that Cloud Logging picks up from stdout, and adds
+    every field passed with extra= so log lines can be filtered without parsing text.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "severity": record.levelname,
+            "time": datetime.datetime.fromtimestamp(
+                record.created, datetime.timezone.utc
+            ).isoformat(),
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(
+            {
+                key: value
+                for key, value in record.__dict__.items()
+                if key not in _RECORD_ATTRIBUTES
+            }
+        )
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return codec.dumps(entry, default=str)
+
+
+def configure_logging() -> None:
+    """
+    Installs the process-wide logging setup once; later calls are no-ops.
+
+    Records are put on an in-memory queue by a QueueHandler and written by a single
+    background thread, so a slow stdout or log collector never blocks a request.
+
+    Environment:
+        LOG_LEVEL: Root level, defaults to INFO.
+        LOG_FORMAT: "json" (default) for structured lines, "text" for local runs.
+    """
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            return
+
+        stream_handler = logging.StreamHandler(sys.stdout)
+        if os.environ.get("LOG_FORMAT", "json") == "text":
+            stream_handler.setFormatter(
+                logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s")
+            )
+        else:
+            stream_handler.setFormatter(JsonFormatter())
+
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(
+            log_queue, stream_handler, respect_handler_level=True
+        )
+        _listener.start()
+        atexit.register(_listener.stop)
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(logging.handlers.QueueHandler(log_queue))
+        root.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
+
+
+def prompt_preview(prompt: str) -> str:
+    """
+    Returns what to log of a prompt: the full body only when LOG_PROMPTS=true and the
+    call is sampled (LOG_PROMPT_SAMPLE_RATE, default 1.0), otherwise the first
+    LOG_PROMPT_CHARS characters (default 200) and the total length.
+    """
+    log_prompts = os.environ.get("LOG_PROMPTS", "false").lower() == "true"
+    sample_rate = float(os.environ.get("LOG_PROMPT_SAMPLE_RATE", 1.0))
+    if log_prompts and random.random() < sample_rate:
+        return prompt
+    limit = int(os.environ.get("LOG_PROMPT_CHARS", 200))
+    if len(prompt) <= limit:
+        return prompt
+    return f"{prompt[:limit]}... ({len(prompt)} chars)"
@@ -0,0 +1,228 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import functools
+import json
+import logging
+import os
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, replace
+from typing import Any
+
+from google.adk.sessions.state import State
+from google.genai import types
+
+logger = logging.getLogger(__name__)
+
+# Function responses that precede a given root_agent turn, mapped to the stage of that turn.
+# Anything else (a fresh user message) is treated as the "plan" stage.
+_STAGE_AFTER_TOOL = {
+    "trend_watcher_agent": "handoff",
+    "get_product_data": "handoff",
+    "matchmaker_agent": "handoff",
+    "marketing_agent": "present",
+    "generate_and_show_images": "recap",
+    "generate_and_show_video": "recap",
+    "generate_video_variants": "recap",
+}
+
+
+@dataclass(frozen=True)
+class StageRoute:
+    """Model and thinking budget assigned to a single workflow stage."""
+
+    model: str
+    thinking_budget: int | None = None
+    max_output_tokens: int | None = None
+
+    def thinking_config(self) -> types.ThinkingConfig | None:
+        """Returns the ThinkingConfig for this route, or None to use the model default."""
+        if self.thinking_budget is None:
+            return None
+        return types.ThinkingConfig(
+            include_thoughts=self.thinking_budget > 0,
+            thinking_budget=self.thinking_budget,
+        )
+
+
+# "legacy" reproduces the original behaviour: every stage pays Pro-with-thinking.
+# "balanced" keeps Pro only for planning and moves hand-offs and recaps to Flash.
+ROUTING_PROFILES: dict[str, dict[str, StageRoute]] = {
+    "legacy": {
+        "plan": StageRoute("gemini-2.5-pro", 32768, 65536),
+        "handoff": StageRoute("gemini-2.5-pro", 32768, 65536),
+        "present": StageRoute("gemini-2.5-pro", 32768, 65536),
+        "recap": StageRoute("gemini-2.5-pro", 32768, 65536),
+        "matchmaker": StageRoute("gemini-2.5-flash"),
+        "marketing": StageRoute("gemini-2.5-flash"),
+    },
+    "balanced": {
+        "plan": StageRoute("gemini-2.5-pro", 4096, 8192),
+        "handoff": StageRoute("gemini-2.5-flash", 0, 8192),
+        "present": StageRoute("gemini-2.5-flash", 1024, 16384),
+        "recap": StageRoute("gemini-2.5-flash", 0, 4096),
+        "matchmaker": StageRoute("gemini-2.5-flash"),
+        "marketing": StageRoute("gemini-2.5-flash"),
+    },
+}
+DEFAULT_PROFILE = "balanced"
+
+# Prefix of the temporary state key, per agent, holding the stage, model and start time
+# of its model call in flight. Temporary state only lives as long as the invocation, so
+# a call that fails before record_model_latency runs leaves nothing behind.
+MODEL_CALL_KEY_PREFIX = f"{State.TEMP_PREFIX}model_call:"
+
+
+def load_routes(
+    profile: str | None = None, overrides: str | None = None
+) -> dict[str, StageRoute]:
+    """Resolves the stage routes for a profile, applying optional JSON overrides.
+
+    Args:
+        profile: Name of a profile in ROUTING_PROFILES. Defaults to the
+            MODEL_ROUTING_PROFILE environment variable, then DEFAULT_PROFILE.
+        overrides: JSON object (or path to a JSON file) mapping stage names to
+            partial routes, e.g. '{"handoff": {"model": "gemini-2.5-flash-lite"}}'.
+            Defaults to the MODEL_ROUTING environment variable.
+
+    Returns:
+        dict[str, StageRoute]: The route for every stage.
+    """
+    profile = profile or os.environ.get("MODEL_ROUTING_PROFILE", DEFAULT_PROFILE)
+    if profile not in ROUTING_PROFILES:
+        raise ValueError(
+            f"Unknown routing profile {profile!r}, expected one of {sorted(ROUTING_PROFILES)}"
+        )
+    routes = dict(ROUTING_PROFILES[profile])
+
+    overrides = overrides if overrides is not None else os.environ.get("MODEL_ROUTING")
+    if overrides:
+        if os.path.isfile(overrides):
+            with open(overrides) as f:
+                overrides = f.read()
+        for stage, fields in json.loads(overrides).items():
+            base = routes.get(stage, StageRoute(model=fields.get("model", "")))
+            routes[stage] = replace(base, **fields)
+    return routes
+
+
+@functools.lru_cache(maxsize=8)
+def _cached_routes(profile: str | None, overrides: str | None) -> dict[str, StageRoute]:
+    """load_routes() once per configuration; an overrides file is read only once."""
+    return load_routes(profile, overrides)
+
+
+def get_route(stage: str) -> StageRoute:
+    """Returns the configured route for a single stage.
+
+    Runs on every model call, so the routes are resolved once per value of
+    MODEL_ROUTING_PROFILE and MODEL_ROUTING.
+    """
+    return _cached_routes(
+        os.environ.get("MODEL_ROUTING_PROFILE"), os.environ.get("MODEL_ROUTING")
+    )[stage]
+
+
+def detect_stage(contents: list[Any]) -> str:
+    """Infers the root_agent workflow stage from the request history.
+
+    The stage is decided by the most recent turn: a fresh user message starts a
+    planning turn, while function responses mean the model only has to hand the
+    result to the next tool or summarise it.
+    """
+    if not contents:
+        return "plan"
+    last = contents[-1]
+    for part in last.parts or []:
+        function_response = getattr(part, "function_response", None)
+        if (
+            function_response is not None
+            and function_response.name in _STAGE_AFTER_TOOL
+        ):
+            return _STAGE_AFTER_TOOL[function_response.name]
+    return "plan"
+
+
+def route_model_request(callback_context: Any, llm_request: Any) -> None:
+    """before_model_callback that applies the stage route to an outgoing LLM request."""
+    _apply_route(callback_context, llm_request, detect_stage(llm_request.contents))
+    return None
+
+
+def route_stage(stage: str) -> Callable[[Any, Any], None]:
+    """Builds a before_model_callback that applies the route of one fixed stage.
+
+    For agents that only ever run a single stage, where detect_stage would take the
+    user message that starts them for a planning turn.
+    """
+
+    def _route(callback_context: Any, llm_request: Any) -> None:
+        _apply_route(callback_context, llm_request, stage)
+        return None
+
+    return _route
+
+
+def _apply_route(callback_context: Any, llm_request: Any, stage: str) -> None:
+    """Sets the model, thinking config and output limit of stage on llm_request."""
+    route = get_route(stage)
+
+    llm_request.model = route.model
+    if llm_request.config is None:
+        llm_request.config = types.GenerateContentConfig()
+    llm_request.config.thinking_config = route.thinking_config()
+    if route.max_output_tokens is not None:
+        llm_request.config.max_output_tokens = route.max_output_tokens
+
+    callback_context.state[_model_call_key(callback_context)] = {
+        "stage": stage,
+        "model": route.model,
+        "started_at": time.perf_counter(),
+    }
+
+
+def _model_call_key(callback_context: Any) -> str:
+    return f"{MODEL_CALL_KEY_PREFIX}{callback_context.agent_name}"
+
+
+def reroute_model(callback_context: Any, llm_request: Any, model: str) -> None:
+    """Moves a routed request to another model, e.g. a cheaper one.
+
+    For before_model_callbacks that run after the route was applied, so that
+    record_model_latency reports the call under the model actually requested.
+    """
+    llm_request.model = model
+    key = _model_call_key(callback_context)
+    call = callback_context.state.get(key)
+    if call:
+        callback_context.state[key] = {**call, "model": model}
+
+
+def record_model_latency(callback_context: Any, llm_response: Any) -> None:
+    """after_model_callback that logs latency and token usage for the routed stage."""
+    key = _model_call_key(callback_context)
+    call = callback_context.state.get(key)
+    if not call:
+        return None
+    callback_context.state[key] = None
+    usage = getattr(llm_response, "usage_metadata", None)
+    latency_ms = (time.perf_counter() - call["started_at"]) * 1000
+    logger.info(
+        f"Stage {call['stage']} on {call['model']} took {latency_ms:.0f} ms "
+        f"(prompt={getattr(usage, 'prompt_token_count', None)}, "
+        f"output={getattr(usage, 'candidates_token_count', None)}, "
+        f"thoughts={getattr(usage, 'thoughts_token_count', None)} tokens)"
+    )
+    return None
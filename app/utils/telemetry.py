@@ -0,0 +1,186 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import functools
+import time
+from collections.abc import Callable, Iterator, Sequence
+from contextlib import contextmanager
+from typing import Any, TypeVar
+
+from opentelemetry import trace
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+from opentelemetry.trace import Span, Status, StatusCode
+
+from app.utils import codec
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def _tracer() -> trace.Tracer:
+    """Returns the tracer of the provider installed in AgentEngineApp.set_up (or tests)."""
+    return trace.get_tracer("trend-marketeer")
+
+
+def payload_size(value: Any) -> int:
+    """Approximate size in bytes of a tool argument or result as sent over the wire."""
+    if value is None:
+        return 0
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode())
+    return len(codec.dumps(value, default=str).encode())
+
+
+def set_attributes(attributes: dict[str, Any]) -> None:
+    """Sets attributes on the current span, skipping values that are None."""
+    span = trace.get_current_span()
+    for key, value in attributes.items():
+        if value is not None:
+            span.set_attribute(key, value)
+
+
+def record_usage(span: Span, usage_metadata: Any) -> None:
+    """Copies the token counts of a model response onto span."""
+    if usage_metadata is None:
+        return
+    for attribute, field in (
+        ("gen_ai.usage.input_tokens", "prompt_token_count"),
+        ("gen_ai.usage.output_tokens", "candidates_token_count"),
+        ("gen_ai.usage.thoughts_tokens", "thoughts_token_count"),
+    ):
+        value = getattr(usage_metadata, field, None)
+        if value is not None:
+            span.set_attribute(attribute, value)
+
+
+def traced_tool(func: F) -> F:
+    """
+    Runs a tool inside its own span with duration and payload size attributes.
+
+    functools.wraps keeps the signature and docstring, which FunctionTool uses to build
+    the declaration the model sees.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        with _tracer().start_as_current_span(f"tool [{func.__name__}]") as span:
+            span.set_attribute("tool.name", func.__name__)
+            span.set_attribute(
+                "tool.bytes_in",
+                sum(
+                    payload_size(value)
+                    for name, value in (*enumerate(args), *kwargs.items())
+                    if name != "tool_context"
+                ),
+            )
+            started_at = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                span.record_exception(e)
+                span.set_status(Status(StatusCode.ERROR, str(e)))
+                raise
+            finally:
+                span.set_attribute(
+                    "tool.duration_ms", (time.perf_counter() - started_at) * 1000
+                )
+            span.set_attribute("tool.bytes_out", payload_size(result))
+            return result
+
+    return wrapper  # type: ignore[return-value]
+
+
+@contextmanager
+def model_span(
+    model: str, operation: str = "generate_content", current: bool = True
+) -> Iterator[Span]:
+    """
+    Span around a single model call; use record_usage on it once the response is in.
+
+    :param model: Model name, e.g. "gemini-2.5-flash"
+    :param operation: The API method, e.g. "generate_images"
+    :param current: Whether the span becomes the current span. Pass False in async
+        generators that yield inside the span, a context attached there cannot be
+        detached once the generator resumes elsewhere.
+    """
+    name = f"{operation} [{model}]"
+    with (
+        _tracer().start_as_current_span(name) if current else _tracer().start_span(name)
+    ) as span:
+        span.set_attribute("gen_ai.request.model", model)
+        span.set_attribute("gen_ai.operation.name", operation)
+        started_at = time.perf_counter()
+        try:
+            yield span
+        finally:
+            span.set_attribute(
+                "gen_ai.duration_ms", (time.perf_counter() - started_at) * 1000
+            )
+
+
+def traced_generate_content(model: Any, prompt: str, **kwargs: Any) -> str:
+    """
+    Calls model.generate_content on a single prompt inside a model span.
+
+    :param model: A google.generativeai GenerativeModel
+    :param prompt: The prompt text
+    :param kwargs: Passed on to generate_content, e.g. generation_config
+    :return: The response text
+    """
+    with model_span(model.model_name) as span:
+        span.set_attribute("gen_ai.request.bytes", payload_size(prompt))
+        response = model.generate_content(contents=[prompt], **kwargs)
+        record_usage(span, response.usage_metadata)
+        span.set_attribute("gen_ai.response.bytes", payload_size(response.text))
+        return response.text
+
+
+@functools.lru_cache(maxsize=1)
+def in_memory_exporter() -> InMemorySpanExporter:
+    """
+    Installs a tracer provider that keeps finished spans in memory, for tests and local runs.
+
+    The global provider can only be set once per process, so the exporter is shared;
+    call clear() on it between tests.
+    """
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    return exporter
+
+
+def time_breakdown(spans: Sequence[ReadableSpan]) -> dict[str, dict[str, float]]:
+    """
+    Summarizes where the time of a session went, per span name.
+
+    :param spans: Finished spans, e.g. in_memory_exporter().get_finished_spans()
+    :return: Per span name the number of spans and their total duration in ms,
+        slowest first
+    """
+    summary: dict[str, dict[str, float]] = {}
+    for span in spans:
+        if span.start_time is None or span.end_time is None:
+            continue
+        entry = summary.setdefault(span.name, {"count": 0, "total_ms": 0.0})
+        entry["count"] += 1
+        entry["total_ms"] += (span.end_time - span.start_time) / 1e6
+    return dict(
+        sorted(summary.items(), key=lambda item: item[1]["total_ms"], reverse=True)
+    )
@@ -12,7 +12,6 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import json
 import logging
 from collections.abc import Sequence
 from typing import Any
@@ -23,6 +22,10 @@ from opentelemetry.exporter.cloud_trace import CloudTraceSpanExporter
 from opentelemetry.sdk.trace import ReadableSpan
 from opentelemetry.sdk.trace.export import SpanExportResult
 
+from app.utils import codec
+from app.utils.clients import get_logging_client
+from app.utils.gcs import bucket_exists, get_storage_client
+
 
 class CloudTraceLoggingSpanExporter(CloudTraceSpanExporter):
     """
@@ -52,11 +55,9 @@ class CloudTraceLoggingSpanExporter(CloudTraceSpanExporter):
         """
         super().__init__(**kwargs)
         self.debug = debug
-        self.logging_client = logging_client or google_cloud_logging.Client(
-            project=self.project_id
-        )
+        self.logging_client = logging_client or get_logging_client(self.project_id)
         self.logger = self.logging_client.logger(__name__)
-        self.storage_client = storage_client or storage.Client(project=self.project_id)
+        self.storage_client = storage_client or get_storage_client(self.project_id)
         self.bucket_name = bucket_name or f"{self.project_id}-trend-marketeer-logs-data"
         self.bucket = self.storage_client.bucket(self.bucket_name)
 
@@ -71,7 +72,7 @@ class CloudTraceLoggingSpanExporter(CloudTraceSpanExporter):
             span_context = span.get_span_context()
             trace_id = format(span_context.trace_id, "x")
             span_id = format(span_context.span_id, "x")
-            span_dict = json.loads(span.to_json())
+            span_dict = codec.loads(span.to_json(indent=None))
 
             span_dict["trace"] = f"projects/{self.project_id}/traces/{trace_id}"
             span_dict["span_id"] = span_id
@@ -81,7 +82,7 @@ class CloudTraceLoggingSpanExporter(CloudTraceSpanExporter):
             )
 
             if self.debug:
-                print(span_dict)
+                logging.debug(f"Exporting span: {span_dict}")
 
             # Log the span data to Google Cloud Logging
             self.logger.log_struct(
@@ -103,7 +104,7 @@ class CloudTraceLoggingSpanExporter(CloudTraceSpanExporter):
         :param span_id: The ID of the span
         :return: The  GCS URI of the stored content
         """
-        if not self.storage_client.bucket(self.bucket_name).exists():
+        if not bucket_exists(self.bucket_name, self.project_id):
             logging.warning(
                 f"Bucket {self.bucket_name} not found. "
                 "Unable to store span attributes in GCS."
@@ -127,13 +128,13 @@ class CloudTraceLoggingSpanExporter(CloudTraceSpanExporter):
         :return: The updated span dictionary
         """
         attributes = span_dict["attributes"]
-        if len(json.dumps(attributes).encode()) > 255 * 1024:  # 250 KB
+        if len(codec.dumps(attributes).encode()) > 255 * 1024:  # 250 KB
             # Separate large payload from other attributes
             attributes_payload = dict(attributes.items())
             attributes_retain = dict(attributes.items())
 
             # Store large payload in GCS
-            gcs_uri = self.store_in_gcs(json.dumps(attributes_payload), span_id)
+            gcs_uri = self.store_in_gcs(codec.dumps(attributes_payload), span_id)
             attributes_retain["uri_payload"] = gcs_uri
             attributes_retain["url_payload"] = (
                 f"https://storage.mtls.cloud.google.com/"
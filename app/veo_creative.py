@@ -1,39 +1,31 @@
 import logging
 import os
-import time
 
 import google.auth
-from google.genai import Client, types
+from google.adk.tools import ToolContext
+from google.genai import types
+
+from app.utils.checkpoint import checkpoint_id
+from app.utils.clients import get_genai_client
+from app.utils.logging_config import configure_logging, prompt_preview
+from app.utils.telemetry import model_span, traced_tool
+from app.veo_jobs import VideoVariant, run_video_job, run_video_variants
 
 _, project_id = google.auth.default()
 os.environ.setdefault("GOOGLE_CLOUD_PROJECT", project_id)
 os.environ.setdefault("GOOGLE_CLOUD_LOCATION", "global")
 os.environ.setdefault("GOOGLE_GENAI_USE_VERTEXAI", "True")
 
-# Initialize the Gen AI client
-client = Client(location="us-central1")
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
-
-
-def generate_and_show_video(marketing_plan: str, brandbook: str = ""):
-    """
-    Generates video using Google Gen AI VEO model and returns the video URI.
-
-    Args:
-        marketing_plan: Description of the marketing campaign
-        brandbook: Optional brand guidelines to follow. If None, uses default brand guide.
+# The Gen AI client shared with the other creative tools
+client = get_genai_client("us-central1")
 
-    Returns:
-        str: The URI of the generated video stored in Google Cloud Storage
-    """
+VEO_MODEL = "veo-3.0-fast-generate-001"
+VIDEO_OUTPUT_URI = "gs://hackathon_agent_oryonx/videos/"
+# Formats generate_video_variants renders when none are given: vertical, square, wide.
+DEFAULT_ASPECT_RATIOS = ["9:16", "1:1", "16:9"]
 
-    if not brandbook:
-        brandbook = """
+# Used when no brandbook is given. Indented as it always was, to keep prompts unchanged.
+DEFAULT_BRANDBOOK = """
             Brand Guide: The Taste of Home
 
             Goal:
@@ -93,7 +85,11 @@ def generate_and_show_video(marketing_plan: str, brandbook: str = ""):
             Taste the difference
             """
 
-    text_prompt = (
+
+def video_prompt(marketing_plan: str, brandbook: str = "") -> str:
+    """Builds the Veo prompt for a marketing plan, following brandbook or the default."""
+    brandbook = brandbook or DEFAULT_BRANDBOOK
+    return (
         f"Create a high-quality, visually appealing marketing video that represents the following marketing plan: {marketing_plan}. "
         f"Focus on the video description elements from the marketing plan only. "
         f"IMPORTANT SAFETY GUIDELINES - DO NOT include: "
@@ -114,44 +110,97 @@ def generate_and_show_video(marketing_plan: str, brandbook: str = ""):
         f"The tag line from the marketing plan and the product name must be there"
     )
 
-    logging.info(f"📝 Prompt: {text_prompt}")
+
+@traced_tool
+def generate_and_show_video(
+    marketing_plan: str, brandbook: str = "", tool_context: ToolContext | None = None
+):
+    """
+    Generates video using Google Gen AI VEO model and returns the video URI.
+
+    The render is recorded in the Veo job store (app/veo_jobs.py): a request that
+    was already rendered, or is still rendering after a worker restart or timeout,
+    returns that video instead of starting a new render.
+
+    Args:
+        marketing_plan: Description of the marketing campaign
+        brandbook: Optional brand guidelines to follow. If None, uses default brand guide.
+        tool_context: Set by ADK; identifies the session that asked for the video.
+
+    Returns:
+        str: The URI of the generated video stored in Google Cloud Storage
+    """
+    text_prompt = video_prompt(marketing_plan, brandbook)
+
+    logging.debug(f"📝 Prompt: {prompt_preview(text_prompt)}")
     logging.info("⏳ Please wait...")
 
-    operation = client.models.generate_videos(
-        model="veo-3.0-fast-generate-001",
-        prompt=text_prompt,
-        config=types.GenerateVideosConfig(
-            aspectRatio="9:16", output_gcs_uri="gs://hackathon_agent_oryonx/videos/"
-        ),
-    )
+    session_id = checkpoint_id(tool_context) if tool_context is not None else None
+    with model_span(VEO_MODEL, "generate_videos"):
+        job = run_video_job(
+            client,
+            model=VEO_MODEL,
+            prompt=text_prompt,
+            config=types.GenerateVideosConfig(
+                aspectRatio="9:16", output_gcs_uri=VIDEO_OUTPUT_URI
+            ),
+            session_id=session_id,
+        )
+
+    if job.result:
+        logging.info(f"Public video URL: {job.result.get('public_url')}")
+    return job.result
+
+
+@traced_tool
+def generate_video_variants(
+    marketing_plan: str,
+    aspect_ratios: list[str] | None = None,
+    models: list[str] | None = None,
+    brandbook: str = "",
+    tool_context: ToolContext | None = None,
+) -> dict:
+    """
+    Generates one video per format and model for a marketing plan, all at once.
+
+    Use this instead of generate_and_show_video when several cuts are needed, e.g. a
+    vertical, a square and a wide version. Every variant renders concurrently, so
+    this takes about as long as the slowest single video.
+
+    Args:
+        marketing_plan: Description of the marketing campaign
+        aspect_ratios: Formats to render, e.g. ["9:16", "1:1", "16:9"]. Defaults to
+            all three.
+        models: Veo models to render each format with. Defaults to the fast model.
+        brandbook: Optional brand guidelines to follow. If empty, uses default brand guide.
+        tool_context: Set by ADK; identifies the session that asked for the videos.
 
-    while not operation.done:
-        time.sleep(15)
-        operation = client.operations.get(operation)
-        print(operation)
-
-    if operation.response:
-        generated_video = operation.result.generated_videos[0]
-        generated_video_uri = generated_video.video.uri
-        print("Generated video URI: ", generated_video_uri)
-
-        # Convert GCS URI to public HTTP URL
-        if generated_video_uri.startswith("gs://"):
-            bucket_name = generated_video_uri.split("/")[2]
-            object_name = "/".join(generated_video_uri.split("/")[3:])
-            public_url = f"https://storage.googleapis.com/{bucket_name}/{object_name}"
-            logging.info(f"Public video URL: {public_url}")
-            return {
-                "video_uri": generated_video_uri,
-                "public_url": public_url,
-                "bucket": bucket_name,
-                "object": object_name,
-            }
-        else:
-            return {"video_uri": generated_video_uri}
+    Returns:
+        dict: The set_id of the variant set and per variant its model, aspect_ratio,
+        status and video_uri/public_url, or error when that variant failed.
+    """
+    text_prompt = video_prompt(marketing_plan, brandbook)
+    variants = [
+        VideoVariant(model=model, aspect_ratio=aspect_ratio)
+        for model in models or [VEO_MODEL]
+        for aspect_ratio in aspect_ratios or DEFAULT_ASPECT_RATIOS
+    ]
+    logging.info(f"⏳ Rendering {len(variants)} video variants...")
+
+    session_id = checkpoint_id(tool_context) if tool_context is not None else None
+    with model_span(",".join(models or [VEO_MODEL]), "generate_videos") as span:
+        span.set_attribute("veo.variants", len(variants))
+        return run_video_variants(
+            client,
+            variants,
+            prompt=text_prompt,
+            config=types.GenerateVideosConfig(output_gcs_uri=VIDEO_OUTPUT_URI),
+            session_id=session_id,
+        )
 
 
 if __name__ == "__main__":
+    configure_logging()
     marketing_plan = """
     **Marketing Plan 2: Organic Milk & Cat Mayor**
 
@@ -3,17 +3,13 @@ import os
 
 import google.auth
 
+from app.utils.logging_config import configure_logging, prompt_preview
+
 _, project_id = google.auth.default()
 os.environ.setdefault("GOOGLE_CLOUD_PROJECT", project_id)
 os.environ.setdefault("GOOGLE_CLOUD_LOCATION", "global")
 os.environ.setdefault("GOOGLE_GENAI_USE_VERTEXAI", "True")
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
-
 
 def generate_and_show_video(marketing_plan: str, brandbook: str | None = None):
     """
@@ -39,7 +35,7 @@ def generate_and_show_video(marketing_plan: str, brandbook: str | None = None):
     )
 
     try:
-        logging.info(f"📝 Prompt: {text_prompt}")
+        logging.debug(f"📝 Prompt: {prompt_preview(text_prompt)}")
         logging.info("⏳ Please wait...")
 
         # Note: veo-3.0-fast-generate-001 model is not available in this environment
@@ -56,6 +52,7 @@ def generate_and_show_video(marketing_plan: str, brandbook: str | None = None):
 
 
 if __name__ == "__main__":
+    configure_logging()
     marketing_plan = "Test marketing plan"
 
     logging.info("=" * 60)
@@ -0,0 +1,411 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+from google.genai import Client, types
+
+from app.utils import codec
+from app.utils.cache import cache_key, cache_path, open_connection
+from app.utils.gcs import parse_gcs_uri, public_url
+from app.utils.telemetry import set_attributes
+
+logger = logging.getLogger(__name__)
+
+# Seconds between two polls of a running Veo operation.
+POLL_INTERVAL_SECONDS = float(os.environ.get("VEO_POLL_INTERVAL_SECONDS", 15))
+# A worker that claimed a job but never recorded its operation within this time is
+# presumed dead, and another worker may submit the job instead.
+SUBMIT_TIMEOUT_SECONDS = float(os.environ.get("VEO_SUBMIT_TIMEOUT_SECONDS", 120))
+
+
+@dataclass(frozen=True)
+class VeoJob:
+    """A video render as recorded in the job store."""
+
+    job_id: str
+    status: str  # submitting, running, succeeded or failed
+    operation_name: str | None
+    session_id: str | None
+    result: dict[str, Any] | None
+    error: str | None
+    submitted_at: float
+    updated_at: float
+
+
+@dataclass(frozen=True)
+class VideoVariant:
+    """One cut of a video: the Veo model and the aspect ratio it renders in."""
+
+    model: str
+    aspect_ratio: str
+
+
+class VeoJobStore:
+    """
+    Every Veo render with its operation name, keyed by the hash of its request.
+
+    Submitting is guarded by a claim on the job row, so a request is rendered once even
+    when several sessions or workers ask for it at the same time, and the operation
+    name is stored as soon as Veo accepts the request. The table lives in the shared
+    SQLite file of app/utils/cache.py: after a restart or a timeout any worker on the
+    host can resume polling a render instead of paying for it again.
+    """
+
+    def __init__(self, path: str | None = None) -> None:
+        self.path = path or cache_path()
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Returns this thread's connection, creating the table on first use."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = open_connection(self.path)
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS veo_jobs ("
+                " job_id TEXT PRIMARY KEY,"
+                " status TEXT NOT NULL,"
+                " operation_name TEXT,"
+                " session_id TEXT,"
+                " result TEXT,"
+                " error TEXT,"
+                " submitted_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS veo_job_sets ("
+                " set_id TEXT NOT NULL,"
+                " position INTEGER NOT NULL,"
+                " job_id TEXT NOT NULL,"
+                " PRIMARY KEY (set_id, position))"
+            )
+            self._local.connection = connection
+        return connection
+
+    def get(self, job_id: str) -> VeoJob | None:
+        """Returns a job, or None if it was never submitted."""
+        row = (
+            self._connection()
+            .execute("SELECT * FROM veo_jobs WHERE job_id = ?", (job_id,))
+            .fetchone()
+        )
+        return None if row is None else _job(row)
+
+    def claim(self, job_id: str, session_id: str | None) -> bool:
+        """
+        Claims the right to submit a job.
+
+        Succeeds for a new job, a failed one, or one whose submitter went silent for
+        SUBMIT_TIMEOUT_SECONDS; fails while another claim is live or once the job is
+        running or done.
+        """
+        now = time.time()
+        cursor = self._connection().execute(
+            "INSERT INTO veo_jobs (job_id, status, session_id, submitted_at, updated_at)"
+            " VALUES (?, 'submitting', ?, ?, ?)"
+            " ON CONFLICT (job_id) DO UPDATE SET"
+            " status = 'submitting', session_id = excluded.session_id,"
+            " operation_name = NULL, result = NULL, error = NULL,"
+            " submitted_at = excluded.submitted_at, updated_at = excluded.updated_at"
+            " WHERE status = 'failed'"
+            " OR (status = 'submitting' AND updated_at < ?)",
+            (job_id, session_id, now, now, now - SUBMIT_TIMEOUT_SECONDS),
+        )
+        return cursor.rowcount == 1
+
+    def set_running(self, job_id: str, operation_name: str) -> None:
+        """Records the operation of a submitted job."""
+        self._update(job_id, status="running", operation_name=operation_name)
+
+    def complete(self, job_id: str, result: dict[str, Any]) -> None:
+        """Stores the result of a finished render."""
+        self._update(job_id, status="succeeded", result=codec.dumps(result))
+
+    def fail(self, job_id: str, error: str) -> None:
+        """Marks a job as failed, so the next request submits it again."""
+        self._update(job_id, status="failed", error=error)
+
+    def running(self) -> list[VeoJob]:
+        """Returns every job that was submitted but has no result yet."""
+        rows = self._connection().execute(
+            "SELECT * FROM veo_jobs WHERE status = 'running' ORDER BY submitted_at"
+        )
+        return [_job(row) for row in rows]
+
+    def add_set(self, set_id: str, job_ids: list[str]) -> None:
+        """Groups jobs that were requested together, e.g. the formats of one video."""
+        self._connection().executemany(
+            "INSERT OR REPLACE INTO veo_job_sets VALUES (?, ?, ?)",
+            [(set_id, position, job_id) for position, job_id in enumerate(job_ids)],
+        )
+
+    def get_set(self, set_id: str) -> list[VeoJob | None]:
+        """Returns the jobs of a set in the order they were requested."""
+        rows = self._connection().execute(
+            "SELECT job_id FROM veo_job_sets WHERE set_id = ? ORDER BY position",
+            (set_id,),
+        )
+        return [self.get(job_id) for (job_id,) in rows.fetchall()]
+
+    def _update(self, job_id: str, **fields: Any) -> None:
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        self._connection().execute(
+            f"UPDATE veo_jobs SET {assignments}, updated_at = ? WHERE job_id = ?",
+            (*fields.values(), time.time(), job_id),
+        )
+
+
+def _job(row: tuple) -> VeoJob:
+    """Builds a job from a veo_jobs row, in column order."""
+    job_id, status, operation_name, session_id, result, *timestamps = row
+    return VeoJob(
+        job_id,
+        status,
+        operation_name,
+        session_id,
+        codec.loads(result) if result else None,
+        *timestamps,
+    )
+
+
+veo_job_store = VeoJobStore()
+
+
+def video_job_id(model: str, prompt: str, config: types.GenerateVideosConfig) -> str:
+    """Hash of everything that determines a render: the same request is the same job."""
+    return cache_key(model, prompt, config.model_dump_json(exclude_none=True))
+
+
+def video_result(video_uri: str) -> dict[str, Any]:
+    """The tool result for a rendered video, with a public URL for gs:// URIs."""
+    if not video_uri.startswith("gs://"):
+        return {"video_uri": video_uri}
+    bucket_name, object_name = parse_gcs_uri(video_uri)
+    return {
+        "video_uri": video_uri,
+        "public_url": public_url(bucket_name, object_name),
+        "bucket": bucket_name,
+        "object": object_name,
+    }
+
+
+def stored_job(job_id: str) -> VeoJob:
+    """The job as recorded now; a claimed job that is no longer stored is an error."""
+    job = veo_job_store.get(job_id)
+    if job is None:
+        raise RuntimeError(f"Veo job {job_id[:12]} is no longer in the job store")
+    return job
+
+
+def poll_job(
+    client: Client,
+    job: VeoJob,
+    on_complete: Callable[[VeoJob], None] | None = None,
+) -> VeoJob:
+    """
+    Polls the operation of a running job until it is done and stores the outcome.
+
+    Any worker can poll any job: the operation is looked up by its stored name.
+
+    Args:
+        client (Client): Gen AI client of the project and location of the job.
+        job (VeoJob): A job with an operation name.
+        on_complete (Callable, optional): Called with the finished job, succeeded or
+            failed.
+
+    Returns:
+        VeoJob: The finished job.
+    """
+    operation = client.operations.get(
+        types.GenerateVideosOperation.model_validate({"name": job.operation_name})
+    )
+    poll_count = 0
+    while not operation.done:
+        time.sleep(POLL_INTERVAL_SECONDS)
+        operation = client.operations.get(operation)
+        poll_count += 1
+        logger.debug(
+            f"Veo operation {operation.name} still running (poll {poll_count})"
+        )
+    set_attributes({"veo.poll_count": poll_count})
+
+    response = operation.result
+    video = (
+        response.generated_videos[0].video
+        if response and response.generated_videos
+        else None
+    )
+    if video is not None and video.uri:
+        result = video_result(video.uri)
+        logger.info(f"Generated video URI: {result['video_uri']}")
+        veo_job_store.complete(job.job_id, result)
+    else:
+        error = str(operation.error or "Veo returned no video")
+        logger.warning(f"Veo operation {operation.name} failed: {error}")
+        veo_job_store.fail(job.job_id, error)
+
+    finished = stored_job(job.job_id)
+    if on_complete is not None:
+        on_complete(finished)
+    return finished
+
+
+def run_video_job(
+    client: Client,
+    model: str,
+    prompt: str,
+    config: types.GenerateVideosConfig,
+    session_id: str | None = None,
+    on_complete: Callable[[VeoJob], None] | None = None,
+) -> VeoJob:
+    """
+    Renders a video once, however often and wherever it is requested.
+
+    A finished job is returned as is. A running one, submitted by this or another
+    worker, is polled to completion. Otherwise the job is claimed, submitted and its
+    operation name stored before polling starts.
+
+    Args:
+        client (Client): Gen AI client to submit and poll with.
+        model (str): Veo model, e.g. "veo-3.0-fast-generate-001".
+        prompt (str): The text prompt.
+        config (GenerateVideosConfig): Aspect ratio, output location and other
+            generation settings.
+        session_id (str, optional): Session that asked for the video, to trace
+            orphaned renders back.
+        on_complete (Callable, optional): Called with the finished job.
+
+    Returns:
+        VeoJob: The finished job; its result holds the video URI when it succeeded.
+    """
+    job_id = video_job_id(model, prompt, config)
+    while True:
+        job = veo_job_store.get(job_id)
+        if job is not None and job.status == "succeeded":
+            logger.info(f"Reusing the video of Veo job {job_id[:12]}")
+            return job
+        if job is not None and job.status == "running":
+            logger.info(f"Resuming Veo operation {job.operation_name}")
+            return poll_job(client, job, on_complete)
+        if veo_job_store.claim(job_id, session_id):
+            break
+        # Another worker is submitting this job: wait for its operation name.
+        time.sleep(1)
+
+    try:
+        operation = client.models.generate_videos(
+            model=model, prompt=prompt, config=config
+        )
+        if not operation.name:
+            raise RuntimeError("Veo accepted the request without an operation name")
+    except Exception as e:
+        veo_job_store.fail(job_id, str(e))
+        raise
+    veo_job_store.set_running(job_id, operation.name)
+    return poll_job(client, stored_job(job_id), on_complete)
+
+
+def resume_running_jobs(
+    client: Client, on_complete: Callable[[VeoJob], None] | None = None
+) -> list[VeoJob]:
+    """
+    Polls every render left running by a restarted or timed-out worker to completion.
+
+    Their results are stored, so the next request for the same video returns at once.
+
+    Args:
+        client (Client): Gen AI client to poll with.
+        on_complete (Callable, optional): Called with each finished job.
+
+    Returns:
+        list[VeoJob]: The finished jobs.
+    """
+    jobs = veo_job_store.running()
+    if jobs:
+        logger.info(f"Resuming {len(jobs)} running Veo jobs")
+    finished = []
+    for job in jobs:
+        try:
+            finished.append(poll_job(client, job, on_complete))
+        except Exception:
+            logger.exception(f"Could not resume Veo operation {job.operation_name}")
+    return finished
+
+
+def run_video_variants(
+    client: Client,
+    variants: list[VideoVariant],
+    prompt: str,
+    config: types.GenerateVideosConfig,
+    session_id: str | None = None,
+) -> dict[str, Any]:
+    """
+    Renders the variants of one video concurrently, as one set of jobs.
+
+    Every variant is its own job (see run_video_job), so variants that were rendered
+    before are reused and the others are submitted at the same time; the wall time
+    is that of the slowest render. A variant that fails does not fail the others.
+
+    Args:
+        client (Client): Gen AI client to submit and poll with.
+        variants (list[VideoVariant]): The models and aspect ratios to render.
+        prompt (str): The text prompt, shared by all variants.
+        config (GenerateVideosConfig): Settings shared by all variants; the aspect
+            ratio is set per variant.
+        session_id (str, optional): Session that asked for the videos.
+
+    Returns:
+        dict: The set_id, to look the set up with veo_job_store.get_set(), and per
+        variant its model, aspect_ratio, status and result or error.
+    """
+    configs = [
+        config.model_copy(update={"aspect_ratio": variant.aspect_ratio})
+        for variant in variants
+    ]
+    job_ids = [
+        video_job_id(variant.model, prompt, variant_config)
+        for variant, variant_config in zip(variants, configs, strict=True)
+    ]
+    set_id = cache_key(*job_ids)
+    veo_job_store.add_set(set_id, job_ids)
+
+    def _render(
+        variant: VideoVariant, variant_config: types.GenerateVideosConfig
+    ) -> VeoJob | Exception:
+        try:
+            return run_video_job(
+                client, variant.model, prompt, variant_config, session_id
+            )
+        except Exception as e:
+            logger.exception(f"Veo variant {variant} could not be submitted")
+            return e
+
+    # Renders mostly wait on Veo, so one thread per variant; not the shared pool,
+    # which would be tied up for minutes.
+    with ThreadPoolExecutor(
+        max_workers=max(len(variants), 1), thread_name_prefix="veo-variant"
+    ) as executor:
+        outcomes = list(executor.map(_render, variants, configs))
+
+    results = []
+    for variant, outcome in zip(variants, outcomes, strict=True):
+        entry: dict[str, Any] = {
+            "model": variant.model,
+            "aspect_ratio": variant.aspect_ratio,
+        }
+        if isinstance(outcome, Exception):
+            entry.update(status="failed", error=str(outcome))
+        else:
+            entry["status"] = outcome.status
+            entry.update(outcome.result or {"error": outcome.error})
+        results.append(entry)
+    logger.info(
+        f"Veo variant set {set_id[:12]}: "
+        f"{sum(r['status'] == 'succeeded' for r in results)}/{len(results)} succeeded"
+    )
+    return {"set_id": set_id, "variants": results}
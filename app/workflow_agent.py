@@ -0,0 +1,253 @@
+import asyncio
+import functools
+import os
+from collections.abc import AsyncGenerator, Callable
+from typing import Any
+
+from google.adk.agents import (
+    BaseAgent,
+    LlmAgent,
+    ParallelAgent,
+    SequentialAgent,
+)
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.adk.tools import BaseTool, FunctionTool, ToolContext
+from google.genai import types
+from pydantic import Field
+
+from app import matchmaker
+from app.imagen_creative import generate_and_show_images
+from app.marketing_creative import MarketingPlanStreamAgent
+from app.product_data_retriever import get_product_data
+from app.session_budget import degrade_model, enforce_budget, record_token_usage
+from app.snapshots import (
+    SNAPSHOT_STATE_KEY,
+    seed_from_snapshot,
+    seed_matches_from_snapshot,
+)
+from app.speculative_media import reuse_speculative_images
+from app.trend_watcher_agent import trend_watcher_agent
+from app.utils.checkpoint import restore_checkpoint, save_checkpoint
+from app.utils.model_routing import get_route, record_model_latency, route_stage
+from app.veo_creative import generate_and_show_video, generate_video_variants
+
+ROOT_AGENT_MODES = ("llm", "workflow")
+
+# Set on the invocation that produced the marketing plans; the creative agent waits for
+# the next user message (the plan choice) before it runs.
+PLANS_INVOCATION_KEY = "marketing_plans_invocation_id"
+# Set once the creative agent rendered media for the chosen plan.
+CAMPAIGN_CREATED_KEY = "campaign_created"
+# Cleared after a campaign was created, so the next message starts a new one. Without
+# the snapshot pin the new campaign starts from the latest snapshot.
+CAMPAIGN_STATE_KEYS = (
+    "trends_json",
+    "products",
+    "matches",
+    "marketing_plans",
+    PLANS_INVOCATION_KEY,
+    SNAPSHOT_STATE_KEY,
+    CAMPAIGN_CREATED_KEY,
+)
+CREATIVE_TOOLS = {
+    "generate_and_show_images",
+    "generate_and_show_video",
+    "generate_video_variants",
+}
+
+
+def root_agent_mode() -> str:
+    """Returns the configured root agent implementation (ROOT_AGENT_MODE).
+
+    - llm: a gemini-2.5-pro planner decides every step of the workflow (default)
+    - workflow: workflow agents run steps 1-4 in a fixed order, an LLM only handles
+      the plan choice and the creative content
+    """
+    mode = os.environ.get("ROOT_AGENT_MODE", "llm")
+    if mode not in ROOT_AGENT_MODES:
+        raise ValueError(
+            f"ROOT_AGENT_MODE must be one of {ROOT_AGENT_MODES}, got {mode!r}"
+        )
+    return mode
+
+
+class StateFunctionAgent(BaseAgent):
+    """
+    Runs a plain function on session state values and stores its result in state.
+
+    The function runs in a worker thread, so steps placed under a ParallelAgent really
+    overlap even though the tools they wrap are synchronous.
+    """
+
+    func: Callable[..., Any]
+    input_keys: list[str] = Field(default_factory=list)
+    output_key: str
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        inputs = [str(ctx.session.state.get(key, "")) for key in self.input_keys]
+        result = await asyncio.to_thread(self.func, *inputs)
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(state_delta={self.output_key: result}),
+        )
+
+
+def _skip_when_in_state(
+    *keys: str,
+) -> Callable[[CallbackContext], types.Content | None]:
+    """Builds a before_agent_callback that skips a step whose outputs are already in state."""
+
+    def _skip(callback_context: CallbackContext) -> types.Content | None:
+        if all(callback_context.state.get(key) for key in keys):
+            # Content without parts ends the step without adding anything to the conversation.
+            return types.Content(role="model", parts=[])
+        return None
+
+    return _skip
+
+
+def _remember_plans_invocation(callback_context: CallbackContext) -> None:
+    """after_agent_callback marking the invocation in which the plans were presented."""
+    callback_context.state[PLANS_INVOCATION_KEY] = callback_context.invocation_id
+    return None
+
+
+def _wait_for_plan_choice(callback_context: CallbackContext) -> types.Content | None:
+    """Skips the creative agent until the user answered the plans with their choice."""
+    if (
+        callback_context.state.get(PLANS_INVOCATION_KEY)
+        == callback_context.invocation_id
+    ):
+        return types.Content(role="model", parts=[])
+    return None
+
+
+def _record_creative_output(
+    tool: BaseTool, args: dict[str, Any], tool_context: ToolContext, tool_response: Any
+) -> None:
+    """after_tool_callback noting that media were rendered for the chosen plan."""
+    if tool.name in CREATIVE_TOOLS:
+        tool_context.state[CAMPAIGN_CREATED_KEY] = True
+    return None
+
+
+def _reset_campaign(callback_context: CallbackContext) -> None:
+    """after_agent_callback clearing the step outputs once the campaign was created."""
+    if callback_context.state.get(CAMPAIGN_CREATED_KEY):
+        for key in CAMPAIGN_STATE_KEYS:
+            callback_context.state[key] = None
+    return None
+
+
+@functools.lru_cache(maxsize=1)
+def build_workflow_agent() -> SequentialAgent:
+    """
+    Builds a root agent that runs the fixed part of the workflow without an LLM planner.
+
+    Trends and products are fetched in parallel, then matched, then turned into three
+    streamed marketing plans. Every step stores its result in session state and is
+    skipped when the result is already there, so on the follow-up message (the user's
+    plan choice) only the creative agent runs. Once it rendered the media, the step
+    outputs are cleared, so the next message starts a new campaign. A new session
+    starts from the latest snapshot (see app/snapshots.py), which skips the product
+    step, and the matchmaker step when the session found the snapshot's trends. Built once per process, since the shared trend watcher can only
+    have one parent agent.
+
+    Returns:
+        SequentialAgent: The root agent, named root_agent like the LLM orchestrator.
+    """
+    present_route = get_route("present")
+    creative_agent = LlmAgent(
+        name="creative_agent",
+        model=present_route.model,
+        description="Turns the marketing plan chosen by the user into an image, a video and a recap.",
+        instruction="""
+        You are Market-Mind, an autonomous marketing strategist. The user was shown these three marketing plans and was asked to pick one:
+
+        {marketing_plans}
+
+        The plans are based on these product-trend matches:
+
+        {matches}
+
+        1. Identify the plan the user chose. If the choice is unclear, ask the user which of the three plans they prefer and stop.
+        2. Use the chosen marketing plan as input for `generate_and_show_images` and `generate_and_show_video` and call both simultaneously. If the user asked for several video formats, call `generate_video_variants` instead of `generate_and_show_video`.
+        3. RETURN: A small recap of the marketing plan, the news trend, the context of the trend and the returned video URI's and Image URI's.
+
+        NEVER ask "Would you like me to..." or wait for confirmation once a plan was chosen.
+        """,
+        tools=[
+            FunctionTool(func=generate_and_show_images),
+            FunctionTool(func=generate_and_show_video),
+            FunctionTool(func=generate_video_variants),
+        ],
+        before_agent_callback=_wait_for_plan_choice,
+        after_agent_callback=_reset_campaign,
+        before_tool_callback=[
+            restore_checkpoint,
+            enforce_budget,
+            reuse_speculative_images,
+        ],
+        after_tool_callback=[save_checkpoint, _record_creative_output],
+        # Every turn of this agent presents or recaps the chosen plan, so it is pinned
+        # to the present route, thinking budget included. The stage detection of the
+        # LLM root agent would take the plan choice for a planning turn.
+        before_model_callback=[route_stage("present"), degrade_model],
+        after_model_callback=[record_model_latency, record_token_usage],
+        generate_content_config=types.GenerateContentConfig(
+            temperature=0.2,
+            max_output_tokens=present_route.max_output_tokens,
+        ),
+    )
+
+    return SequentialAgent(
+        name="root_agent",
+        description=(
+            "Discovers trending topics, matches them with products and creates marketing "
+            "campaigns in a fixed sequence of steps."
+        ),
+        # Products come from the latest snapshot when there is one, and matches too
+        # when the session found the trends they were made from.
+        before_agent_callback=seed_from_snapshot,
+        sub_agents=[
+            ParallelAgent(
+                name="fetch_inputs",
+                sub_agents=[
+                    SequentialAgent(
+                        name="trend_step",
+                        sub_agents=[trend_watcher_agent],
+                        before_agent_callback=_skip_when_in_state("trends_json"),
+                    ),
+                    StateFunctionAgent(
+                        name="product_step",
+                        func=get_product_data,
+                        output_key="products",
+                        before_agent_callback=_skip_when_in_state("products"),
+                    ),
+                ],
+            ),
+            StateFunctionAgent(
+                name="matchmaker_step",
+                func=matchmaker.matchmaker_agent,
+                input_keys=["products", "trends_json"],
+                output_key="matches",
+                before_agent_callback=[
+                    seed_matches_from_snapshot,
+                    _skip_when_in_state("matches"),
+                ],
+            ),
+            MarketingPlanStreamAgent(
+                name="marketing_plan_agent",
+                description="Writes three marketing plans for the current matches and streams them to the user.",
+                before_agent_callback=_skip_when_in_state("marketing_plans"),
+                after_agent_callback=_remember_plans_invocation,
+            ),
+            creative_agent,
+        ],
+    )
@@ -0,0 +1,65 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Measures upload and download throughput of app/utils/gcs.py per number of transfer
+workers, against the fake GCS server of tests/fake_gcs_server.py with a fixed
+latency per request standing in for the round trip to GCS.
+"""
+
+import argparse
+import os
+import time
+
+from app.utils import clients, gcs
+from tests.fake_gcs_server import FakeGcsServer
+
+
+def run(workers: int, uris: list[str], data: bytes) -> tuple[float, float]:
+    """Seconds to upload and then download every object with a fresh pool and client."""
+    os.environ["GCS_TRANSFER_WORKERS"] = str(workers)
+    gcs._executor = None
+    clients._clients.clear()
+
+    started_at = time.perf_counter()
+    gcs.upload_many((uri, data, "image/webp") for uri in uris)
+    uploaded_at = time.perf_counter()
+    gcs.download_many(uris)
+    return uploaded_at - started_at, time.perf_counter() - uploaded_at
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--objects", type=int, default=64)
+    parser.add_argument("--size-kb", type=int, default=256)
+    parser.add_argument("--latency-ms", type=float, default=30)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    data = os.urandom(args.size_kb * 1024)
+    uris = [f"gs://bench/objects/{i}.webp" for i in range(args.objects)]
+    with FakeGcsServer(latency_seconds=args.latency_ms / 1000) as server:
+        os.environ["STORAGE_EMULATOR_HOST"] = server.url
+        server.buckets.add("bench")
+
+        megabytes = args.objects * args.size_kb / 1024
+        print(
+            f"{args.objects} objects of {args.size_kb} KB, "
+            f"{args.latency_ms:.0f} ms per request"
+        )
+        print(f"{'workers':>7} {'upload MB/s':>12} {'download MB/s':>14}")
+        for workers in args.workers:
+            upload, download = run(workers, uris, data)
+            print(
+                f"{workers:>7} {megabytes / upload:>12.1f} {megabytes / download:>14.1f}"
+            )
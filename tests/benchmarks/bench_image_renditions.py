@@ -0,0 +1,77 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Measures rendering the default channel renditions of a batch of 2k 9:16 images, as
+Imagen writes them, one after another and in the process pool of
+app/image_renditions.py. GCS transfers are left out: only the CPU work is timed.
+"""
+
+import argparse
+import io
+import time
+
+import numpy as np
+from PIL import Image
+
+from app.image_renditions import rendition_config, rendition_pool, rendition_processes
+from app.utils.images import render_renditions
+
+
+def sample_images(count: int, width: int = 1536, height: int = 2752) -> list[bytes]:
+    """PNGs of smooth gradients plus noise, so they compress like photos, not flat color."""
+    rng = np.random.default_rng(0)
+    gradient = np.linspace(0, 200, height, dtype=np.float32)[:, None, None]
+    images = []
+    for _ in range(count):
+        noise = rng.normal(0, 12, (height, width, 3)).astype(np.float32)
+        pixels = np.clip(gradient + noise + rng.uniform(0, 55), 0, 255).astype(np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(pixels).save(buffer, format="PNG", compress_level=1)
+        images.append(buffer.getvalue())
+    return images
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--images", type=int, default=8)
+    args = parser.parse_args()
+
+    renditions = rendition_config()
+    images = sample_images(args.images)
+    pool = rendition_pool()
+    # Spawn the workers before timing, as a long-lived worker has them already.
+    list(
+        pool.map(
+            render_renditions,
+            images[:1] * rendition_processes(),
+            [renditions] * rendition_processes(),
+        )
+    )
+
+    started_at = time.perf_counter()
+    for image in images:
+        render_renditions(image, renditions)
+    serial = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+    list(pool.map(render_renditions, images, [renditions] * len(images)))
+    pooled = time.perf_counter() - started_at
+
+    print(f"{args.images} images, {len(renditions)} renditions each")
+    print(f"{'mode':<14} {'s/batch':>8} {'ms/image':>9}")
+    for mode, seconds in (
+        ("serial", serial),
+        (f"pool ({rendition_processes()})", pooled),
+    ):
+        print(f"{mode:<14} {seconds:>8.2f} {seconds * 1000 / args.images:>9.0f}")
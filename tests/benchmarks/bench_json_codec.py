@@ -0,0 +1,146 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Measures the JSON serialization cost of one campaign session per codec: product rows,
+matchmaker prompts and results, the marketing prompt, checkpoints and span export,
+replayed on the fixtures in tests/benchmarks/fixtures scaled to a larger catalog.
+
+"json legacy" is the stdlib with its default separators and the indented marketing
+prompt, as before app/utils/codec.py. The orjson codec is skipped when it is not
+installed:
+    uv run --extra fast-json python -m tests.benchmarks.bench_json_codec
+"""
+
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import Any
+
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+
+from app.utils.codec import JsonCodec, StdlibCodec, get_codec, orjson
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+class LegacyCodec:
+    """The stdlib as the call sites used it: default separators and ASCII escapes."""
+
+    name = "json legacy"
+
+    def dumps(
+        self,
+        obj: Any,
+        indent: bool = False,
+        sort_keys: bool = False,
+        default: Any = None,
+    ) -> str:
+        return json.dumps(
+            obj, indent=2 if indent else None, sort_keys=sort_keys, default=default
+        )
+
+    def loads(self, data: str | bytes) -> Any:
+        return json.loads(data)
+
+
+def session_payloads(num_products: int) -> tuple[list, list, list, ReadableSpan]:
+    """Products, trends and matches of one session, and a span like the agent exports."""
+    fixture_products = json.loads((FIXTURES / "products.json").read_text())
+    products = [
+        {**fixture_products[i % len(fixture_products)], "product_id": i}
+        for i in range(num_products)
+    ]
+    trends = json.loads((FIXTURES / "trends.json").read_text())
+    matches = [
+        {
+            "product_name": product["product_name"],
+            "trend_title": trend["trend_title"],
+            "trend_description": trend["trend_description"],
+            "similarity_description": "A witty link between the two, in a sentence.",
+        }
+        for product, trend in zip(products, trends * 2, strict=False)
+    ]
+    span = TracerProvider().get_tracer("bench").start_span("tool [matchmaker_agent]")
+    span.set_attribute("gcp.vertex.agent.tool_call_args", json.dumps(products[:50]))
+    span.set_attribute("gcp.vertex.agent.tool_response", json.dumps(matches))
+    span.end()
+    return products, trends, matches, span  # type: ignore[return-value]
+
+
+def run_session(
+    codec: JsonCodec, products: list, trends: list, matches: list, span: ReadableSpan
+) -> int:
+    """Replays the encode and decode calls of one session and returns the bytes written."""
+    written = 0
+
+    def dumps(obj: Any, **kwargs: Any) -> str:
+        nonlocal written
+        encoded = codec.dumps(obj, **kwargs)
+        written += len(encoded)
+        return encoded
+
+    # get_product_data, then the matchmaker parses both inputs.
+    products_json = dumps(products)
+    trends_json = dumps(trends)
+    codec.loads(products_json)
+    codec.loads(trends_json)
+    # Sensitive-trend filter and matching prompts, the model answer and the tool result.
+    dumps(trends)
+    dumps(products)
+    dumps(trends)
+    codec.loads(dumps(matches))
+    matches_json = dumps(matches)
+    # marketing_agent prompt, indented before the codec.
+    dumps(matches[:3], indent=isinstance(codec, LegacyCodec))
+    # Checkpoints of the four session stages, written once and read on resume.
+    for output in (trends_json, products_json, matches_json, "three plans" * 200):
+        codec.loads(dumps(output, default=str))
+    # Span export: parse the span, then size and upload its attributes.
+    legacy = isinstance(codec, LegacyCodec)
+    span_dict = codec.loads(span.to_json() if legacy else span.to_json(indent=None))
+    dumps(span_dict["attributes"])
+    dumps(span_dict["attributes"])
+    return written
+
+
+def _time(func, repeats: int) -> float:  # type: ignore[no-untyped-def]
+    durations = []
+    for _ in range(repeats):
+        started_at = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - started_at) * 1000)
+    return statistics.median(durations)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    payloads = session_payloads(args.products)
+    codecs: list[JsonCodec] = [LegacyCodec(), StdlibCodec()]
+    if orjson is not None:
+        codecs.append(get_codec("orjson"))
+
+    print(f"{args.products} products, median of {args.repeats} sessions")
+    print(f"{'codec':<12} {'ms/session':>11} {'KB/session':>11}")
+    for codec in codecs:
+        written = run_session(codec, *payloads)
+        ms = _time(lambda codec=codec: run_session(codec, *payloads), args.repeats)
+        print(f"{codec.name:<12} {ms:>11.2f} {written / 1024:>11.1f}")
+    if "orjson" not in {codec.name for codec in codecs}:
+        print("orjson       skipped, orjson is not installed")
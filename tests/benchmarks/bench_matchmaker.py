@@ -0,0 +1,147 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compares latency, token usage and match counts of the three matchmaker variants
+(agent, sequential, fused) on the fixed fixtures in tests/benchmarks/fixtures.
+
+Every repeat starts from an empty LLM cache and match store, so each run pays for
+the full matching work.
+
+Run with:
+    uv run python -m tests.benchmarks.bench_matchmaker --repeats 3
+"""
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+from google.adk.models.google_llm import Gemini
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+from google.generativeai import GenerativeModel
+
+from app import matchmaker, product_data_retriever
+from app.match_store import MatchStore
+from app.matchmaker_agent import matchmaker_agent as llm_matchmaker_agent
+from app.utils.cache import SharedCache
+from app.utils.llm_output import extract_json_array
+
+FIXTURES = Path(__file__).parent / "fixtures"
+PRODUCTS = (FIXTURES / "products.json").read_text()
+TRENDS = (FIXTURES / "trends.json").read_text()
+
+usage: Counter = Counter()
+
+
+def _count_usage(usage_metadata: object) -> None:
+    usage["model_calls"] += 1
+    usage["prompt_tokens"] += getattr(usage_metadata, "prompt_token_count", 0) or 0
+    usage["output_tokens"] += (
+        getattr(usage_metadata, "candidates_token_count", 0) or 0
+    ) + (getattr(usage_metadata, "thoughts_token_count", 0) or 0)
+
+
+def _instrument() -> None:
+    """Counts model calls and tokens for both the generativeai and the ADK code paths."""
+    generate_content = GenerativeModel.generate_content
+
+    def counting_generate_content(self, *args, **kwargs):  # type: ignore[no-untyped-def]
+        response = generate_content(self, *args, **kwargs)
+        _count_usage(response.usage_metadata)
+        return response
+
+    GenerativeModel.generate_content = counting_generate_content  # type: ignore[method-assign]
+
+    generate_content_async = Gemini.generate_content_async
+
+    async def counting_generate_content_async(self, llm_request, stream=False):  # type: ignore[no-untyped-def]
+        async for llm_response in generate_content_async(self, llm_request, stream):
+            if not llm_response.partial:
+                _count_usage(llm_response.usage_metadata)
+            yield llm_response
+
+    Gemini.generate_content_async = counting_generate_content_async  # type: ignore[method-assign]
+
+
+def _reset_state(path: str) -> None:
+    """Points every cache and the match store at a fresh file, with the fixture catalog."""
+    matchmaker._llm_cache = SharedCache("llm_responses", path=path)
+    matchmaker._match_store = MatchStore(path=path)
+    product_data_retriever._product_cache = SharedCache("products", path=path)
+    default_query = (
+        f"SELECT * FROM `{product_data_retriever.GCP_PROJECT_ID}."
+        f"{product_data_retriever.BQ_DATASET}.{product_data_retriever.BQ_TABLE}` LIMIT 5"
+    )
+    product_data_retriever._product_cache.set(default_query, PRODUCTS)
+
+
+async def _run_agent_variant() -> list:
+    runner = InMemoryRunner(agent=llm_matchmaker_agent, app_name="bench")
+    session = await runner.session_service.create_session(
+        app_name="bench", user_id="bench"
+    )
+    message = types.Content(
+        role="user",
+        parts=[types.Part.from_text(text=f"Trends: {TRENDS}\nProducts: {PRODUCTS}")],
+    )
+    final_text = ""
+    async for event in runner.run_async(
+        user_id="bench", session_id=session.id, new_message=message
+    ):
+        if event.content and event.content.parts and event.content.parts[0].text:
+            final_text = event.content.parts[0].text
+    return extract_json_array(final_text) or []
+
+
+def run_variant(variant: str) -> list:
+    """Runs one matchmaker variant on the fixtures and returns its matches."""
+    if variant == "agent":
+        return asyncio.run(_run_agent_variant())
+    return matchmaker.match_products(PRODUCTS, TRENDS, fused=variant == "fused")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--variants", nargs="+", default=list(matchmaker.MATCHMAKER_MODES)
+    )
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    _instrument()
+    state_dir = tempfile.mkdtemp(prefix="bench-matchmaker-")
+    print(
+        f"{'variant':<11} {'p50 ms':>8} {'max ms':>8} {'calls':>6} "
+        f"{'prompt tok':>11} {'output tok':>11} {'matches':>8}"
+    )
+    for variant in args.variants:
+        latencies, match_counts = [], []
+        usage.clear()
+        for repeat in range(args.repeats):
+            _reset_state(f"{state_dir}/{variant}-{repeat}.sqlite")
+            started_at = time.perf_counter()
+            matches = run_variant(variant)
+            latencies.append((time.perf_counter() - started_at) * 1000)
+            match_counts.append(len(matches))
+        print(
+            f"{variant:<11} {statistics.median(latencies):>8.0f} {max(latencies):>8.0f} "
+            f"{usage['model_calls'] / args.repeats:>6.1f} "
+            f"{usage['prompt_tokens'] / args.repeats:>11.0f} "
+            f"{usage['output_tokens'] / args.repeats:>11.0f} "
+            f"{statistics.mean(match_counts):>8.1f}"
+        )
@@ -0,0 +1,115 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compares latency and token cost of the root_agent stages across routing profiles.
+
+Run with:
+    uv run python -m tests.benchmarks.bench_model_routing --repeats 3
+"""
+
+import argparse
+import statistics
+import time
+
+from google.genai import Client, types
+
+from app.utils.model_routing import ROUTING_PROFILES, load_routes
+
+# Representative prompts for each root_agent turn, so every profile sees the same work.
+STAGE_PROMPTS = {
+    "plan": "Find a new marketing angle for our products based on this week's trends.",
+    "handoff": (
+        "The trend watcher returned 5 trends and get_product_data returned 5 products. "
+        "Reply with the single next tool to call and its arguments."
+    ),
+    "present": (
+        "Present these three marketing plans to the user exactly as given and ask "
+        "which one they prefer: 1) Cheese & Election Night 2) Milk & Cat Mayor "
+        "3) Gift Card & Birthday Season."
+    ),
+    "recap": (
+        "Summarise in three sentences: plan 'Milk & Cat Mayor', video gs://b/v.mp4, "
+        "image gs://b/i.png."
+    ),
+}
+
+# USD per 1M tokens (input, output); thinking tokens are billed as output.
+PRICES = {
+    "gemini-2.5-pro": (1.25, 10.0),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+}
+
+
+def run_profile(client: Client, profile: str, repeats: int) -> list[dict]:
+    """Runs every stage prompt against the routes of a profile."""
+    rows = []
+    routes = load_routes(profile=profile, overrides="")
+    for stage, prompt in STAGE_PROMPTS.items():
+        route = routes[stage]
+        latencies, prompt_tokens, output_tokens = [], 0, 0
+        for _ in range(repeats):
+            started_at = time.perf_counter()
+            response = client.models.generate_content(
+                model=route.model,
+                contents=prompt,
+                config=types.GenerateContentConfig(
+                    thinking_config=route.thinking_config(),
+                    max_output_tokens=route.max_output_tokens,
+                ),
+            )
+            latencies.append((time.perf_counter() - started_at) * 1000)
+            usage = response.usage_metadata
+            if usage is None:
+                continue
+            prompt_tokens += usage.prompt_token_count or 0
+            output_tokens += (usage.candidates_token_count or 0) + (
+                usage.thoughts_token_count or 0
+            )
+
+        input_price, output_price = PRICES.get(route.model, (0.0, 0.0))
+        rows.append(
+            {
+                "profile": profile,
+                "stage": stage,
+                "model": route.model,
+                "p50_ms": statistics.median(latencies),
+                "max_ms": max(latencies),
+                "tokens": (prompt_tokens + output_tokens) / repeats,
+                "usd": (prompt_tokens * input_price + output_tokens * output_price)
+                / repeats
+                / 1_000_000,
+            }
+        )
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--profiles", nargs="+", default=sorted(ROUTING_PROFILES))
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    client = Client()
+    print(
+        f"{'profile':<10} {'stage':<8} {'model':<22} {'p50 ms':>8} {'max ms':>8} "
+        f"{'tokens':>8} {'usd':>10}"
+    )
+    for profile in args.profiles:
+        for row in run_profile(client, profile, args.repeats):
+            print(
+                f"{row['profile']:<10} {row['stage']:<8} {row['model']:<22} "
+                f"{row['p50_ms']:>8.0f} {row['max_ms']:>8.0f} {row['tokens']:>8.0f} "
+                f"{row['usd']:>10.5f}"
+            )
@@ -0,0 +1,83 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compares the row-by-row and the Arrow columnar serialization of product rows on a
+synthetic wide table (strings, numbers, dates and timestamps), without BigQuery.
+
+The columnar path needs pyarrow, which is optional:
+    uv run --with pyarrow python -m tests.benchmarks.bench_product_serialization
+"""
+
+import argparse
+import datetime
+import json
+import statistics
+import time
+
+from google.cloud.bigquery import Row
+
+from app.product_data_retriever import arrow_to_json, pa, rows_to_json
+
+
+def synthetic_columns(num_rows: int, num_columns: int) -> dict[str, list]:
+    """Builds a wide table, cycling through string, float, int, date and timestamp columns."""
+    start = datetime.datetime(2025, 9, 15, tzinfo=datetime.timezone.utc)
+    makers = [
+        lambda c, r: f"product {r} attribute {c}",
+        lambda c, r: r * 1.5 + c,
+        lambda c, r: r * c,
+        lambda c, r: (start + datetime.timedelta(days=r % 365)).date(),
+        lambda c, r: start + datetime.timedelta(minutes=r + c),
+    ]
+    return {
+        f"col_{c}": [makers[c % len(makers)](c, r) for r in range(num_rows)]
+        for c in range(num_columns)
+    }
+
+
+def _time(func, repeats: int) -> float:  # type: ignore[no-untyped-def]
+    durations = []
+    for _ in range(repeats):
+        started_at = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - started_at) * 1000)
+    return statistics.median(durations)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--columns", type=int, default=60)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    columns = synthetic_columns(args.rows, args.columns)
+    names = list(columns)
+    field_to_index = {name: i for i, name in enumerate(names)}
+    rows = [
+        Row(values, field_to_index) for values in zip(*columns.values(), strict=True)
+    ]
+
+    print(f"{args.rows} rows x {args.columns} columns, median of {args.repeats} runs")
+    row_ms = _time(lambda: rows_to_json(rows), args.repeats)
+    print(f"{'row by row':<12} {row_ms:>9.1f} ms")
+    if pa is None:
+        print("columnar     skipped, pyarrow is not installed")
+    else:
+        table = pa.table(columns)
+        arrow_ms = _time(lambda: arrow_to_json(table), args.repeats)
+        print(f"{'columnar':<12} {arrow_ms:>9.1f} ms  ({row_ms / arrow_ms:.1f}x)")
+        assert len(json.loads(arrow_to_json(table))) == len(
+            json.loads(rows_to_json(rows))
+        )
@@ -0,0 +1,197 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+An in-memory stand-in for the GCS JSON API, enough for google-cloud-storage to create
+and look up buckets and to upload (multipart and resumable) and download (whole and
+ranged) objects. Point the client at it with STORAGE_EMULATOR_HOST=server.url.
+
+Every request can be delayed by latency_seconds, to measure how transfers overlap.
+"""
+
+import json
+import re
+import threading
+import time
+import uuid
+from email.message import EmailMessage
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, unquote, urlparse
+
+_BUCKET = re.compile(r"^/storage/v1/b/(?P<bucket>[^/]+)$")
+_OBJECT = re.compile(r"^/storage/v1/b/(?P<bucket>[^/]+)/o/(?P<name>.+)$")
+_UPLOAD = re.compile(r"^/upload/storage/v1/b/(?P<bucket>[^/]+)/o$")
+_DOWNLOAD = re.compile(r"^/download/storage/v1/b/(?P<bucket>[^/]+)/o/(?P<name>.+)$")
+_CONTENT_RANGE = re.compile(
+    r"bytes (?:(?P<start>\d+)-(?P<end>\d+)|\*)/(?P<total>\d+|\*)"
+)
+
+
+class FakeGcsServer:
+    """Buckets and objects in memory, served over HTTP on a free local port."""
+
+    def __init__(self, latency_seconds: float = 0.0) -> None:
+        self.latency_seconds = latency_seconds
+        self.buckets: set[str] = set()
+        self.objects: dict[tuple[str, str], tuple[bytes, str]] = {}
+        self.requests: list[str] = []
+        self._uploads: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def __enter__(self) -> "FakeGcsServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _object(self, bucket: str, name: str) -> dict[str, Any]:
+        data, content_type = self.objects[(bucket, name)]
+        return {
+            "kind": "storage#object",
+            "bucket": bucket,
+            "name": name,
+            "size": str(len(data)),
+            "generation": "1",
+            "contentType": content_type,
+        }
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *_: object) -> None:
+                pass
+
+            def _reply(
+                self,
+                status: int,
+                body: bytes | dict | None = None,
+                headers: dict[str, str] | None = None,
+            ) -> None:
+                if isinstance(body, dict):
+                    body = json.dumps(body).encode()
+                    headers = {"Content-Type": "application/json", **(headers or {})}
+                body = body or b""
+                self.send_response(status)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _body(self) -> bytes:
+                return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+            def _start(self) -> tuple[str, dict[str, list[str]]]:
+                time.sleep(server.latency_seconds)
+                url = urlparse(self.path)
+                with server._lock:
+                    server.requests.append(f"{self.command} {url.path}?{url.query}")
+                return url.path, parse_qs(url.query)
+
+            def do_GET(self) -> None:
+                path, _ = self._start()
+                if match := _BUCKET.match(path):
+                    if match["bucket"] in server.buckets:
+                        return self._reply(200, {"name": match["bucket"]})
+                    return self._reply(404, {"error": {"code": 404}})
+                if match := _OBJECT.match(path):
+                    key = (match["bucket"], unquote(match["name"]))
+                    if key not in server.objects:
+                        return self._reply(404, {"error": {"code": 404}})
+                    return self._reply(200, server._object(*key))
+                if match := _DOWNLOAD.match(path):
+                    key = (match["bucket"], unquote(match["name"]))
+                    if key not in server.objects:
+                        return self._reply(404, {"error": {"code": 404}})
+                    data, content_type = server.objects[key]
+                    headers = {"Content-Type": content_type, "x-goog-generation": "1"}
+                    byte_range = self.headers.get("Range")
+                    if byte_range is None:
+                        return self._reply(200, data, headers)
+                    first, _, last = byte_range.removeprefix("bytes=").partition("-")
+                    start = int(first)
+                    end = min(int(last) if last else len(data) - 1, len(data) - 1)
+                    headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+                    return self._reply(206, data[start : end + 1], headers)
+                self._reply(404, {"error": {"code": 404}})
+
+            def do_POST(self) -> None:
+                path, query = self._start()
+                body = self._body()
+                if path == "/storage/v1/b":
+                    bucket = json.loads(body)["name"]
+                    server.buckets.add(bucket)
+                    return self._reply(200, {"name": bucket})
+                match = _UPLOAD.match(path)
+                if match is None or match["bucket"] not in server.buckets:
+                    return self._reply(404, {"error": {"code": 404}})
+                bucket = match["bucket"]
+                if query["uploadType"] == ["multipart"]:
+                    content_type = self.headers["Content-Type"]
+                    message = BytesParser(EmailMessage, policy=HTTP).parsebytes(
+                        f"Content-Type: {content_type}\r\n\r\n".encode() + body
+                    )
+                    metadata, media = message.iter_parts()
+                    name = json.loads(metadata.get_content())["name"]
+                    data = media.get_payload(decode=True)
+                    assert isinstance(data, bytes)
+                    server.objects[(bucket, name)] = (data, media.get_content_type())
+                    return self._reply(200, server._object(bucket, name))
+                upload_id = uuid.uuid4().hex
+                metadata = json.loads(body or b"{}")
+                server._uploads[upload_id] = {
+                    "bucket": bucket,
+                    "name": metadata.get("name") or query["name"][0],
+                    "content_type": self.headers.get(
+                        "X-Upload-Content-Type", "application/octet-stream"
+                    ),
+                    "data": bytearray(),
+                }
+                location = (
+                    f"{server.url}{path}?uploadType=resumable&upload_id={upload_id}"
+                )
+                self._reply(200, {}, {"Location": location})
+
+            def do_PUT(self) -> None:
+                _, query = self._start()
+                body = self._body()
+                upload = server._uploads[query["upload_id"][0]]
+                upload["data"] += body
+                content_range = _CONTENT_RANGE.match(self.headers["Content-Range"])
+                if content_range is None:
+                    return self._reply(400, {"error": {"code": 400}})
+                total = content_range["total"]
+                if total == "*" or len(upload["data"]) < int(total):
+                    return self._reply(
+                        308, None, {"Range": f"bytes=0-{len(upload['data']) - 1}"}
+                    )
+                key = (upload["bucket"], upload["name"])
+                server.objects[key] = (bytes(upload["data"]), upload["content_type"])
+                self._reply(200, server._object(*key))
+
+        return Handler
@@ -0,0 +1,36 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import importlib.util
+from pathlib import Path
+
+
+def _adk_installed() -> bool:
+    try:
+        return importlib.util.find_spec("google.adk") is not None
+    except ModuleNotFoundError:
+        return False
+
+
+# Importing anything under app/ loads the ADK root agent through app/__init__.py, so
+# without google-adk only the tests that import nothing from app/ are collected.
+collect_ignore = (
+    []
+    if _adk_installed()
+    else [
+        path.name
+        for path in Path(__file__).parent.glob("test_*.py")
+        if "from app" in path.read_text() or "import app" in path.read_text()
+    ]
+)
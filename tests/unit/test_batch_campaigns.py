@@ -0,0 +1,116 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+from pathlib import Path
+
+import pytest
+
+from app import batch_campaigns
+from app.utils.checkpoint import CheckpointStore
+
+
+@pytest.fixture
+def pipeline(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    monkeypatch.setattr(
+        batch_campaigns,
+        "checkpoint_store",
+        CheckpointStore(path=str(tmp_path / "cache.sqlite")),
+    )
+    monkeypatch.setattr(
+        batch_campaigns, "get_trend_data", lambda **_: '[{"trend_title": "Cat Mayor"}]'
+    )
+    monkeypatch.setattr(
+        batch_campaigns, "get_product_data", lambda **_: '[{"product_name": "Milk"}]'
+    )
+    monkeypatch.setattr(
+        batch_campaigns.matchmaker,
+        "match_products",
+        lambda *_, **__: [{"product_name": "Milk"}],
+    )
+    monkeypatch.setattr(batch_campaigns, "marketing_agent", lambda *_: "Plan")
+    monkeypatch.setattr(
+        batch_campaigns,
+        "generate_and_show_images",
+        lambda *_, **__: [{"image_uri": "gs://b/i.png"}],
+    )
+
+
+def test_run_campaign_records_outputs_and_stage_latencies(pipeline: None) -> None:
+    record = batch_campaigns.run_campaign({"id": "nl"})
+
+    assert record["status"] == "ok"
+    assert record["outputs"]["marketing_plans"] == "Plan"
+    assert list(record["stage_latency_ms"]) == [
+        "trends",
+        "products",
+        "matches",
+        "marketing_plans",
+        "images",
+    ]
+
+
+def test_run_campaign_records_the_failed_stage(
+    pipeline: None, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    def fail(*_, **__):  # type: ignore[no-untyped-def]
+        raise TimeoutError("Veo took too long")
+
+    monkeypatch.setattr(batch_campaigns, "generate_and_show_video", fail)
+    record = batch_campaigns.run_campaign({"id": "nl", "video": True})
+
+    assert record["status"] == "error"
+    assert record["failed_stage"] == "video"
+    assert "outputs" not in record
+    assert "video" in record["stage_latency_ms"]
+
+
+def test_retry_resumes_after_the_last_successful_stage(
+    pipeline: None, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    def fail(*_, **__):  # type: ignore[no-untyped-def]
+        raise TimeoutError("Veo took too long")
+
+    monkeypatch.setattr(batch_campaigns, "generate_and_show_video", fail)
+    batch_campaigns.run_campaign({"id": "nl", "video": True})
+
+    monkeypatch.setattr(
+        batch_campaigns,
+        "generate_and_show_video",
+        lambda *_, **__: {"video_uri": "gs://b/v.mp4"},
+    )
+    record = batch_campaigns.run_campaign({"id": "nl", "video": True})
+
+    assert record["status"] == "ok"
+    assert list(record["stage_latency_ms"]) == ["video"]
+    assert record["resumed_stages"] == [
+        "trends",
+        "products",
+        "matches",
+        "marketing_plans",
+        "images",
+    ]
+    assert record["outputs"]["video"] == {"video_uri": "gs://b/v.mp4"}
+
+
+def test_completed_ids_ignores_failures_and_truncated_lines(tmp_path: Path) -> None:
+    output = tmp_path / "campaigns.jsonl"
+    output.write_text(
+        json.dumps({"id": "a", "status": "ok"})
+        + "\n"
+        + json.dumps({"id": "b", "status": "error"})
+        + '\n{"id": "c", "sta'
+    )
+
+    assert batch_campaigns.completed_ids(str(output)) == {"a"}
@@ -0,0 +1,80 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+from pathlib import Path
+
+from app.utils.cache import SharedCache, cache_key
+
+
+def test_get_or_set_computes_once(tmp_path: Path) -> None:
+    cache = SharedCache("llm_responses", path=str(tmp_path / "cache.sqlite"))
+    calls = []
+
+    def factory() -> str:
+        calls.append(1)
+        return "three plans"
+
+    assert cache.get_or_set(cache_key("gemini-2.5-flash", "prompt"), factory) == (
+        "three plans"
+    )
+    assert cache.get_or_set(cache_key("gemini-2.5-flash", "prompt"), factory) == (
+        "three plans"
+    )
+    assert len(calls) == 1
+
+
+def test_entries_expire_after_ttl(tmp_path: Path) -> None:
+    cache = SharedCache("trends", ttl_seconds=0.05, path=str(tmp_path / "cache.sqlite"))
+    cache.set("2025-09-15T10", "[]")
+    assert cache.get("2025-09-15T10") == "[]"
+    time.sleep(0.1)
+    assert cache.get("2025-09-15T10") is None
+
+
+def test_namespaces_are_isolated(tmp_path: Path) -> None:
+    path = str(tmp_path / "cache.sqlite")
+    SharedCache("products", path=path).set("key", 1)
+    assert SharedCache("trends", path=path).get("key") is None
+
+
+def test_entries_are_shared_across_connections(tmp_path: Path) -> None:
+    """A value written through one connection is visible to every other one."""
+    path = str(tmp_path / "cache.sqlite")
+    writer = threading.Thread(
+        target=lambda: SharedCache("products", path=path).set(
+            "catalog", [{"product_name": "Milk"}]
+        )
+    )
+    writer.start()
+    writer.join()
+    assert SharedCache("products", path=path).get("catalog") == [
+        {"product_name": "Milk"}
+    ]
+
+
+def test_get_stale_serves_expired_entries_within_the_stale_window(
+    tmp_path: Path,
+) -> None:
+    cache = SharedCache(
+        "trend_summaries", ttl_seconds=0.05, path=str(tmp_path / "cache.sqlite")
+    )
+    cache.set("jimmy fallon", "summary")
+    assert cache.get_stale("jimmy fallon", max_stale_seconds=0.2) == ("summary", False)
+    time.sleep(0.1)
+    assert cache.get("jimmy fallon") is None
+    assert cache.get_stale("jimmy fallon", max_stale_seconds=0.2) == ("summary", True)
+    time.sleep(0.2)
+    assert cache.get_stale("jimmy fallon", max_stale_seconds=0.2) == (None, False)
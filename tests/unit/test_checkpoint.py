@@ -0,0 +1,151 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import uuid
+from pathlib import Path
+from typing import Any
+
+import pytest
+from google.adk.tools import BaseTool
+
+from app.utils import checkpoint
+from app.utils.checkpoint import CheckpointStore
+
+
+@pytest.fixture
+def store(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> CheckpointStore:
+    store = CheckpointStore(path=str(tmp_path / "cache.sqlite"))
+    monkeypatch.setattr(checkpoint, "checkpoint_store", store)
+    return store
+
+
+class ToolContext:
+    """Tool context exposing session state and the call id, like ADK's to the callbacks."""
+
+    def __init__(self, state: dict[str, Any], function_call_id: str) -> None:
+        self.state = state
+        self.function_call_id = function_call_id
+
+
+SESSIONS: dict[str, dict[str, Any]] = {}
+
+
+def _tool_context(session_id: str, function_call_id: str | None = None) -> Any:
+    """The context of a tool call; every call gets its own id unless one is given."""
+    return ToolContext(
+        SESSIONS.setdefault(session_id, {}), function_call_id or uuid.uuid4().hex
+    )
+
+
+def _tool(name: str) -> BaseTool:
+    return BaseTool(name=name, description="")
+
+
+@pytest.fixture(autouse=True)
+def sessions() -> None:
+    SESSIONS.clear()
+
+
+def test_checkpoints_are_kept_per_session(store: CheckpointStore) -> None:
+    store.save("s1", "get_product_data", '[{"product_name": "Milk"}]')
+
+    assert store.get("s1", "get_product_data") == '[{"product_name": "Milk"}]'
+    assert store.get("s2", "get_product_data") is None
+    assert store.load("s1") == {"get_product_data": '[{"product_name": "Milk"}]'}
+
+
+def test_expired_checkpoints_are_ignored(tmp_path: Path) -> None:
+    store = CheckpointStore(path=str(tmp_path / "cache.sqlite"), ttl_seconds=-1)
+    store.save("s1", "get_product_data", "[]")
+
+    assert store.get("s1", "get_product_data") is None
+
+
+def test_callbacks_resume_a_session_stage(store: CheckpointStore) -> None:
+    tool = _tool("get_product_data")
+    products = '[{"product_name": "Milk"}]'
+    checkpoint.save_checkpoint(tool, {"limit": 5}, _tool_context("s1"), products)
+
+    # Data stages are resumed whatever arguments the planner passes on the retry.
+    assert (
+        checkpoint.restore_checkpoint(tool, {"limit": 10}, _tool_context("s1"))
+        == products
+    )
+    assert checkpoint.restore_checkpoint(tool, {}, _tool_context("s2")) is None
+    assert (
+        _tool_context("s1").state[checkpoint.CHECKPOINT_ID_KEY]
+        != (_tool_context("s2").state[checkpoint.CHECKPOINT_ID_KEY])
+    )
+
+
+def test_matches_and_plans_are_keyed_by_their_inputs(store: CheckpointStore) -> None:
+    tool = _tool("matchmaker_agent")
+    matches = '[{"product_name": "Milk", "trend_title": "Cat Mayor"}]'
+    args = {"product_dataframe_str": "[]", "trends_news_dataframe_str": "[1]"}
+    checkpoint.save_checkpoint(tool, args, _tool_context("s1"), matches)
+
+    assert checkpoint.restore_checkpoint(tool, args, _tool_context("s1")) == matches
+    other_trends = {**args, "trends_news_dataframe_str": "[2]"}
+    assert (
+        checkpoint.restore_checkpoint(tool, other_trends, _tool_context("s1")) is None
+    )
+
+
+def test_media_stages_are_keyed_by_arguments(store: CheckpointStore) -> None:
+    tool = _tool("generate_and_show_video")
+    checkpoint.save_checkpoint(
+        tool, {"marketing_plan": "Plan 1"}, _tool_context("s1"), {"video_uri": "gs://v"}
+    )
+
+    assert checkpoint.restore_checkpoint(
+        tool, {"marketing_plan": "Plan 1"}, _tool_context("s1")
+    ) == {"video_uri": "gs://v"}
+    assert (
+        checkpoint.restore_checkpoint(
+            tool, {"marketing_plan": "Plan 2"}, _tool_context("s1")
+        )
+        is None
+    )
+
+
+def test_a_call_is_checkpointed_under_the_arguments_it_was_made_with(
+    store: CheckpointStore,
+) -> None:
+    tool = _tool("generate_and_show_images")
+    args = {"marketing_plan": "Plan 1", "number_of_images": 4}
+    call = _tool_context("s1", "call-1")
+    images = [{"image_uri": "gs://i"}]
+
+    assert checkpoint.restore_checkpoint(tool, args, call) is None
+    # enforce_budget cuts the request between the two callbacks.
+    args["number_of_images"] = 1
+    checkpoint.save_checkpoint(tool, args, call, images)
+
+    retry = {"marketing_plan": "Plan 1", "number_of_images": 4}
+    assert checkpoint.restore_checkpoint(tool, retry, _tool_context("s1")) == images
+
+
+def test_unlisted_tools_and_empty_outputs_are_not_checkpointed(
+    store: CheckpointStore,
+) -> None:
+    checkpoint.save_checkpoint(_tool("other_tool"), {}, _tool_context("s1"), "x")
+    checkpoint.save_checkpoint(
+        _tool("generate_and_show_video"), {}, _tool_context("s1"), None
+    )
+    # No matches: the retry gets to match more broadly.
+    checkpoint.save_checkpoint(
+        _tool("matchmaker_agent"), {}, _tool_context("s1"), "```json\n[]\n```"
+    )
+
+    assert store.load(checkpoint.checkpoint_id(_tool_context("s1"))) == {}
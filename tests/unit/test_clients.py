@@ -0,0 +1,134 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import pytest
+
+pytest.importorskip("httpx")
+
+import httpx
+
+from app.utils import clients, gcs
+from tests.fake_gcs_server import FakeGcsServer
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(clients, "_clients", {})
+    monkeypatch.setattr(clients, "_creation_locks", {})
+
+
+@pytest.fixture
+def server(monkeypatch: pytest.MonkeyPatch) -> Iterator[FakeGcsServer]:
+    with FakeGcsServer() as server:
+        monkeypatch.setenv("STORAGE_EMULATOR_HOST", server.url)
+        monkeypatch.setenv("GOOGLE_CLOUD_PROJECT", "test-project")
+        server.buckets.add("bucket")
+        yield server
+
+
+def test_a_client_is_created_once_for_all_threads() -> None:
+    created = []
+
+    def factory() -> object:
+        created.append(object())
+        return created[-1]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        handed_out = list(
+            executor.map(lambda _: clients.get_client("fake", factory, "p"), range(32))
+        )
+
+    assert len(created) == 1
+    assert all(client is created[0] for client in handed_out)
+    assert clients.get_client("fake", factory, "other") is not created[0]
+
+
+def test_shared_clients_get_a_tuned_connection_pool(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setenv("HTTP_POOL_SIZE", "32")
+
+    client = clients.get_bigquery_client("p")
+
+    assert clients.get_bigquery_client("p") is client
+    assert (
+        client._http.get_adapter("https://bigquery.googleapis.com")._pool_maxsize == 32
+    )
+
+
+def test_connection_stats_report_reuse(server: FakeGcsServer) -> None:
+    for i in range(5):
+        gcs.upload_bytes(f"gs://bucket/{i}.txt", "data", "text/plain")
+
+    stats = clients.connection_stats()
+
+    assert stats["storage:test-project"] == {
+        "requests": 5,
+        "connections": 1,
+        "reuse_ratio": 0.8,
+    }
+
+
+def test_counting_transport(server: FakeGcsServer) -> None:
+    transport = clients.CountingTransport()
+    with httpx.Client(transport=transport) as client:
+        for _ in range(3):
+            client.get(f"{server.url}/storage/v1/b/bucket")
+
+    assert (transport.requests, transport.connections) == (3, 1)
+
+
+def test_a_slow_factory_only_holds_up_its_own_client() -> None:
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_factory() -> object:
+        started.set()
+        release.wait(timeout=5)
+        return object()
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        slow = executor.submit(clients.get_client, "fake", slow_factory, "slow")
+        started.wait(timeout=5)
+        fast = clients.get_client("fake", object, "fast")
+        assert not slow.done()
+        release.set()
+        assert slow.result() is not fast
+
+
+class PoolWithoutConnections:
+    """An httpcore pool as a later release might have it, without .connections."""
+
+    def __init__(self, pool: Any) -> None:
+        self._pool = pool
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "connections":
+            raise AttributeError(name)
+        return getattr(self._pool, name)
+
+
+def test_counting_transport_without_a_visible_pool(server: FakeGcsServer) -> None:
+    transport = clients.CountingTransport()
+    transport._pool = PoolWithoutConnections(transport._pool)  # type: ignore[assignment]
+    with httpx.Client(transport=transport) as client:
+        client.get(f"{server.url}/storage/v1/b/bucket")
+
+    assert transport.requests == 1
+    assert not transport.counts_connections
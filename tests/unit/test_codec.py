@@ -0,0 +1,79 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+import json
+
+import pytest
+
+from app.utils import codec
+from app.utils.codec import JsonCodec, StdlibCodec, get_codec
+
+MATCHES = [
+    {
+        "product_name": "Regenjas",
+        "trend_title": "Storm Amy",
+        "similarity_description": "Stay dry — in style.",
+        "score": 0.92,
+    }
+]
+
+
+def _codecs() -> list[JsonCodec]:
+    codecs: list[JsonCodec] = [StdlibCodec()]
+    if codec.orjson is not None:
+        codecs.append(get_codec("orjson"))
+    return codecs
+
+
+@pytest.mark.parametrize("json_codec", _codecs(), ids=lambda c: c.name)
+def test_compact_output_has_no_whitespace(json_codec: JsonCodec) -> None:
+    encoded = json_codec.dumps(MATCHES)
+
+    assert encoded == json.dumps(MATCHES, separators=(",", ":"), ensure_ascii=False)
+    assert json_codec.loads(encoded) == MATCHES
+
+
+@pytest.mark.parametrize("json_codec", _codecs(), ids=lambda c: c.name)
+def test_indent_and_sort_keys(json_codec: JsonCodec) -> None:
+    encoded = json_codec.dumps({"b": 1, "a": [1]}, indent=True, sort_keys=True)
+
+    assert encoded == '{\n  "a": [\n    1\n  ],\n  "b": 1\n}'
+
+
+@pytest.mark.parametrize("json_codec", _codecs(), ids=lambda c: c.name)
+def test_default_serializes_unknown_types(json_codec: JsonCodec) -> None:
+    value = {"saved": datetime.date(2025, 9, 15), "ids": {1, 2} - {2}}
+
+    assert json_codec.loads(json_codec.dumps(value, default=str)) == {
+        "saved": "2025-09-15",
+        "ids": "{1}",
+    }
+
+
+@pytest.mark.parametrize("json_codec", _codecs(), ids=lambda c: c.name)
+def test_loads_raises_json_decode_error(json_codec: JsonCodec) -> None:
+    with pytest.raises(json.JSONDecodeError):
+        json_codec.loads("[not json")
+
+
+def test_get_codec_rejects_unknown_names() -> None:
+    with pytest.raises(ValueError, match="Unknown JSON codec"):
+        get_codec("simplejson")
+
+
+def test_get_codec_reads_environment(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("JSON_CODEC", "json")
+
+    assert get_codec().name == "json"
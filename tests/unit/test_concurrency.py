@@ -0,0 +1,102 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import threading
+from collections.abc import AsyncIterator, Iterator
+
+import pytest
+
+from app.utils import concurrency
+from app.utils.concurrency import bounded_async_stream, bounded_stream
+
+
+@pytest.fixture
+def one_slot(monkeypatch: pytest.MonkeyPatch) -> threading.BoundedSemaphore:
+    slots = threading.BoundedSemaphore(1)
+    monkeypatch.setattr(concurrency, "_request_slots", slots)
+    monkeypatch.setattr(concurrency, "SLOT_POLL_SECONDS", 0.001)
+    return slots
+
+
+def _events() -> Iterator[int]:
+    yield from range(3)
+
+
+async def _async_events() -> AsyncIterator[int]:
+    for event in range(3):
+        yield event
+
+
+def test_a_stream_holds_its_slot_until_it_ends(
+    one_slot: threading.BoundedSemaphore,
+) -> None:
+    stream = bounded_stream(_events())
+    assert next(stream) == 0
+    assert not one_slot.acquire(blocking=False)
+    assert list(stream) == [1, 2]
+    assert one_slot.acquire(blocking=False)
+
+
+def test_a_closed_stream_gives_its_slot_back(
+    one_slot: threading.BoundedSemaphore,
+) -> None:
+    stream = bounded_stream(_events())
+    next(stream)
+    stream.close()
+    assert one_slot.acquire(blocking=False)
+
+
+def test_a_failed_stream_gives_its_slot_back(
+    one_slot: threading.BoundedSemaphore,
+) -> None:
+    def failing() -> Iterator[int]:
+        yield 0
+        raise RuntimeError("model unavailable")
+
+    with pytest.raises(RuntimeError):
+        list(bounded_stream(failing()))
+    assert one_slot.acquire(blocking=False)
+
+
+def test_an_async_stream_waits_for_a_free_slot(
+    one_slot: threading.BoundedSemaphore,
+) -> None:
+    async def _run() -> list[int]:
+        first = bounded_async_stream(_async_events())
+        assert await anext(first) == 0
+        waiting = asyncio.ensure_future(_collect(bounded_async_stream(_async_events())))
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+        await first.aclose()
+        return await waiting
+
+    assert asyncio.run(_run()) == [0, 1, 2]
+    assert one_slot.acquire(blocking=False)
+
+
+def test_a_closed_async_stream_gives_its_slot_back(
+    one_slot: threading.BoundedSemaphore,
+) -> None:
+    async def _run() -> None:
+        stream = bounded_async_stream(_async_events())
+        await anext(stream)
+        await stream.aclose()
+
+    asyncio.run(_run())
+    assert one_slot.acquire(blocking=False)
+
+
+async def _collect(events: AsyncIterator[int]) -> list[int]:
+    return [event async for event in events]
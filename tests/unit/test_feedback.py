@@ -0,0 +1,125 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from app.utils.feedback import (
+    FeedbackBackpressureError,
+    FeedbackWriter,
+    FileSink,
+    score_distribution,
+)
+
+
+class RecordingSink:
+    def __init__(self) -> None:
+        self.batches: list[list[dict[str, Any]]] = []
+
+    def write(self, entries: list[dict[str, Any]]) -> None:
+        self.batches.append(entries)
+
+
+class BlockedSink:
+    def __init__(self) -> None:
+        self.release = threading.Event()
+
+    def write(self, entries: list[dict[str, Any]]) -> None:
+        self.release.wait()
+
+
+def _feedback(invocation_id: str, score: int) -> dict[str, Any]:
+    return {"invocation_id": invocation_id, "score": score, "log_type": "feedback"}
+
+
+def test_entries_are_written_in_batches_of_max_size() -> None:
+    sink = RecordingSink()
+    writer = FeedbackWriter(sink, max_batch_size=3, flush_interval_seconds=60)
+    for i in range(7):
+        writer.submit(_feedback("a", i))
+    writer.close()
+
+    assert [len(batch) for batch in sink.batches] == [3, 3, 1]
+    assert writer.written == 7
+
+
+def test_partial_batch_is_written_after_the_flush_interval() -> None:
+    sink = RecordingSink()
+    writer = FeedbackWriter(sink, max_batch_size=100, flush_interval_seconds=0.05)
+    writer.submit(_feedback("a", 1))
+
+    deadline = time.monotonic() + 5
+    while not sink.batches and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert sink.batches == [[_feedback("a", 1)]]
+    writer.close()
+
+
+def test_full_buffer_pushes_back_on_the_caller() -> None:
+    sink = BlockedSink()
+    writer = FeedbackWriter(
+        sink, max_batch_size=1, max_queue_size=1, put_timeout_seconds=0.05
+    )
+    writer.submit(_feedback("a", 1))  # taken by the writer thread, blocked in the sink
+    time.sleep(0.05)
+    writer.submit(_feedback("a", 2))  # fills the queue
+    with pytest.raises(FeedbackBackpressureError):
+        writer.submit(_feedback("a", 3))
+    with pytest.raises(FeedbackBackpressureError):
+        writer.flush()
+    sink.release.set()
+    writer.close()
+
+
+def test_close_does_not_wait_on_a_full_buffer() -> None:
+    sink = BlockedSink()
+    writer = FeedbackWriter(
+        sink, max_batch_size=1, max_queue_size=1, put_timeout_seconds=0.05
+    )
+    writer.submit(_feedback("a", 1))
+    time.sleep(0.05)
+    writer.submit(_feedback("a", 2))
+
+    started = time.monotonic()
+    writer.close()
+    assert time.monotonic() - started < 1
+    sink.release.set()
+
+
+def test_a_closed_writer_rejects_entries_and_flushes() -> None:
+    writer = FeedbackWriter(RecordingSink())
+    writer.close()
+
+    with pytest.raises(RuntimeError):
+        writer.submit(_feedback("a", 1))
+    with pytest.raises(RuntimeError):
+        writer.flush()
+
+
+def test_file_sink_and_score_distribution(tmp_path: Path) -> None:
+    sink = FileSink(str(tmp_path / "feedback.jsonl"))
+    writer = FeedbackWriter(sink)
+    for invocation_id, score in [("a", 5), ("a", 3), ("a", 5), ("b", 1)]:
+        writer.submit(_feedback(invocation_id, score))
+    writer.flush()
+
+    assert score_distribution(sink.read()) == {
+        "a": {"count": 3, "mean": 13 / 3, "scores": {3: 1, 5: 2}},
+        "b": {"count": 1, "mean": 1.0, "scores": {1: 1}},
+    }
+    writer.close()
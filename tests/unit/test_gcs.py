@@ -0,0 +1,95 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+from collections.abc import Iterator
+
+import pytest
+from google.api_core import exceptions
+
+from app.utils import clients, gcs
+from tests.fake_gcs_server import FakeGcsServer
+
+
+@pytest.fixture
+def server(monkeypatch: pytest.MonkeyPatch) -> Iterator[FakeGcsServer]:
+    with FakeGcsServer() as server:
+        monkeypatch.setenv("STORAGE_EMULATOR_HOST", server.url)
+        monkeypatch.setattr(clients, "_clients", {})
+        monkeypatch.setattr(gcs, "_bucket_exists", {})
+        server.buckets.add("bucket")
+        yield server
+
+
+def test_parse_gcs_uri() -> None:
+    assert gcs.parse_gcs_uri("gs://bucket/images/1/a.png") == (
+        "bucket",
+        "images/1/a.png",
+    )
+    with pytest.raises(ValueError, match="Not a GCS URI"):
+        gcs.parse_gcs_uri("https://storage.googleapis.com/bucket/a.png")
+
+
+def test_the_client_is_shared() -> None:
+    assert gcs.get_storage_client("p") is gcs.get_storage_client("p")
+
+
+def test_upload_and_download_many(server: FakeGcsServer) -> None:
+    uris = [f"gs://bucket/objects/{i}.txt" for i in range(5)]
+
+    assert gcs.upload_many((uri, uri, "text/plain") for uri in uris) == uris
+
+    assert gcs.download_many(uris) == [uri.encode() for uri in uris]
+    assert server.objects[("bucket", "objects/0.txt")][1] == "text/plain"
+
+
+def test_large_objects_are_transferred_in_chunks(
+    server: FakeGcsServer, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("GCS_CHUNK_SIZE", str(4 * 1024 * 1024))
+    data = os.urandom(9 * 1024 * 1024)
+
+    gcs.upload_bytes("gs://bucket/videos/large.mp4", data, "video/mp4")
+
+    assert server.objects[("bucket", "videos/large.mp4")][0] == data
+    assert sum(request.startswith("PUT ") for request in server.requests) == 3
+    server.requests.clear()
+    assert gcs.download_bytes("gs://bucket/videos/large.mp4") == data
+    assert len(server.requests) == 3
+
+
+def test_failed_transfers_can_be_returned(server: FakeGcsServer) -> None:
+    contents = gcs.download_many(
+        ["gs://bucket/missing.txt", "gs://other/a.txt"], raise_exception=False
+    )
+
+    assert all(isinstance(content, exceptions.NotFound) for content in contents)
+    with pytest.raises(exceptions.NotFound):
+        gcs.download_many(["gs://bucket/missing.txt"])
+
+
+def test_bucket_existence_is_cached(server: FakeGcsServer) -> None:
+    assert gcs.bucket_exists("gs://bucket")
+    assert not gcs.bucket_exists("missing")
+    assert gcs.bucket_exists("bucket")
+
+    assert len(server.requests) == 2
+
+
+def test_create_bucket_if_not_exists(server: FakeGcsServer) -> None:
+    gcs.create_bucket_if_not_exists("gs://bucket", "p", "europe-west4")
+    gcs.create_bucket_if_not_exists("new-bucket", "p", "europe-west4")
+
+    assert server.buckets == {"bucket", "new-bucket"}
+    assert gcs.bucket_exists("new-bucket")
@@ -0,0 +1,125 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import subprocess
+import sys
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("PIL")
+
+from PIL import Image
+
+from app import image_renditions
+from app.utils import clients
+from app.utils.images import (
+    Rendition,
+    parse_renditions,
+    render_renditions,
+)
+from tests.fake_gcs_server import FakeGcsServer
+
+
+def png(width: int = 576, height: int = 1024) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (217, 125, 81)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def server(monkeypatch: pytest.MonkeyPatch) -> Iterator[FakeGcsServer]:
+    with FakeGcsServer() as server:
+        monkeypatch.setenv("STORAGE_EMULATOR_HOST", server.url)
+        monkeypatch.setattr(clients, "_clients", {})
+        server.buckets.add("b")
+        yield server
+
+
+def test_parse_renditions() -> None:
+    assert parse_renditions("thumb:320:webp:80, story:1080x1920:jpg") == [
+        Rendition(name="thumb", width=320, format="WEBP", quality=80),
+        Rendition(name="story", width=1080, height=1920, format="JPEG"),
+    ]
+    assert parse_renditions("") == []
+    with pytest.raises(ValueError, match="GIF"):
+        parse_renditions("anim:320:gif")
+
+
+def test_render_renditions_resizes_and_encodes() -> None:
+    rendered = render_renditions(
+        png(),
+        [
+            Rendition(name="thumb", width=144, format="WEBP"),
+            Rendition(name="feed", width=200, height=250, format="JPEG"),
+        ],
+    )
+
+    data, width, height = rendered["thumb"]
+    assert (width, height) == (144, 256)
+    assert Image.open(io.BytesIO(data)).format == "WEBP"
+    data, width, height = rendered["feed"]
+    assert (width, height) == (200, 250)
+    assert Image.open(io.BytesIO(data)).size == (200, 250)
+
+
+def test_add_renditions_uploads_next_to_the_original(
+    server: FakeGcsServer, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    server.objects[("b", "images/1/sample_0.png")] = (png(), "image/png")
+    with ThreadPoolExecutor() as pool:
+        monkeypatch.setattr(image_renditions, "rendition_pool", lambda: pool)
+        images = image_renditions.add_renditions(
+            [
+                {
+                    "image_uri": "gs://b/images/1/sample_0.png",
+                    "bucket": "b",
+                    "object": "images/1/sample_0.png",
+                },
+                {
+                    "image_uri": "gs://b/images/1/missing.png",
+                    "bucket": "b",
+                    "object": "images/1/missing.png",
+                },
+            ],
+            parse_renditions("thumb:144:webp,story:270x480:jpeg"),
+        )
+
+    renditions = images[0]["renditions"]
+    assert renditions["thumb"]["uri"] == "gs://b/images/1/sample_0_thumb.webp"
+    assert renditions["story"]["public_url"] == (
+        "https://storage.googleapis.com/b/images/1/sample_0_story.jpg"
+    )
+    assert (renditions["story"]["width"], renditions["story"]["height"]) == (270, 480)
+    assert server.objects[("b", "images/1/sample_0_thumb.webp")][1] == "image/webp"
+    assert "renditions" not in images[1]
+    assert "missing.png" in images[1]["renditions_error"]
+
+
+def test_rendition_processes_do_not_load_the_agent() -> None:
+    # Spawned workers import app.utils.images, and with it the app package.
+    loaded = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, app.utils.images; print('app.agent' in sys.modules)",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert loaded.stdout.strip() == "False"
@@ -0,0 +1,78 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import logging
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from app.utils.logging_config import JsonFormatter, prompt_preview
+
+
+def test_json_formatter_emits_extra_fields() -> None:
+    record = logging.LogRecord(
+        "app.product_data_retriever",
+        logging.INFO,
+        __file__,
+        1,
+        "Fetched %d",
+        (5,),
+        None,
+    )
+    record.bigquery_bytes_processed = 1024
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["severity"] == "INFO"
+    assert entry["message"] == "Fetched 5"
+    assert entry["logger"] == "app.product_data_retriever"
+    assert entry["bigquery_bytes_processed"] == 1024
+
+
+def test_prompt_preview_truncates_by_default(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("LOG_PROMPTS", raising=False)
+    monkeypatch.setenv("LOG_PROMPT_CHARS", "10")
+
+    assert prompt_preview("short") == "short"
+    assert prompt_preview("x" * 50) == "xxxxxxxxxx... (50 chars)"
+
+
+def test_prompt_preview_logs_full_prompts_behind_flag(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setenv("LOG_PROMPT_CHARS", "10")
+    monkeypatch.setenv("LOG_PROMPTS", "true")
+
+    monkeypatch.setenv("LOG_PROMPT_SAMPLE_RATE", "1.0")
+    assert prompt_preview("x" * 50) == "x" * 50
+
+    monkeypatch.setenv("LOG_PROMPT_SAMPLE_RATE", "0")
+    assert prompt_preview("x" * 50) == "xxxxxxxxxx... (50 chars)"
+
+
+def test_importing_the_package_leaves_logging_alone() -> None:
+    # Entry points configure logging; a host process importing app keeps its own.
+    code = (
+        "import logging\n"
+        "handler = logging.StreamHandler()\n"
+        "logging.getLogger().addHandler(handler)\n"
+        "import app\n"
+        "assert logging.getLogger().handlers == [handler]\n"
+    )
+    subprocess.run(
+        [sys.executable, "-c", code], check=True, cwd=Path(__file__).parents[2]
+    )
@@ -0,0 +1,133 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+import pytest
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from app import marketing_creative
+from app.marketing_creative import MarketingPlanStreamAgent
+from app.utils.cache import SharedCache
+from app.utils.checkpoint import CHECKPOINT_ID_KEY
+
+USAGE = types.GenerateContentResponseUsageMetadata(prompt_token_count=12)
+
+
+class Chunk:
+    """A streamed response chunk; .text raises like the SDK's when it has no text."""
+
+    def __init__(self, text: str | None, usage_metadata: object = None) -> None:
+        self._text = text
+        self.usage_metadata = usage_metadata
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            raise ValueError("The response has no text parts.")
+        return self._text
+
+
+class FakeModel:
+    model_name = "gemini-test"
+
+    def __init__(self, chunks: list[Chunk]) -> None:
+        self.chunks = chunks
+
+    async def generate_content_async(
+        self, contents: list[str], stream: bool
+    ) -> AsyncIterator[Chunk]:
+        async def _stream() -> AsyncIterator[Chunk]:
+            for chunk in self.chunks:
+                yield chunk
+
+        return _stream()
+
+
+@pytest.fixture(autouse=True)
+def llm_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    cache = SharedCache("llm_responses", ttl_seconds=60, path=str(tmp_path / "c.db"))
+    monkeypatch.setattr(marketing_creative, "_llm_cache", cache)
+    monkeypatch.setenv("SPECULATIVE_IMAGES", "false")
+    monkeypatch.delenv("CACHE_MARKETING_PLANS", raising=False)
+
+
+def _run(
+    monkeypatch: pytest.MonkeyPatch,
+    chunks: list[Chunk],
+    state: dict[str, str] | None = None,
+) -> list[str]:
+    monkeypatch.setattr(
+        marketing_creative, "get_generative_model", lambda model: FakeModel(chunks)
+    )
+    agent = MarketingPlanStreamAgent(name="marketing_plan_agent")
+
+    async def _collect() -> list[str]:
+        runner = InMemoryRunner(agent=agent, app_name="test")
+        session = await runner.session_service.create_session(
+            app_name="test", user_id="test", state={"matches": "[]", **(state or {})}
+        )
+        message = types.Content(role="user", parts=[types.Part.from_text(text="go")])
+        return [
+            "".join(part.text or "" for part in event.content.parts or [])
+            async for event in runner.run_async(
+                user_id="test",
+                session_id=session.id,
+                new_message=message,
+                run_config=RunConfig(streaming_mode=StreamingMode.SSE),
+            )
+            if event.content is not None
+        ]
+
+    return asyncio.run(_collect())
+
+
+def test_chunks_without_text_are_skipped(monkeypatch: pytest.MonkeyPatch) -> None:
+    chunks = [Chunk("Plan 1. "), Chunk(None), Chunk("Plan 2.", usage_metadata=USAGE)]
+
+    assert _run(monkeypatch, chunks) == ["Plan 1. ", "Plan 2.", "Plan 1. Plan 2."]
+
+
+def test_empty_stream_yields_empty_plans(monkeypatch: pytest.MonkeyPatch) -> None:
+    assert _run(monkeypatch, []) == [""]
+
+
+def test_plans_are_only_cached_when_opted_in(monkeypatch: pytest.MonkeyPatch) -> None:
+    assert _run(monkeypatch, [Chunk("Plan A.")]) == ["Plan A.", "Plan A."]
+    assert _run(monkeypatch, [Chunk("Plan B.")]) == ["Plan B.", "Plan B."]
+
+    monkeypatch.setenv("CACHE_MARKETING_PLANS", "true")
+    assert _run(monkeypatch, [Chunk("Plan C.")]) == ["Plan C.", "Plan C."]
+    assert _run(monkeypatch, [Chunk("Plan D.")]) == ["Plan C."]
+
+
+def test_plans_are_speculated_under_the_session_checkpoint_id(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    speculated: list[str] = []
+    monkeypatch.setattr(
+        marketing_creative,
+        "speculate_images",
+        lambda session_id, plans: speculated.append(session_id),
+    )
+
+    _run(monkeypatch, [Chunk("Plan A.")], state={CHECKPOINT_ID_KEY: "c1"})
+    _run(monkeypatch, [Chunk("Plan B.")])
+
+    assert speculated[0] == "c1"
+    assert speculated[1]
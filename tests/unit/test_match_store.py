@@ -0,0 +1,92 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from pathlib import Path
+
+from app.match_store import MatchStore, trend_key, unknown_pair_groups
+
+PRODUCTS = [
+    {"product_name": "Organic Milk", "price": 1.5},
+    {"product_name": "Boerenkaas", "price": 7.0},
+]
+TRENDS = [
+    {"trend_title": "Cat Mayor", "trend_description": "A cat won an election."},
+    {"trend_title": "Jimmy Fallon", "trend_description": "Late-night news."},
+]
+MATCH = {
+    "product_name": "Organic Milk",
+    "trend_title": "Cat Mayor",
+    "trend_description": "A cat won an election.",
+    "similarity_description": "Even mayors need milk.",
+}
+
+
+def test_trend_key_normalizes_titles() -> None:
+    assert trend_key({"trend_title": "  Jimmy   FALLON "}) == "jimmy fallon"
+
+
+def test_evaluated_pairs_are_reused(tmp_path: Path) -> None:
+    store = MatchStore(path=str(tmp_path / "cache.sqlite"))
+    store.record_pairs(PRODUCTS, TRENDS, [MATCH])
+
+    known = store.known_pairs(PRODUCTS, TRENDS)
+    assert len(known) == 4
+    assert known[("Organic Milk", "cat mayor")] == MATCH
+    assert known[("Boerenkaas", "jimmy fallon")] is None
+
+
+def test_changed_product_is_reevaluated(tmp_path: Path) -> None:
+    store = MatchStore(path=str(tmp_path / "cache.sqlite"))
+    store.record_pairs(PRODUCTS, TRENDS, [MATCH])
+
+    changed = [PRODUCTS[0], {**PRODUCTS[1], "price": 8.0}]
+    new_trend = {"trend_title": "Heatwave", "trend_description": "Hot week."}
+    known = store.known_pairs(changed, [*TRENDS, new_trend])
+    assert set(known) == {
+        ("Organic Milk", "cat mayor"),
+        ("Organic Milk", "jimmy fallon"),
+    }
+
+
+def test_trend_verdicts(tmp_path: Path) -> None:
+    store = MatchStore(path=str(tmp_path / "cache.sqlite"))
+    store.record_trend_verdicts(TRENDS, allowed=TRENDS[:1])
+    assert store.trend_verdicts(TRENDS) == {"cat mayor": True, "jimmy fallon": False}
+
+
+def test_matches_are_attributed_by_normalized_name(tmp_path: Path) -> None:
+    store = MatchStore(path=str(tmp_path / "cache.sqlite"))
+    echoed = {**MATCH, "product_name": " organic  MILK", "trend_title": "cat mayor"}
+    invented = {**MATCH, "product_name": "Chocolate Milk"}
+
+    assert store.record_pairs(PRODUCTS, TRENDS, [echoed, invented]) == [echoed]
+    known = store.known_pairs(PRODUCTS, TRENDS)
+    assert known[("Organic Milk", "cat mayor")] == echoed
+    assert [match for match in known.values() if match] == [echoed]
+
+
+def test_only_unknown_pairs_are_grouped(tmp_path: Path) -> None:
+    store = MatchStore(path=str(tmp_path / "cache.sqlite"))
+    store.record_pairs(PRODUCTS, TRENDS, [MATCH])
+
+    changed = {**PRODUCTS[1], "price": 8.0}
+    new_trend = {"trend_title": "Heatwave", "trend_description": "Hot week."}
+    trends = [*TRENDS, new_trend]
+    groups = unknown_pair_groups(
+        [PRODUCTS[0], changed],
+        trends,
+        store.known_pairs([PRODUCTS[0], changed], trends),
+    )
+
+    assert groups == [([PRODUCTS[0]], [new_trend]), ([changed], trends)]
@@ -0,0 +1,116 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from app import matchmaker
+from app.match_store import MatchStore
+from app.utils.cache import SharedCache
+
+PRODUCTS = [
+    {"product_name": "Organic Milk", "price": 1.5},
+    {"product_name": "Boerenkaas", "price": 7.0},
+]
+TRENDS = [
+    {"trend_title": "Cat Mayor", "trend_description": "A cat won an election."},
+    {"trend_title": "Election Riots", "trend_description": "Unrest after the vote."},
+]
+MILK_MATCH = {
+    "product_name": "Organic Milk",
+    "trend_title": "Cat Mayor",
+    "trend_description": "A cat won an election.",
+    "similarity_description": "Even mayors need milk.",
+}
+CHEESE_MATCH = {
+    "product_name": "Boerenkaas",
+    "trend_title": "Election Riots",
+    "trend_description": "Unrest after the vote.",
+    "similarity_description": "Cheese calms everyone down.",
+}
+
+
+class FakeModel:
+    model_name = "gemini-test"
+
+
+class FusedResponses:
+    """Stands in for the fused model call, answering with a fixed verdict."""
+
+    def __init__(self, result: dict[str, Any]) -> None:
+        self.result = result
+        self.prompts: list[str] = []
+
+    def __call__(self, model: Any, prompt: str, **kwargs: Any) -> str:
+        self.prompts.append(prompt)
+        return json.dumps(self.result)
+
+
+@pytest.fixture
+def store(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> MatchStore:
+    match_store = MatchStore(path=str(tmp_path / "cache.sqlite"))
+    monkeypatch.setattr(matchmaker, "_match_store", match_store)
+    monkeypatch.setattr(
+        matchmaker,
+        "_llm_cache",
+        SharedCache("llm_responses", path=str(tmp_path / "cache.sqlite")),
+    )
+    monkeypatch.setattr(matchmaker, "get_generative_model", lambda model: FakeModel())
+    monkeypatch.setattr(
+        matchmaker, "shortlist_products", lambda products, trends: products
+    )
+    return match_store
+
+
+@pytest.fixture
+def model_calls(monkeypatch: pytest.MonkeyPatch) -> FusedResponses:
+    # The model flags the riots but still matches them; the match must be dropped.
+    responses = FusedResponses(
+        {
+            "sensitive_trend_titles": ["Election Riots"],
+            "matches": [MILK_MATCH, CHEESE_MATCH],
+        }
+    )
+    monkeypatch.setattr(matchmaker, "traced_generate_content", responses)
+    return responses
+
+
+def test_fused_matching_drops_sensitive_trends(
+    store: MatchStore, model_calls: FusedResponses
+) -> None:
+    matches = matchmaker.match_products(
+        json.dumps(PRODUCTS), json.dumps(TRENDS), fused=True
+    )
+
+    assert matches == [MILK_MATCH]
+    assert len(model_calls.prompts) == 1
+
+
+def test_fused_verdicts_are_stored_and_reused(
+    store: MatchStore, model_calls: FusedResponses
+) -> None:
+    matchmaker.match_products(json.dumps(PRODUCTS), json.dumps(TRENDS), fused=True)
+
+    assert store.trend_verdicts(TRENDS) == {
+        "cat mayor": True,
+        "election riots": False,
+    }
+    matches = matchmaker.match_products(
+        json.dumps(PRODUCTS), json.dumps(TRENDS), fused=True
+    )
+    assert matches == [MILK_MATCH]
+    assert len(model_calls.prompts) == 1
@@ -0,0 +1,122 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Any
+
+import pytest
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+
+from app.utils.model_routing import (
+    detect_stage,
+    get_route,
+    load_routes,
+    record_model_latency,
+    reroute_model,
+    route_model_request,
+    route_stage,
+)
+
+
+def test_load_routes_applies_overrides() -> None:
+    """JSON overrides replace individual fields of a profile route."""
+    routes = load_routes(
+        profile="balanced", overrides='{"handoff": {"model": "gemini-2.5-flash-lite"}}'
+    )
+    assert routes["handoff"].model == "gemini-2.5-flash-lite"
+    assert routes["handoff"].thinking_budget == 0
+    assert routes["plan"].model == "gemini-2.5-pro"
+
+
+def test_load_routes_rejects_unknown_profile() -> None:
+    with pytest.raises(ValueError):
+        load_routes(profile="does-not-exist", overrides="")
+
+
+def test_get_route_follows_the_environment(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Routes are resolved once per configuration, not once per model call."""
+    monkeypatch.setenv("MODEL_ROUTING_PROFILE", "balanced")
+    monkeypatch.setenv(
+        "MODEL_ROUTING", '{"handoff": {"model": "gemini-2.5-flash-lite"}}'
+    )
+    assert get_route("handoff") is get_route("handoff")
+    assert get_route("handoff").model == "gemini-2.5-flash-lite"
+
+    monkeypatch.setenv("MODEL_ROUTING", "")
+    assert get_route("handoff").model == load_routes("balanced", "")["handoff"].model
+
+
+def test_detect_stage_from_last_turn() -> None:
+    """The stage follows from the function response the model has just received."""
+    user_turn = types.Content(role="user", parts=[types.Part.from_text(text="Go")])
+    tool_turn = types.Content(
+        role="user",
+        parts=[
+            types.Part.from_function_response(
+                name="marketing_agent", response={"result": "three plans"}
+            )
+        ],
+    )
+    assert detect_stage([]) == "plan"
+    assert detect_stage([user_turn]) == "plan"
+    assert detect_stage([user_turn, tool_turn]) == "present"
+
+
+class CallbackContext:
+    invocation_id = "e-1"
+    agent_name = "creative_agent"
+
+    def __init__(self) -> None:
+        self.state: dict[str, Any] = {}
+
+
+def test_route_stage_pins_the_stage_of_a_user_turn(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setenv("MODEL_ROUTING_PROFILE", "balanced")
+    monkeypatch.delenv("MODEL_ROUTING", raising=False)
+    choice = types.Content(role="user", parts=[types.Part.from_text(text="Plan 2")])
+
+    routed = LlmRequest(contents=[choice])
+    route_model_request(CallbackContext(), routed)
+    pinned = LlmRequest(contents=[choice])
+    route_stage("present")(CallbackContext(), pinned)
+
+    assert routed.model == get_route("plan").model
+    assert pinned.model == get_route("present").model
+    assert pinned.config is not None
+    assert pinned.config.thinking_config == get_route("present").thinking_config()
+
+
+def test_latency_is_logged_for_the_model_actually_requested(
+    monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+) -> None:
+    monkeypatch.setenv("MODEL_ROUTING_PROFILE", "balanced")
+    monkeypatch.delenv("MODEL_ROUTING", raising=False)
+    callback_context = CallbackContext()
+    request = LlmRequest(contents=[])
+
+    route_model_request(callback_context, request)
+    reroute_model(callback_context, request, "gemini-2.5-flash-lite")
+    with caplog.at_level("INFO", logger="app.utils.model_routing"):
+        record_model_latency(callback_context, LlmResponse())
+        record_model_latency(callback_context, LlmResponse())
+
+    assert request.model == "gemini-2.5-flash-lite"
+    assert len(caplog.records) == 1
+    assert (
+        caplog.records[0]
+        .getMessage()
+        .startswith("Stage plan on gemini-2.5-flash-lite took")
+    )
@@ -0,0 +1,84 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections.abc import Callable
+
+import pytest
+
+from app import prewarm as prewarm_module
+from app.prewarm import prewarm, prewarm_enabled
+
+
+@pytest.fixture
+def ran(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Replaces the warm-up steps with ones that record that they ran."""
+    calls: list[str] = []
+
+    def step(name: str) -> Callable[[], None]:
+        return lambda: calls.append(name)
+
+    def broken() -> None:
+        calls.append("broken")
+        raise RuntimeError("BigQuery is down")
+
+    monkeypatch.setattr(
+        prewarm_module,
+        "PREWARM_STEPS",
+        {
+            "credentials": step("credentials"),
+            "broken": broken,
+            "clients": step("clients"),
+        },
+    )
+    monkeypatch.delenv("PREWARM_STEPS", raising=False)
+    return calls
+
+
+def test_every_step_runs_in_order_by_default(ran: list[str]) -> None:
+    timings = prewarm()
+
+    assert ran == ["credentials", "broken", "clients"]
+    assert list(timings) == ["credentials", "broken", "clients"]
+
+
+def test_steps_are_selected_by_the_environment(
+    ran: list[str], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("PREWARM_STEPS", "clients,credentials")
+
+    assert list(prewarm()) == ["clients", "credentials"]
+    assert ran == ["clients", "credentials"]
+    # Explicit steps win over the environment.
+    assert list(prewarm(["credentials"])) == ["credentials"]
+
+
+def test_a_failing_step_does_not_stop_the_others(ran: list[str]) -> None:
+    timings = prewarm(["broken", "unknown", "clients"])
+
+    assert timings["broken"] == -1.0
+    assert timings["unknown"] == -1.0
+    assert timings["clients"] >= 0
+    assert ran == ["broken", "clients"]
+
+
+def test_prewarm_is_off_unless_enabled(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("PREWARM_ON_SETUP", raising=False)
+    assert not prewarm_enabled()
+    monkeypatch.setenv("PREWARM_ON_SETUP", "true")
+    assert prewarm_enabled()
+
+
+def test_mcp_step_only_installs_the_server() -> None:
+    assert "mcp_install" in prewarm_module.PREWARM_STEPS
+    assert "mcp_server" not in prewarm_module.PREWARM_STEPS
@@ -0,0 +1,126 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import numpy as np
+
+from app import product_index
+from app.product_index import ProductIndex, build_index, shortlist_products
+
+VECTORS = {
+    "Organic Milk": [1.0, 0.0, 0.0],
+    "Boerenkaas": [0.0, 1.0, 0.0],
+    "Gift Card": [0.0, 0.0, 1.0],
+}
+
+
+@pytest.fixture
+def embedded_texts(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Replaces the embedding model with fixed one-hot vectors per product."""
+    calls: list[str] = []
+
+    def fake_embed(texts: list[str], task_type: str) -> "np.ndarray":
+        if task_type == "RETRIEVAL_QUERY":
+            # Trends are embedded as "title: description"; titles name a product.
+            return np.asarray(
+                [VECTORS[text.split(":")[0]] for text in texts], dtype=np.float32
+            )
+        calls.extend(texts)
+        return np.asarray(
+            [VECTORS[text.split("\n")[0].split(": ")[1]] for text in texts],
+            dtype=np.float32,
+        )
+
+    monkeypatch.setattr(product_index, "_embed_texts", fake_embed)
+    return calls
+
+
+def test_build_is_incremental(tmp_path: Path, embedded_texts: list[str]) -> None:
+    rows = [{"product_name": name, "price": 1} for name in VECTORS]
+    assert build_index(rows, path=str(tmp_path)) == (3, 3)
+
+    rows[1]["price"] = 2
+    assert build_index(rows, path=str(tmp_path)) == (3, 1)
+    assert len(embedded_texts) == 4
+
+
+def test_top_k_orders_by_cosine(tmp_path: Path, embedded_texts: list[str]) -> None:
+    build_index([{"product_name": name} for name in VECTORS], path=str(tmp_path))
+    index = ProductIndex.load(str(tmp_path))
+    assert index is not None
+    assert isinstance(index.embeddings, np.memmap)
+
+    query = np.asarray([[0.6, 0.8, 0.0]], dtype=np.float32)
+    ranked = index.top_k(query, k=2)
+    assert [pid for pid, _ in ranked[0]] == ["Boerenkaas", "Organic Milk"]
+    assert ranked[0][0][1] == pytest.approx(0.8)
+
+
+def test_builds_are_published_as_versions(
+    tmp_path: Path, embedded_texts: list[str]
+) -> None:
+    rows = [{"product_name": name} for name in VECTORS]
+    for _ in range(3):
+        build_index(rows, path=str(tmp_path))
+
+    versions = sorted(p.name for p in tmp_path.iterdir() if p.name.startswith("v"))
+    assert len(versions) == 2
+    assert (tmp_path / "CURRENT").read_text() == versions[-1]
+    assert not (tmp_path / "CURRENT.tmp").exists()
+
+
+def test_model_or_size_change_re_embeds_everything(
+    tmp_path: Path, embedded_texts: list[str], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    rows: list[dict[str, Any]] = [{"product_name": name} for name in VECTORS]
+    build_index(rows, path=str(tmp_path))
+
+    monkeypatch.setattr(product_index, "EMBEDDING_MODEL", "text-embedding-006")
+    assert build_index(rows, path=str(tmp_path)) == (3, 3)
+    index = ProductIndex.load(str(tmp_path))
+    assert index is not None and index.model == "text-embedding-006"
+
+    # A changed row embedded at another size invalidates the stored vectors.
+    monkeypatch.setitem(VECTORS, "Gift Card", [0.0, 0.0, 0.0, 1.0])
+    monkeypatch.setitem(VECTORS, "Organic Milk", [1.0, 0.0, 0.0, 0.0])
+    monkeypatch.setitem(VECTORS, "Boerenkaas", [0.0, 1.0, 0.0, 0.0])
+    rows[2]["price"] = 3
+    assert build_index(rows, path=str(tmp_path)) == (3, 3)
+    index = ProductIndex.load(str(tmp_path))
+    assert index is not None and index.dim == 4
+
+
+def test_shortlist_searches_the_whole_catalog(
+    tmp_path: Path, embedded_texts: list[str], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("PRODUCT_INDEX_DIR", str(tmp_path))
+    build_index([{"product_name": name} for name in VECTORS], path=str(tmp_path))
+    product_index.get_product_index.cache_clear()
+
+    # The session only fetched the first product, plus one the index does not know.
+    given: list[dict[str, Any]] = [
+        {"product_name": "Organic Milk", "price": 2},
+        {"product_name": "Stroopwafel"},
+    ]
+    trends = [{"trend_title": "Gift Card", "trend_description": "King's Day"}]
+    shortlisted = shortlist_products(given, trends, k=1)
+
+    assert [row["product_name"] for row in shortlisted] == ["Gift Card", "Stroopwafel"]
+    product_index.get_product_index.cache_clear()
@@ -0,0 +1,80 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+import json
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import pyarrow as pa
+from google.cloud.bigquery import Row
+
+from app.product_data_retriever import arrow_to_json, rows_to_json
+
+UTC = datetime.timezone.utc
+COLUMNS = {
+    "product_name": ["Rain jacket", "Wool socks", None],
+    "price": [89.95, 0.1 + 0.2, None],
+    "stock": [3, None, 0],
+    "launch_date": [datetime.date(2025, 9, 1), None, datetime.date(2024, 1, 31)],
+    "updated_at": [
+        datetime.datetime(2025, 9, 15, 8, 30, tzinfo=UTC),
+        datetime.datetime(2025, 9, 15, 8, 30, 0, 1500, tzinfo=UTC),
+        None,
+    ],
+    "restocked_at": [
+        datetime.datetime(2025, 9, 14, 23, 59, 59),
+        None,
+        datetime.datetime(2025, 9, 14, 7, 0, 0, 250000),
+    ],
+    "opens_at": [datetime.time(9, 0), datetime.time(9, 0, 0, 5), None],
+}
+
+
+def _rows() -> list[Row]:
+    field_to_index = {name: i for i, name in enumerate(COLUMNS)}
+    return [
+        Row(values, field_to_index) for values in zip(*COLUMNS.values(), strict=True)
+    ]
+
+
+def test_arrow_to_json_matches_rows_to_json() -> None:
+    # Byte for byte, so timestamps, times and floats are written the same way.
+    assert arrow_to_json(pa.table(COLUMNS)) == rows_to_json(_rows())
+
+
+def test_arrow_to_json_keeps_integers_with_nulls() -> None:
+    products = json.loads(arrow_to_json(pa.table(COLUMNS)))
+
+    assert [product["stock"] for product in products] == [3, None, 0]
+    assert isinstance(products[0]["stock"], int)
+
+
+def test_arrow_to_json_writes_timestamps_as_iso_strings() -> None:
+    table = pa.table(
+        {
+            "updated_at": pa.array(
+                [datetime.datetime(2025, 9, 15, 8, 30)],
+                type=pa.timestamp("us", tz="UTC"),
+            )
+        }
+    )
+
+    updated_at = json.loads(arrow_to_json(table))[0]["updated_at"]
+
+    assert datetime.datetime.fromisoformat(updated_at) == datetime.datetime(
+        2025, 9, 15, 8, 30, tzinfo=datetime.timezone.utc
+    )
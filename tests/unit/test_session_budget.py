@@ -0,0 +1,128 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Any
+
+import pytest
+from google.adk.models import LlmRequest, LlmResponse
+from google.adk.tools import BaseTool
+from google.genai import types
+
+from app.session_budget import (
+    BUDGET_STATE_KEY,
+    SessionBudget,
+    degrade_model,
+    enforce_budget,
+    record_token_usage,
+)
+
+
+class CallbackContext:
+    """Callback and tool context exposing the session state and the invocation."""
+
+    agent_name = "root_agent"
+
+    def __init__(self, state: dict[str, Any], invocation_id: str) -> None:
+        self.state = state
+        self.invocation_id = invocation_id
+
+
+def context(state: dict[str, Any], invocation_id: str = "i1") -> Any:
+    return CallbackContext(state, invocation_id)
+
+
+def call(tool_name: str, args: dict[str, Any], state: dict[str, Any]) -> Any:
+    return enforce_budget(
+        BaseTool(name=tool_name, description=""), args, context(state)
+    )
+
+
+def spend_tokens(state: dict[str, Any], tokens: int) -> None:
+    usage = types.GenerateContentResponseUsageMetadata(total_token_count=tokens)
+    record_token_usage(context(state), LlmResponse(usage_metadata=usage))
+
+
+@pytest.fixture(autouse=True)
+def limits(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("SESSION_TOKEN_LIMIT", "1000")
+    monkeypatch.setenv("SESSION_IMAGE_LIMIT", "3")
+    monkeypatch.setenv("SESSION_VIDEO_LIMIT", "2")
+
+
+def test_images_are_cut_to_the_allowance() -> None:
+    state: dict[str, Any] = {}
+    args = {"marketing_plan": "Plan", "number_of_images": 2}
+
+    assert call("generate_and_show_images", args, state) is None
+    assert args["number_of_images"] == 2
+    args = {"marketing_plan": "Plan", "number_of_images": 2}
+    assert call("generate_and_show_images", args, state) is None
+    assert args["number_of_images"] == 1
+
+    result = call("generate_and_show_images", {"number_of_images": 1}, state)
+    assert result["status"] == "skipped"
+
+
+def test_degradation_follows_the_defined_order() -> None:
+    state: dict[str, Any] = {}
+
+    spend_tokens(state, 700)
+    args = {"number_of_images": 3}
+    assert call("generate_and_show_images", args, state) is None
+    assert args["number_of_images"] == 1
+    assert call("generate_and_show_video", {}, state) is None
+
+    spend_tokens(state, 150)
+    assert call("generate_and_show_video", {}, state)["status"] == "skipped"
+    config = types.GenerateContentConfig()
+    request = LlmRequest(model="gemini-2.5-pro", config=config)
+    degrade_model(context(state), request)
+    assert request.model == "gemini-2.5-pro"
+
+    spend_tokens(state, 100)
+    config.thinking_config = types.ThinkingConfig(thinking_budget=4096)
+    degrade_model(context(state), request)
+    assert request.model == "gemini-2.5-flash-lite"
+    assert config.thinking_config is None
+
+
+def test_video_variants_are_cut_to_the_allowance() -> None:
+    state: dict[str, Any] = {}
+    args: dict[str, Any] = {"marketing_plan": "Plan"}
+
+    assert call("generate_video_variants", args, state) is None
+
+    assert args["aspect_ratios"] == ["9:16", "1:1"]
+    assert call("generate_and_show_video", {}, state)["status"] == "skipped"
+
+
+def test_time_waiting_for_the_user_is_not_counted() -> None:
+    budget = SessionBudget.from_env()
+
+    budget.touch("i1", now=100.0)
+    budget.touch("i1", now=130.0)
+    # The user takes ten minutes to pick a plan.
+    budget.touch("i2", now=730.0)
+    budget.touch("i2", now=745.0)
+
+    assert budget.elapsed_seconds == 45.0
+
+
+def test_the_budget_lives_in_session_state() -> None:
+    state: dict[str, Any] = {}
+    spend_tokens(state, 10)
+    spend_tokens(state, 5)
+
+    assert state[BUDGET_STATE_KEY]["tokens_used"] == 15
+    assert SessionBudget.from_state(state).tokens_used == 15
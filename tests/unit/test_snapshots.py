@@ -0,0 +1,219 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+from google.adk.tools import BaseTool
+
+from app import snapshots
+from app.snapshots import (
+    SNAPSHOT_STATE_KEY,
+    SnapshotStore,
+    refresh_due,
+    refresh_snapshot,
+    seed_from_snapshot,
+    seed_matches_from_snapshot,
+    serve_snapshot,
+    snapshot_schedule,
+)
+
+TRENDS = json.dumps([{"trend_title": "King's Day"}])
+PRODUCT_ROWS = [
+    {"product_name": name}
+    for name in ("Orange cake", "Stroopwafel", "Gift card", "Boerenkaas", "Milk")
+]
+PRODUCTS = json.dumps(PRODUCT_ROWS, separators=(",", ":"))
+MATCHES = json.dumps([{"product_name": "Orange cake", "trend_title": "King's Day"}])
+
+
+@pytest.fixture
+def store(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> SnapshotStore:
+    store = SnapshotStore(path=str(tmp_path / "cache.sqlite"))
+    monkeypatch.setattr(snapshots, "snapshot_store", store)
+    monkeypatch.setenv("SNAPSHOT_COUNTRIES", "Netherlands:1800,Belgium")
+    monkeypatch.setenv("SNAPSHOT_INTERVAL_SECONDS", "7200")
+    return store
+
+
+@pytest.fixture
+def builds(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    countries: list[str] = []
+
+    def build(country: str) -> dict[str, str]:
+        countries.append(country)
+        return {"trends": TRENDS, "products": PRODUCTS, "matches": MATCHES}
+
+    monkeypatch.setattr(snapshots, "build_snapshot", build)
+    return countries
+
+
+class ToolContext:
+    """Tool or callback context exposing only session state."""
+
+    def __init__(self, state: dict[str, Any]) -> None:
+        self.state = state
+
+
+def _tool_context(state: dict[str, Any]) -> Any:
+    return ToolContext(state)
+
+
+def _tool(name: str) -> BaseTool:
+    return BaseTool(name=name, description="")
+
+
+def test_schedule_per_country(store: SnapshotStore) -> None:
+    assert snapshot_schedule() == {"Netherlands": 1800.0, "Belgium": 7200.0}
+
+
+def test_versions_are_numbered_per_country_and_pruned(store: SnapshotStore) -> None:
+    for _ in range(3):
+        store.publish("Netherlands", TRENDS, PRODUCTS, MATCHES)
+    belgium = store.publish("Belgium", TRENDS, PRODUCTS, "[]")
+
+    latest = store.latest("Netherlands")
+    assert latest is not None and latest.version == 3
+    assert belgium.version == 1
+    store.prune("Netherlands", keep=2)
+    assert store.get("Netherlands", 1) is None
+    kept = store.get("Netherlands", 2)
+    assert kept is not None and kept.matches == MATCHES
+    store.prune("Netherlands", keep=0)
+    assert store.publish("Netherlands", TRENDS, PRODUCTS, MATCHES).version == 4
+    assert store.latest("Netherlands", max_age_seconds=-1) is None
+
+
+def test_refresh_runs_only_for_due_and_unclaimed_countries(
+    store: SnapshotStore, builds: list[str]
+) -> None:
+    assert [s.country for s in refresh_due()] == ["Netherlands", "Belgium"]
+    # Both are fresh now.
+    assert refresh_due() == []
+    refreshed = refresh_snapshot("Belgium", interval_seconds=0)
+    assert refreshed is not None and refreshed.version == 2
+
+    # Another worker is refreshing France.
+    assert store.claim("France", lease_seconds=3600)
+    assert refresh_snapshot("France", interval_seconds=3600) is None
+    assert builds == ["Netherlands", "Belgium", "Belgium"]
+
+
+def test_failed_refresh_releases_its_claim(
+    store: SnapshotStore, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    def build(country: str) -> dict[str, str]:
+        raise RuntimeError("BigQuery is down")
+
+    monkeypatch.setattr(snapshots, "build_snapshot", build)
+
+    assert refresh_due() == []
+    assert store.claim("Netherlands", lease_seconds=1800)
+
+
+def test_session_stays_on_the_snapshot_it_started_from(store: SnapshotStore) -> None:
+    store.publish("Netherlands", TRENDS, PRODUCTS, MATCHES)
+    state: dict[str, Any] = {}
+
+    products = serve_snapshot(_tool("get_product_data"), {}, _tool_context(state))
+    store.publish("Netherlands", "[]", "[]", "[]")
+    matches = serve_snapshot(
+        _tool("matchmaker_agent"), {"request": f"Match {TRENDS}"}, _tool_context(state)
+    )
+
+    assert (products, matches) == (PRODUCTS, MATCHES)
+    assert state[SNAPSHOT_STATE_KEY] == {"country": "Netherlands", "version": 1}
+    assert (
+        serve_snapshot(_tool("generate_and_show_images"), {}, _tool_context(state))
+        is None
+    )
+
+
+def test_trends_are_found_by_the_session(store: SnapshotStore) -> None:
+    # The trend watcher shortlists and summarizes the trends; the snapshot only has
+    # the raw trends its matches were made from.
+    store.publish("Netherlands", TRENDS, PRODUCTS, MATCHES)
+    state: dict[str, Any] = {}
+
+    assert (
+        serve_snapshot(_tool("trend_watcher_agent"), {}, _tool_context(state)) is None
+    )
+
+
+def test_only_calls_for_what_the_snapshot_holds_are_served(
+    store: SnapshotStore,
+) -> None:
+    store.publish("Netherlands", TRENDS, PRODUCTS, MATCHES)
+    state: dict[str, Any] = {}
+    products = _tool("get_product_data")
+    matchmaker = _tool("matchmaker_agent")
+
+    fewer = serve_snapshot(products, {"limit": 2}, _tool_context(state))
+    assert json.loads(fewer) == PRODUCT_ROWS[:2]
+    assert serve_snapshot(products, {"limit": 10}, _tool_context(state)) is None
+    assert serve_snapshot(products, {"table": "other"}, _tool_context(state)) is None
+
+    # The session's trends, not the ones the snapshot's matches were made from.
+    summarized = json.dumps([{"trend_title": "Cat Mayor"}])
+    args = {"product_dataframe_str": PRODUCTS, "trends_news_dataframe_str": summarized}
+    assert serve_snapshot(matchmaker, args, _tool_context(state)) is None
+    args = {"product_dataframe_str": "[]", "trends_news_dataframe_str": TRENDS}
+    assert serve_snapshot(matchmaker, args, _tool_context(state)) is None
+    args = {"product_dataframe_str": PRODUCTS, "trends_news_dataframe_str": TRENDS}
+    assert serve_snapshot(matchmaker, args, _tool_context(state)) == MATCHES
+
+
+def test_sessions_without_a_fresh_snapshot_compute_on_demand(
+    store: SnapshotStore,
+) -> None:
+    state: dict[str, Any] = {}
+    tool = _tool("get_product_data")
+
+    assert serve_snapshot(tool, {}, _tool_context(state)) is None
+    # A snapshot published mid-session is not mixed into it.
+    store.publish("Netherlands", TRENDS, PRODUCTS, MATCHES)
+    assert serve_snapshot(tool, {}, _tool_context(state)) is None
+    # Empty matches are computed anew, so the agent can match more broadly.
+    state = {"country": "Belgium"}
+    store.publish("Belgium", TRENDS, PRODUCTS, "[]")
+    args = {"request": TRENDS}
+    assert serve_snapshot(_tool("matchmaker_agent"), args, _tool_context(state)) is None
+
+
+def test_workflow_state_is_seeded_from_the_snapshot(store: SnapshotStore) -> None:
+    store.publish("Netherlands", TRENDS, PRODUCTS, MATCHES)
+    state: dict[str, Any] = {}
+
+    seed_from_snapshot(_tool_context(state))
+    assert state["products"] == PRODUCTS
+    # The trend step runs, so the trends are shortlisted and summarized; the
+    # matches are only taken when the session found the same trends.
+    assert "trends_json" not in state and "matches" not in state
+    state["trends_json"] = json.dumps([{"trend_title": "Cat Mayor"}])
+    seed_matches_from_snapshot(_tool_context(state))
+    assert "matches" not in state
+    state["trends_json"] = TRENDS
+    seed_matches_from_snapshot(_tool_context(state))
+    assert state["matches"] == MATCHES
+
+
+def test_outputs_already_in_the_session_are_kept(store: SnapshotStore) -> None:
+    store.publish("Netherlands", TRENDS, PRODUCTS, MATCHES)
+    state: dict[str, Any] = {"products": "[]", "trends_json": TRENDS, "matches": "[1]"}
+
+    seed_from_snapshot(_tool_context(state))
+    seed_matches_from_snapshot(_tool_context(state))
+    assert (state["products"], state["matches"]) == ("[]", "[1]")
@@ -0,0 +1,165 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+import pytest
+from google.adk.tools import BaseTool
+
+from app import speculative_media
+from app.speculative_media import (
+    match_plan,
+    reuse_speculative_images,
+    speculate_images,
+    split_plans,
+)
+from app.utils.cache import SharedCache
+from app.utils.checkpoint import CHECKPOINT_ID_KEY
+
+PLANS = """Here are three marketing plans for this week's matches.
+
+**Marketing Plan 1: Organic Milk & Cat Mayor**
+A cat named Whiskers won a local election and celebrates with a bowl of organic milk
+in a miniature mayoral office.
+
+**Marketing Plan 2: Gift Card & King's Day**
+Orange crowds on the canals exchange gift cards as the perfect present for King's Day.
+
+**Marketing Plan 3: Running Shoes & City Marathon**
+Record crowds cheer the marathon runners, who cross the finish line in our new shoes.
+
+Which of the three marketing plans do you prefer?"""
+
+
+class FakeRenderer:
+    """Stands in for Imagen; every render waits until released."""
+
+    def __init__(self) -> None:
+        self.prompts: list[str] = []
+        self.release = threading.Event()
+        self._lock = threading.Lock()
+
+    def __call__(
+        self, prompt: str, number_of_images: int, model: str, image_size: str | None
+    ) -> list[dict[str, str]]:
+        with self._lock:
+            self.prompts.append(prompt)
+        self.release.wait(timeout=5)
+        return [{"prompt": prompt, "model": model}]
+
+
+@pytest.fixture(autouse=True)
+def speculation_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> SharedCache:
+    cache = SharedCache(
+        "speculative_images", ttl_seconds=3600, path=str(tmp_path / "cache.sqlite")
+    )
+    monkeypatch.setattr(speculative_media, "speculation_cache", cache)
+    monkeypatch.setattr(speculative_media, "_pending", {})
+    monkeypatch.setenv("SPECULATIVE_IMAGES", "true")
+    return cache
+
+
+@pytest.fixture
+def renderer(monkeypatch: pytest.MonkeyPatch) -> FakeRenderer:
+    fake = FakeRenderer()
+    monkeypatch.setattr(speculative_media, "render_images", fake)
+    return fake
+
+
+class ToolContext:
+    """Tool context exposing session state, holding the session's checkpoint id."""
+
+    def __init__(self, session_id: str) -> None:
+        self.state = {CHECKPOINT_ID_KEY: session_id}
+
+
+def choose(plan: str, session_id: str = "s1", number_of_images: int = 1) -> Any:
+    tool_context: Any = ToolContext(session_id)
+    return reuse_speculative_images(
+        BaseTool(name="generate_and_show_images", description=""),
+        {"marketing_plan": plan, "number_of_images": number_of_images},
+        tool_context,
+    )
+
+
+def test_split_plans_at_the_plan_headings() -> None:
+    plans = split_plans(PLANS)
+
+    assert len(plans) == 3
+    assert plans[0].startswith("**Marketing Plan 1: Organic Milk")
+    assert plans[2].startswith("**Marketing Plan 3: Running Shoes")
+    assert split_plans("One plan without headings.") == ["One plan without headings."]
+
+
+def test_match_plan_accepts_a_shortened_plan_only_when_clear() -> None:
+    plans = split_plans(PLANS)
+
+    chosen = "Gift cards as the perfect present for King's Day on the canals."
+    assert match_plan(chosen, plans) == 1
+    assert match_plan("A summer campaign for sunscreen.", plans) is None
+
+
+def test_chosen_plan_reuses_its_render_and_discards_the_others(
+    renderer: FakeRenderer, speculation_cache: SharedCache
+) -> None:
+    assert speculate_images("s1", PLANS) == 3
+
+    renderer.release.set()
+    images = choose("Organic milk for Whiskers, the cat mayor of the election.")
+
+    assert len(renderer.prompts) == 3
+    assert images[0]["model"] == speculative_media.DEFAULT_SPECULATIVE_MODEL
+    assert "Whiskers" in images[0]["prompt"]
+    # Nothing is left to reuse, so asking again renders anew.
+    assert speculation_cache.get("s1:plans") is None
+    assert choose("Organic milk for Whiskers, the cat mayor of the election.") is None
+
+
+def test_finished_renders_are_reused_from_the_cache(
+    renderer: FakeRenderer, speculation_cache: SharedCache
+) -> None:
+    renderer.release.set()
+    speculate_images("s1", PLANS)
+    # Renders are stored by a done callback, which runs just after the result is set.
+    deadline = time.monotonic() + 5
+    while speculation_cache.get("s1:2") is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert speculation_cache.get("s1:0") is not None
+    images = choose("Record crowds and our new shoes at the city marathon finish line.")
+    assert "Running Shoes" in images[0]["prompt"]
+    assert speculation_cache.get("s1:0") is None
+
+
+def test_unmatched_or_larger_requests_render_as_usual(renderer: FakeRenderer) -> None:
+    renderer.release.set()
+    speculate_images("s1", PLANS)
+    assert choose("A summer campaign for sunscreen.") is None
+
+    speculate_images("s2", PLANS)
+    plan = "Organic milk for Whiskers, the cat mayor of the election."
+    assert choose(plan, session_id="s2", number_of_images=2) is None
+
+
+def test_nothing_is_rendered_when_disabled(
+    renderer: FakeRenderer, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("SPECULATIVE_IMAGES", "false")
+
+    assert speculate_images("s1", PLANS) == 0
+    assert choose("Organic milk for Whiskers, the cat mayor of the election.") is None
+    assert renderer.prompts == []
@@ -0,0 +1,122 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import inspect
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from typing import Any
+
+import pytest
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+from opentelemetry.trace import StatusCode
+
+from app.utils.telemetry import (
+    in_memory_exporter,
+    set_attributes,
+    time_breakdown,
+    traced_generate_content,
+    traced_tool,
+)
+
+
+@pytest.fixture
+def exporter() -> Iterator[InMemorySpanExporter]:
+    exporter = in_memory_exporter()
+    exporter.clear()
+    yield exporter
+    exporter.clear()
+
+
+@dataclass
+class Usage:
+    prompt_token_count: int | None = 12
+    candidates_token_count: int | None = 3
+    thoughts_token_count: int | None = None
+
+
+@dataclass
+class Response:
+    text: str = "[]"
+    usage_metadata: Usage = field(default_factory=Usage)
+
+
+class FakeModel:
+    model_name = "gemini-2.5-flash"
+
+    def generate_content(self, contents: list[str]) -> Response:
+        return Response()
+
+
+@traced_tool
+def lookup(query: str, limit: int = 5) -> str:
+    """Looks things up."""
+    set_attributes({"bigquery.bytes_processed": 1024, "bigquery.cache_hit": None})
+    return traced_generate_content(FakeModel(), query)
+
+
+@traced_tool
+def broken() -> None:
+    raise TimeoutError("too slow")
+
+
+def test_traced_tool_records_payload_sizes_and_nested_model_call(
+    exporter: InMemorySpanExporter,
+) -> None:
+    assert lookup("héllo") == "[]"
+
+    model_span, tool_span = exporter.get_finished_spans()
+    tool_attributes: dict[str, Any] = dict(tool_span.attributes or {})
+    assert tool_span.name == "tool [lookup]"
+    assert tool_attributes["tool.bytes_in"] == len("héllo".encode())
+    assert tool_attributes["tool.bytes_out"] == 2
+    assert tool_attributes["bigquery.bytes_processed"] == 1024
+    assert "bigquery.cache_hit" not in tool_attributes
+    assert tool_attributes["tool.duration_ms"] >= 0
+
+    model_attributes: dict[str, Any] = dict(model_span.attributes or {})
+    assert model_span.name == "generate_content [gemini-2.5-flash]"
+    assert model_span.parent is not None and tool_span.context is not None
+    assert model_span.parent.span_id == tool_span.context.span_id
+    assert model_attributes["gen_ai.usage.input_tokens"] == 12
+    assert model_attributes["gen_ai.usage.output_tokens"] == 3
+    assert "gen_ai.usage.thoughts_tokens" not in model_attributes
+
+
+def test_traced_tool_keeps_the_tool_signature() -> None:
+    assert lookup.__name__ == "lookup"
+    assert lookup.__doc__ == "Looks things up."
+    assert list(inspect.signature(lookup).parameters) == ["query", "limit"]
+
+
+def test_traced_tool_marks_failures(exporter: InMemorySpanExporter) -> None:
+    with pytest.raises(TimeoutError):
+        broken()
+
+    (span,) = exporter.get_finished_spans()
+    assert span.status.status_code == StatusCode.ERROR
+    assert span.events[0].name == "exception"
+
+
+def test_time_breakdown_sums_durations_per_span_name(
+    exporter: InMemorySpanExporter,
+) -> None:
+    lookup("a")
+    lookup("b")
+
+    breakdown = time_breakdown(exporter.get_finished_spans())
+    assert breakdown["tool [lookup]"]["count"] == 2
+    assert breakdown["generate_content [gemini-2.5-flash]"]["count"] == 2
+    assert next(iter(breakdown)) == "tool [lookup]"
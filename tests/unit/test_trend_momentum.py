@@ -0,0 +1,186 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+
+import pytest
+from google.adk.agents import SequentialAgent
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from app import trend_watcher_agent
+from app.trend_momentum import (
+    format_trend_lines,
+    momentum_scores,
+    parse_trend_lines,
+    search_volume,
+    shortlist_trends,
+)
+
+HISTORY = [
+    # Steady: high but flat.
+    {"term": "Ajax", "refresh_date": "2025-09-13", "score": 80, "percent_gain": 100},
+    {"term": "Ajax", "refresh_date": "2025-09-14", "score": 80, "percent_gain": 100},
+    {"term": "Ajax", "refresh_date": "2025-09-15", "score": 80, "percent_gain": 100},
+    # Accelerating: each day rises more than the day before.
+    {
+        "term": "Storm Amy",
+        "refresh_date": "2025-09-13",
+        "score": 10,
+        "percent_gain": 50,
+    },
+    {
+        "term": "Storm Amy",
+        "refresh_date": "2025-09-14",
+        "score": 30,
+        "percent_gain": 400,
+    },
+    {
+        "term": "storm  amy",
+        "refresh_date": "2025-09-15",
+        "score": 70,
+        "percent_gain": 900,
+    },
+    # Fading.
+    {
+        "term": "Prinsjesdag",
+        "refresh_date": "2025-09-13",
+        "score": 90,
+        "percent_gain": 2000,
+    },
+    {
+        "term": "Prinsjesdag",
+        "refresh_date": "2025-09-14",
+        "score": 60,
+        "percent_gain": 300,
+    },
+    {
+        "term": "Prinsjesdag",
+        "refresh_date": "2025-09-15",
+        "score": 20,
+        "percent_gain": 50,
+    },
+]
+
+TRENDS_AGENT_OUTPUT = """
+- **Prinsjesdag** (5000+ searches)
+- **Storm Amy** (2000+ searches)
+- **Ajax** (1000+ searches)
+- **Cat Mayor** (20K+ searches)
+- **Storm Amy** (2000+ searches)
+- **Kermis** (200+ searches)
+"""
+
+
+def test_momentum_scores_velocity_and_acceleration() -> None:
+    scores = momentum_scores(HISTORY)
+
+    assert set(scores) == {"ajax", "storm amy", "prinsjesdag"}
+    assert scores["storm amy"]["velocity"] == 40
+    assert scores["storm amy"]["acceleration"] == 20
+    assert scores["ajax"]["velocity"] == scores["ajax"]["acceleration"] == 0
+    assert scores["prinsjesdag"]["velocity"] == -40
+    assert (
+        scores["storm amy"]["momentum"]
+        > scores["ajax"]["momentum"]
+        > scores["prinsjesdag"]["momentum"]
+    )
+
+
+def test_momentum_scores_treats_missing_dates_as_zero() -> None:
+    history = [*HISTORY, {"term": "Kermis", "refresh_date": "2025-09-15", "score": 5}]
+
+    assert momentum_scores(history)["kermis"]["velocity"] == 5
+    assert momentum_scores([]) == {}
+
+
+def test_parse_trend_lines_dedupes() -> None:
+    trends = parse_trend_lines(TRENDS_AGENT_OUTPUT)
+
+    assert [trend["trend_title"] for trend in trends] == [
+        "Prinsjesdag",
+        "Storm Amy",
+        "Ajax",
+        "Cat Mayor",
+        "Kermis",
+    ]
+    assert trends[3]["trend_search_volume"] == "20K+ searches"
+
+
+@pytest.mark.parametrize(
+    "volume, expected",
+    [
+        ("2000+ searches", 2000),
+        ("20K+", 20000),
+        ("1,5M+", 1_500_000),
+        ("1,000+", 1000),
+        ("", 0),
+    ],
+)
+def test_search_volume(volume: str, expected: float) -> None:
+    assert search_volume(volume) == expected
+
+
+def test_shortlist_is_bounded_and_ranked_by_momentum() -> None:
+    shortlist = shortlist_trends(parse_trend_lines(TRENDS_AGENT_OUTPUT), HISTORY, 3)
+
+    # Storm Amy leads on momentum, Cat Mayor on volume; on a tie history wins.
+    assert [trend["trend_title"] for trend in shortlist] == [
+        "Storm Amy",
+        "Cat Mayor",
+        "Ajax",
+    ]
+    assert shortlist[1]["momentum"] is None
+
+
+def test_shortlist_falls_back_to_history_terms() -> None:
+    shortlist = shortlist_trends([], HISTORY, 2)
+
+    assert format_trend_lines(shortlist) == (
+        "- **storm  amy** (+900%)\n- **Ajax** (+100%)"
+    )
+    assert shortlist_trends([], [], 2) == []
+
+
+def test_shortlist_agent_ranks_by_volume_without_history(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    def unavailable() -> list:
+        raise RuntimeError("BigQuery unavailable")
+
+    monkeypatch.setattr(trend_watcher_agent, "get_trend_history", unavailable)
+    agent = SequentialAgent(
+        name="root_agent",
+        sub_agents=[trend_watcher_agent.TrendShortlistAgent(name="shortlist", top_n=2)],
+    )
+
+    async def _run() -> dict:
+        runner = InMemoryRunner(agent=agent, app_name="test")
+        session = await runner.session_service.create_session(
+            app_name="test", user_id="test", state={"raw_trends": TRENDS_AGENT_OUTPUT}
+        )
+        message = types.Content(role="user", parts=[types.Part.from_text(text="go")])
+        async for _ in runner.run_async(
+            user_id="test", session_id=session.id, new_message=message
+        ):
+            pass
+        stored = await runner.session_service.get_session(
+            app_name="test", user_id="test", session_id=session.id
+        )
+        assert stored is not None
+        return stored.state
+
+    assert asyncio.run(_run())["shortlisted_trends"] == (
+        "- **Cat Mayor** (20K+ searches)\n- **Prinsjesdag** (5000+ searches)"
+    )
@@ -0,0 +1,201 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import time
+from collections.abc import AsyncGenerator
+from pathlib import Path
+
+import pytest
+from google.adk.agents import BaseAgent, SequentialAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from app import trend_summaries, trend_watcher_agent
+from app.trend_summaries import (
+    lookup_summaries,
+    split_summaries,
+    store_summaries,
+    summary_key,
+    summary_window,
+)
+from app.utils.cache import SharedCache
+
+FALLON = {"trend_title": "Jimmy Fallon", "trend_search_volume": "500+ searches"}
+AJAX = {"trend_title": "Ajax", "trend_search_volume": "1000+ searches"}
+
+SEARCH_RESPONSE = """Here is why these topics are trending:
+
+**Jimmy Fallon** (500+ searches): The late-night host is trending after calls
+to cancel his show.
+
+**Update:** He also appears on a podcast this week.
+
+- **ajax**: The football club won the derby.
+- **Storm Amy**: Not requested."""
+
+
+class FakeSearchAgent(BaseAgent):
+    """Answers with SEARCH_RESPONSE and records the trends it was asked about."""
+
+    requests: list[str]
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        content = ctx.session.events[-1].content
+        assert content is not None and content.parts
+        self.requests.append(content.parts[0].text or "")
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            content=types.Content(
+                role="model", parts=[types.Part(text=SEARCH_RESPONSE)]
+            ),
+        )
+
+
+@pytest.fixture(autouse=True)
+def summary_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> SharedCache:
+    cache = SharedCache(
+        "trend_summaries", ttl_seconds=3600, path=str(tmp_path / "cache.sqlite")
+    )
+    monkeypatch.setattr(trend_summaries, "summary_cache", cache)
+    return cache
+
+
+def test_split_summaries_per_requested_trend() -> None:
+    summaries = split_summaries(SEARCH_RESPONSE, [FALLON, AJAX])
+
+    assert summaries == {
+        "Jimmy Fallon": (
+            "**Jimmy Fallon** (500+ searches): The late-night host is trending after "
+            "calls\nto cancel his show."
+        ),
+        "Ajax": "- **ajax**: The football club won the derby.",
+    }
+
+
+def test_summary_key_normalizes_the_title() -> None:
+    assert summary_key("Jimmy  FALLON", "2025-09-15T00") == summary_key(
+        "jimmy fallon", "2025-09-15T00"
+    )
+    assert summary_key("jimmy fallon", "2025-09-15T00") != summary_key(
+        "jimmy fallon", "2025-09-16T00"
+    )
+
+
+@pytest.mark.parametrize("hours", ["0", "5", "25", "48"])
+def test_window_lengths_that_do_not_divide_a_day_are_rejected(
+    hours: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("TREND_SUMMARY_WINDOW_HOURS", hours)
+    with pytest.raises(ValueError):
+        summary_window()
+
+
+def test_windows_are_aligned_to_utc_midnight(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("TREND_SUMMARY_WINDOW_HOURS", "6")
+    assert int(summary_window()[-2:]) in (0, 6, 12, 18)
+
+
+def test_lookup_summaries_splits_fresh_stale_and_missing(
+    summary_cache: SharedCache, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("TREND_SUMMARY_STALE_SECONDS", "3600")
+    store_summaries({"Jimmy Fallon": "fresh"})
+    summary_cache.set(summary_key("Ajax"), "stale", ttl_seconds=0.01)
+    time.sleep(0.05)
+
+    summaries, stale, missing = lookup_summaries(
+        [FALLON, AJAX, {"trend_title": "Storm Amy", "trend_search_volume": ""}]
+    )
+
+    assert summaries == {"Jimmy Fallon": "fresh", "Ajax": "stale"}
+    assert stale == [AJAX]
+    assert [trend["trend_title"] for trend in missing] == ["Storm Amy"]
+
+
+def _run_search(shortlist: str) -> tuple[list[str], list[str]]:
+    """Runs a cached search agent once; returns the search requests and the texts shown."""
+    search_agent = FakeSearchAgent(name="search_agent", requests=[])
+    agent = SequentialAgent(
+        name="root_agent",
+        sub_agents=[
+            trend_watcher_agent.CachedTrendSearchAgent(
+                name="cached_search", sub_agents=[search_agent]
+            )
+        ],
+    )
+
+    async def _run() -> list[str]:
+        runner = InMemoryRunner(agent=agent, app_name="test")
+        session = await runner.session_service.create_session(
+            app_name="test", user_id="test", state={"shortlisted_trends": shortlist}
+        )
+        message = types.Content(role="user", parts=[types.Part.from_text(text="go")])
+        return [
+            "".join(part.text or "" for part in event.content.parts or [])
+            async for event in runner.run_async(
+                user_id="test", session_id=session.id, new_message=message
+            )
+            if event.author == "cached_search" and event.content
+        ]
+
+    texts = asyncio.run(_run())
+    return search_agent.requests, texts
+
+
+def test_repeated_trends_skip_the_search(monkeypatch: pytest.MonkeyPatch) -> None:
+    revalidated: list = []
+    monkeypatch.setattr(
+        trend_watcher_agent,
+        "_schedule_revalidation",
+        lambda agent, trends: revalidated.append(trends),
+    )
+    shortlist = "- **Jimmy Fallon** (500+ searches)\n- **Ajax** (1000+ searches)"
+
+    first_requests, _ = _run_search(shortlist)
+    second_requests, second_texts = _run_search(shortlist)
+    third_requests, _ = _run_search(shortlist + "\n- **Storm Amy** (200+ searches)")
+
+    assert first_requests == [shortlist]
+    assert second_requests == []
+    assert second_texts == [
+        split_summaries(SEARCH_RESPONSE, [FALLON])["Jimmy Fallon"]
+        + "\n\n- **ajax**: The football club won the derby."
+    ]
+    assert third_requests == ["- **Storm Amy** (200+ searches)"]
+    assert revalidated == []
+
+
+def test_stale_summaries_are_served_and_revalidated(
+    summary_cache: SharedCache, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    revalidated: list = []
+    monkeypatch.setattr(
+        trend_watcher_agent,
+        "_schedule_revalidation",
+        lambda agent, trends: revalidated.append(trends),
+    )
+    summary_cache.set(summary_key("Jimmy Fallon"), "old summary", ttl_seconds=0.01)
+    time.sleep(0.05)
+
+    requests, texts = _run_search("- **Jimmy Fallon** (500+ searches)")
+
+    assert requests == []
+    assert texts == ["old summary"]
+    assert revalidated == [[FALLON]]
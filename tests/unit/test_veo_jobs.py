@@ -0,0 +1,241 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from pathlib import Path
+from typing import Any
+
+import pytest
+from google.genai import Client, types
+
+from app import veo_jobs
+from app.veo_jobs import (
+    VeoJob,
+    VeoJobStore,
+    VideoVariant,
+    resume_running_jobs,
+    run_video_job,
+    run_video_variants,
+    video_job_id,
+)
+
+MODEL = "veo-3.0-fast-generate-001"
+CONFIG = types.GenerateVideosConfig(
+    aspect_ratio="9:16", output_gcs_uri="gs://bucket/videos/"
+)
+
+
+class FakeClient:
+    """Veo operations that finish after a number of polls, counting submissions."""
+
+    def __init__(self, polls_until_done: int = 2, fail: bool = False) -> None:
+        self.polls_until_done = polls_until_done
+        self.fail = fail
+        self.rejected_aspect_ratios: set[str] = set()
+        self.submitted: list[str] = []
+        self.polls = 0
+        self.models = FakeModels(self)
+        self.operations = FakeOperations(self)
+
+    def submit(
+        self, prompt: str, config: types.GenerateVideosConfig
+    ) -> types.GenerateVideosOperation:
+        if config.aspect_ratio in self.rejected_aspect_ratios:
+            raise ValueError(f"Aspect ratio {config.aspect_ratio} is not supported")
+        self.submitted.append(prompt)
+        return _operation(name=f"operations/{len(self.submitted)}", done=False)
+
+    def poll(self, name: str | None) -> types.GenerateVideosOperation:
+        self.polls += 1
+        if self.polls < self.polls_until_done:
+            return _operation(name=name, done=False)
+        if self.fail:
+            return _operation(name=name, done=True, error={"code": 3})
+        videos = {"generated_videos": [{"video": {"uri": "gs://bucket/videos/1.mp4"}}]}
+        return _operation(name=name, done=True, response=videos, result=videos)
+
+
+class FakeModels:
+    def __init__(self, client: FakeClient) -> None:
+        self.client = client
+
+    def generate_videos(
+        self, model: str, prompt: str, config: types.GenerateVideosConfig
+    ) -> types.GenerateVideosOperation:
+        return self.client.submit(prompt, config)
+
+
+class FakeOperations:
+    def __init__(self, client: FakeClient) -> None:
+        self.client = client
+
+    def get(
+        self, operation: types.GenerateVideosOperation
+    ) -> types.GenerateVideosOperation:
+        return self.client.poll(operation.name)
+
+
+def _operation(**fields: Any) -> types.GenerateVideosOperation:
+    return types.GenerateVideosOperation.model_validate(fields)
+
+
+def gen_ai(client: FakeClient) -> Client:
+    """The fake where a Gen AI client is expected; it implements only what Veo uses."""
+    return client  # type: ignore[return-value]
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> VeoJobStore:
+    store = VeoJobStore(path=str(tmp_path / "cache.sqlite"))
+    monkeypatch.setattr(veo_jobs, "veo_job_store", store)
+    monkeypatch.setattr(veo_jobs, "POLL_INTERVAL_SECONDS", 0)
+    return store
+
+
+def test_a_video_is_rendered_once() -> None:
+    client = FakeClient()
+
+    first = run_video_job(gen_ai(client), MODEL, "cat mayor", CONFIG, session_id="s1")
+    second = run_video_job(gen_ai(client), MODEL, "cat mayor", CONFIG, session_id="s2")
+
+    assert client.submitted == ["cat mayor"]
+    assert first.status == second.status == "succeeded"
+    assert second.result == {
+        "video_uri": "gs://bucket/videos/1.mp4",
+        "public_url": "https://storage.googleapis.com/bucket/videos/1.mp4",
+        "bucket": "bucket",
+        "object": "videos/1.mp4",
+    }
+    assert second.session_id == "s1"
+
+
+def test_other_formats_are_other_jobs() -> None:
+    square = CONFIG.model_copy(update={"aspect_ratio": "1:1"})
+
+    assert video_job_id(MODEL, "cat mayor", CONFIG) != video_job_id(
+        MODEL, "cat mayor", square
+    )
+
+
+def test_orphaned_render_is_resumed_not_resubmitted(store: VeoJobStore) -> None:
+    # A worker submitted the render and died while polling.
+    job_id = video_job_id(MODEL, "cat mayor", CONFIG)
+    assert store.claim(job_id, "s1")
+    store.set_running(job_id, "operations/orphaned")
+    client = FakeClient()
+
+    job = run_video_job(gen_ai(client), MODEL, "cat mayor", CONFIG, session_id="s2")
+
+    assert client.submitted == []
+    assert job.operation_name == "operations/orphaned"
+    assert job.result is not None
+    assert job.result["video_uri"] == "gs://bucket/videos/1.mp4"
+
+
+def test_resume_running_jobs_delivers_completion(store: VeoJobStore) -> None:
+    for name in ("a", "b"):
+        store.claim(name, "s1")
+        store.set_running(name, f"operations/{name}")
+    completed: list[VeoJob] = []
+
+    finished = resume_running_jobs(
+        gen_ai(FakeClient(polls_until_done=1)), completed.append
+    )
+
+    assert [job.job_id for job in finished] == ["a", "b"]
+    assert completed == finished
+    assert store.running() == []
+
+
+def test_claims_are_exclusive_until_the_job_fails(store: VeoJobStore) -> None:
+    assert store.claim("job", "s1")
+    assert not store.claim("job", "s2")
+    store.fail("job", "quota exceeded")
+    assert store.claim("job", "s2")
+    store.set_running("job", "operations/1")
+    assert not store.claim("job", "s3")
+
+
+def test_abandoned_claims_expire(
+    store: VeoJobStore, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    assert store.claim("job", "s1")
+    monkeypatch.setattr(veo_jobs, "SUBMIT_TIMEOUT_SECONDS", -1)
+
+    assert store.claim("job", "s2")
+    job = store.get("job")
+    assert job is not None and job.session_id == "s2"
+
+
+def test_failed_render_is_submitted_again() -> None:
+    failing = FakeClient(fail=True)
+    job = run_video_job(gen_ai(failing), MODEL, "cat mayor", CONFIG)
+    assert job.status == "failed"
+    assert job.result is None
+
+    client = FakeClient()
+    job = run_video_job(gen_ai(client), MODEL, "cat mayor", CONFIG)
+
+    assert client.submitted == ["cat mayor"]
+    assert job.status == "succeeded"
+
+
+def test_an_operation_without_a_name_fails_its_job(
+    store: VeoJobStore, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    client = FakeClient()
+    monkeypatch.setattr(client, "submit", lambda prompt, config: _operation())
+
+    with pytest.raises(RuntimeError, match="without an operation name"):
+        run_video_job(gen_ai(client), MODEL, "cat mayor", CONFIG)
+
+    job = store.get(video_job_id(MODEL, "cat mayor", CONFIG))
+    assert job is not None and job.status == "failed"
+
+
+VARIANTS = [
+    VideoVariant(model=MODEL, aspect_ratio="9:16"),
+    VideoVariant(model=MODEL, aspect_ratio="1:1"),
+    VideoVariant(model=MODEL, aspect_ratio="16:9"),
+]
+
+
+def test_variants_are_rendered_as_one_set(store: VeoJobStore) -> None:
+    client = FakeClient(polls_until_done=1)
+
+    video_set = run_video_variants(gen_ai(client), VARIANTS, "A vertical story", CONFIG)
+
+    assert len(client.submitted) == 3
+    assert [v["aspect_ratio"] for v in video_set["variants"]] == ["9:16", "1:1", "16:9"]
+    assert all(v["status"] == "succeeded" for v in video_set["variants"])
+    assert all(v["video_uri"] for v in video_set["variants"])
+    jobs = store.get_set(video_set["set_id"])
+    assert [job.status if job else None for job in jobs] == ["succeeded"] * 3
+
+
+def test_a_rejected_variant_does_not_fail_the_others() -> None:
+    client = FakeClient(polls_until_done=1)
+    client.rejected_aspect_ratios = {"1:1"}
+
+    video_set = run_video_variants(gen_ai(client), VARIANTS, "A square story", CONFIG)
+
+    statuses = {v["aspect_ratio"]: v["status"] for v in video_set["variants"]}
+    assert statuses == {"9:16": "succeeded", "1:1": "failed", "16:9": "succeeded"}
+    assert "not supported" in video_set["variants"][1]["error"]
+
+    client.rejected_aspect_ratios = set()
+    retried = run_video_variants(gen_ai(client), VARIANTS, "A square story", CONFIG)
+
+    assert retried["set_id"] == video_set["set_id"]
+    assert all(v["status"] == "succeeded" for v in retried["variants"])
+    assert len(client.submitted) == 3
@@ -0,0 +1,149 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+from typing import Any
+
+import pytest
+from google.adk.agents import ParallelAgent, SequentialAgent
+from google.adk.runners import InMemoryRunner
+from google.adk.tools import BaseTool
+from google.genai import types
+
+from app.workflow_agent import (
+    CAMPAIGN_STATE_KEYS,
+    PLANS_INVOCATION_KEY,
+    StateFunctionAgent,
+    _record_creative_output,
+    _reset_campaign,
+    _skip_when_in_state,
+    build_workflow_agent,
+    root_agent_mode,
+)
+
+
+class StateContext:
+    """Callback or tool context exposing only session state."""
+
+    def __init__(self, state: dict[str, Any]) -> None:
+        self.state = state
+
+
+def _run(agent: SequentialAgent, state: dict | None = None) -> dict:
+    """Runs agent once in a fresh session and returns the final session state."""
+
+    async def _run_async() -> dict:
+        runner = InMemoryRunner(agent=agent, app_name="test")
+        session = await runner.session_service.create_session(
+            app_name="test", user_id="test", state=state
+        )
+        message = types.Content(role="user", parts=[types.Part.from_text(text="go")])
+        async for _ in runner.run_async(
+            user_id="test", session_id=session.id, new_message=message
+        ):
+            pass
+        final = await runner.session_service.get_session(
+            app_name="test", user_id="test", session_id=session.id
+        )
+        assert final is not None
+        return final.state
+
+    return asyncio.run(_run_async())
+
+
+def _workflow(calls: list[str]) -> SequentialAgent:
+    def fetch(name: str):  # type: ignore[no-untyped-def]
+        def _fetch() -> str:
+            calls.append(name)
+            return name
+
+        return _fetch
+
+    def combine(a: str, b: str) -> str:
+        calls.append("combine")
+        return f"{a}+{b}"
+
+    return SequentialAgent(
+        name="root_agent",
+        sub_agents=[
+            ParallelAgent(
+                name="fetch_inputs",
+                sub_agents=[
+                    StateFunctionAgent(name="a_step", func=fetch("a"), output_key="a"),
+                    StateFunctionAgent(name="b_step", func=fetch("b"), output_key="b"),
+                ],
+            ),
+            StateFunctionAgent(
+                name="combine_step",
+                func=combine,
+                input_keys=["a", "b"],
+                output_key="combined",
+                before_agent_callback=_skip_when_in_state("combined"),
+            ),
+        ],
+    )
+
+
+def test_steps_pass_results_through_state() -> None:
+    calls: list[str] = []
+    state = _run(_workflow(calls))
+
+    assert state["combined"] == "a+b"
+    assert sorted(calls) == ["a", "b", "combine"]
+
+
+def test_step_is_skipped_when_its_output_is_in_state() -> None:
+    calls: list[str] = []
+    state = _run(_workflow(calls), state={"combined": "cached"})
+
+    assert state["combined"] == "cached"
+    assert "combine" not in calls
+
+
+def test_build_workflow_agent_keeps_root_name() -> None:
+    agent = build_workflow_agent()
+
+    assert agent.name == "root_agent"
+    assert [sub_agent.name for sub_agent in agent.sub_agents] == [
+        "fetch_inputs",
+        "matchmaker_step",
+        "marketing_plan_agent",
+        "creative_agent",
+    ]
+
+
+def test_root_agent_mode_rejects_unknown_values(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setenv("ROOT_AGENT_MODE", "planner")
+    with pytest.raises(ValueError):
+        root_agent_mode()
+
+
+def test_campaign_state_is_cleared_once_media_were_rendered() -> None:
+    state: dict[str, Any] = {
+        "matches": "[]",
+        "marketing_plans": "Plan 1",
+        PLANS_INVOCATION_KEY: "e-1",
+    }
+    context: Any = StateContext(state)
+
+    # The creative agent asked which plan was meant: the plans stay.
+    _reset_campaign(context)
+    assert state["marketing_plans"] == "Plan 1"
+
+    tool = BaseTool(name="generate_and_show_images", description="")
+    _record_creative_output(tool, {}, context, {})
+    _reset_campaign(context)
+    assert all(state[key] is None for key in CAMPAIGN_STATE_KEYS)